@@ -0,0 +1,60 @@
+"""Раскраска кадра: цикл setPixel по пикселям против векторной выборки из LUT
+
+Для каждого разрешения считает кадр Мандельброта и печатает время
+построения QImage прежним способом (вызов Python и setPixel на каждый
+пиксель) и через colorize + QImage поверх буфера.
+
+    python benchmarks/bench_colorize.py [repeat]
+"""
+import sys
+
+import numpy as np
+from PyQt6.QtGui import QImage
+
+from common import best_time
+from src.core.color_schemes import ColorSchemes
+from src.core.coloring import colorize, image_from_pixels, palette_lut
+from src.core.fractal_engine import get_engine
+
+RESOLUTIONS = ((320, 240), (800, 600), (1920, 1080))
+
+
+def per_pixel_image(data, colormap):
+    """Прежняя раскраска Canvas: _iterations_to_color и setPixel на каждый пиксель"""
+    height, width = data.shape
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(0)
+    for y in range(height):
+        for x in range(width):
+            iterations = data[y, x]
+            r, g, b = (0, 0, 0) if iterations < 0 else colormap[iterations % 256]
+            image.setPixel(x, y, (r << 16) | (g << 8) | b)
+    return image
+
+
+def lut_image(data, lut, max_iterations):
+    """Новая раскраска: одна выборка из LUT и QImage без копирования"""
+    return image_from_pixels(colorize(data, lut, max_iterations))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    engine = get_engine()
+    colormap = ColorSchemes.get_scheme("classic")
+    lut = palette_lut(colormap)
+    max_iterations = 256
+
+    print(f"{'Размер':<12} {'setPixel, мс':>13} {'LUT, мс':>9} {'ускорение':>10}")
+    for width, height in RESOLUTIONS:
+        data = np.asarray(engine.calculate_mandelbrot(-0.5, 0.0, 1.0, width, height, max_iterations))
+
+        # Прежний путь медленный (секунды на кадр) - хватает одного запуска
+        old = best_time(lambda: per_pixel_image(data, colormap), repeat=1)
+        new = best_time(lambda: lut_image(data, lut, max_iterations), repeat=repeat)
+        size = f"{width}x{height}"
+        print(f"{size:<12} {old * 1000:13.1f} {new * 1000:9.2f} {old / new:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Накладные расходы на запрос: свой FractalEngine против общего get_engine()
+
+Раньше каждый FractalWorker создавал новый движок (поиск библиотеки, CDLL,
+argtypes, вывод в консоль). Скрипт делает серию из count маленьких расчётов
+обоими способами и печатает среднее время запроса и накладные расходы
+сверх самого расчёта.
+
+    python benchmarks/bench_engine_overhead.py [count] [size]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from common import ROOT_DIR  # noqa: F401 - добавляет корень репозитория в sys.path
+from src.core.fractal_engine import FractalEngine, get_engine
+
+
+def burst(make_engine, count, size):
+    """Среднее время одного запроса (в секундах) на серии из count расчётов"""
+    start = time.perf_counter()
+    for _ in range(count):
+        engine = make_engine()
+        result = engine.calculate_mandelbrot(-0.5, 0.0, 1.0, size, size, 64)
+        engine.release(result)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    engine = get_engine()
+    render_only = burst(lambda: engine, count, size)
+
+    # Конструктор печатает в консоль на каждом запросе - не засоряем вывод
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_request = burst(FractalEngine, count, size)
+    shared = burst(get_engine, count, size)
+
+    print(f"{count} расчётов {size}x{size}")
+    print(f"{'Способ':<24} {'запрос, мкс':>12} {'накладные, мкс':>15}")
+    for name, elapsed in (("движок на запрос", per_request), ("get_engine()", shared)):
+        print(f"{name:<24} {elapsed * 1e6:12.1f} {(elapsed - render_only) * 1e6:15.1f}")
+    print(f"Ускорение запроса: {per_request / shared:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Режим угадывания (Мариани-Сильвер) против полного расчёта
+
+Для каждого стандартного пресета печатает время обоих режимов и долю
+пикселей, в которых угаданный кадр расходится с полным расчётом.
+
+    python benchmarks/bench_guessing.py [width] [height]
+"""
+import sys
+
+from common import best_time, render_preset
+from src.core.fractal_engine import FractalEngine
+from src.db.database import DEFAULT_PRESETS
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    engine = FractalEngine()
+    print(f"{'Пресет':<32} {'full, мс':>9} {'guess, мс':>10} {'ускорение':>10} {'расхождение':>12}")
+
+    for preset in DEFAULT_PRESETS:
+        full = render_preset(engine, preset, width, height, render_mode="full")
+        guess = render_preset(engine, preset, width, height, render_mode="guess")
+        mismatch = (full != guess).mean() * 100
+
+        full_time = best_time(lambda: render_preset(engine, preset, width, height, render_mode="full"))
+        guess_time = best_time(lambda: render_preset(engine, preset, width, height, render_mode="guess"))
+
+        print(f"{preset['name']:<32} {full_time * 1000:9.1f} {guess_time * 1000:10.1f} "
+              f"{full_time / guess_time:9.2f}x {mismatch:11.3f}%")
+
+
+if __name__ == "__main__":
+    main()
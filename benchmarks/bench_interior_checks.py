@@ -0,0 +1,53 @@
+"""Ускорение от проверок внутренних точек на стандартных пресетах
+
+Сравниваются три режима:
+    без проверок / + кардиоида и круг периода 2 / + поиск циклов орбиты
+
+    python benchmarks/bench_interior_checks.py [width] [height] [max_iterations]
+
+Если max_iterations задан, он заменяет значение из пресета (в UI - до 3000).
+"""
+import sys
+
+from common import best_time, render_preset
+from src.core.fractal_engine import FractalEngine
+from src.db.database import DEFAULT_PRESETS
+
+MODES = [
+    ("без", dict(cardioid=False, periodicity=False)),
+    ("кардиоида", dict(cardioid=True, periodicity=False)),
+    ("+циклы", dict(cardioid=True, periodicity=True)),
+]
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    max_iterations = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    engine = FractalEngine()
+    header = "".join(f"{name + ', мс':>15}" for name, _ in MODES)
+    print(f"{'Пресет':<32}{header} {'ускорение':>10}")
+
+    for preset in DEFAULT_PRESETS:
+        if max_iterations:
+            preset = dict(preset, max_iterations=max_iterations)
+
+        times = []
+        reference = None
+        mismatched = 0
+        for _, checks in MODES:
+            engine.set_interior_checks(**checks)
+            result = render_preset(engine, preset, width, height)
+            if reference is None:
+                reference = result
+            mismatched += int((result != reference).sum())
+            times.append(best_time(lambda: render_preset(engine, preset, width, height), repeat=3))
+
+        row = "".join(f"{t * 1000:15.1f}" for t in times)
+        note = f"  (расхождений: {mismatched})" if mismatched else ""
+        print(f"{preset['name']:<32}{row} {times[0] / times[-1]:9.2f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Кадр цикла палитры: полная раскраска против выборки по готовым индексам
+
+Для каждого разрешения считает кадр Мандельброта и печатает время кадра
+цикла, если каждый раз раскрашивать итерации через colorize со сдвинутой
+палитрой, и время Canvas._cycle_step, которому достаточно одной выборки
+из LUT по индексам пикселей, посчитанным один раз. Бюджет кадра при 60 Гц -
+16.7 мс.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_palette_cycle.py [max_iterations]
+"""
+import sys
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+
+from common import best_time
+from src.core.coloring import colorize, image_pixels
+from src.core.fractal_engine import get_engine
+from src.ui.canvas import Canvas
+
+RESOLUTIONS = ((800, 600), (1920, 1080), (3840, 2160))
+
+
+def main():
+    max_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    app = QApplication(sys.argv)  # noqa: F841 - Canvas нужен QApplication
+    engine = get_engine()
+    canvas = Canvas()
+    canvas.max_iterations = max_iterations
+
+    print(f"{'Размер':<12} {'colorize, мс':>13} {'индексы, мс':>12} {'ускорение':>10} {'кадров/с':>9}")
+    for width, height in RESOLUTIONS:
+        data = np.asarray(engine.calculate_mandelbrot(-0.745, 0.1, 50.0, width, height, max_iterations))
+        canvas.fractal_data = data
+        canvas._create_image_from_data()
+
+        def full():
+            canvas.palette_offset = (canvas.palette_offset + 1) % len(canvas.palette_lut)
+            colorize(data, canvas._color_lut(), max_iterations, image_pixels(canvas.image))
+
+        full_time = best_time(full, repeat=10)
+        canvas._cycle_step()  # Индексы строятся один раз на кадр фрактала
+        cycle_time = best_time(canvas._cycle_step, repeat=10)
+        size = f"{width}x{height}"
+        print(f"{size:<12} {full_time * 1000:13.2f} {cycle_time * 1000:12.2f} "
+              f"{full_time / cycle_time:9.1f}x {1 / cycle_time:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Уровни точности: float32, double и double-double
+
+Для каждого стандартного пресета рендерит кадр во всех трёх точностях ядра,
+печатает время (из result.info) и долю пикселей, отличающихся от double.
+Автоматический выбор точности показан в последнем столбце.
+
+    python benchmarks/bench_precision.py [width] [height]
+"""
+import sys
+
+from common import render_preset
+from src.core.fractal_engine import FractalEngine
+from src.db.database import DEFAULT_PRESETS
+
+TIERS = ("float32", "double", "double-double")
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    engine = FractalEngine()
+    header = "".join(f"{tier + ', мс':>18}" for tier in TIERS)
+    print(f"{'Пресет':<32}{header} {'float32 ≠':>10} {'auto':>14}")
+
+    for preset in DEFAULT_PRESETS:
+        results = {
+            tier: min((render_preset(engine, preset, width, height, precision=tier) for _ in range(3)),
+                      key=lambda result: result.info['time'])
+            for tier in TIERS
+        }
+        auto = render_preset(engine, preset, width, height)
+        mismatch = (results["float32"] != results["double"]).mean() * 100
+
+        times = "".join(f"{results[tier].info['time'] * 1000:18.1f}" for tier in TIERS)
+        print(f"{preset['name']:<32}{times} {mismatch:9.2f}% {auto.info['precision']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Общие утилиты для бенчмарков
+
+Скрипты запускаются из корня репозитория:
+    python benchmarks/bench_interior_checks.py
+"""
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def best_time(func, repeat=5):
+    """Лучшее время выполнения func() из repeat запусков (в секундах)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def render_preset(engine, preset, width, height, **kwargs):
+    """Рендерит пресет из БД движком FractalEngine"""
+    if preset['fractal_type'] == 'Julia':
+        return engine.calculate_julia(
+            preset['c_real'], preset['c_imag'],
+            preset['center_x'], preset['center_y'], preset['zoom'],
+            width, height, preset['max_iterations'], **kwargs
+        )
+    return engine.calculate_mandelbrot(
+        preset['center_x'], preset['center_y'], preset['zoom'],
+        width, height, preset['max_iterations'], **kwargs
+    )
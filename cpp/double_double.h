@@ -0,0 +1,81 @@
+#ifndef DOUBLE_DOUBLE_H
+#define DOUBLE_DOUBLE_H
+
+/*
+ * Арифметика double-double: число хранится как сумма hi + lo двух double,
+ * что даёт ~32 значащих десятичных знака (против ~16 у double)
+ *
+ * Алгоритмы Деккера/Кнута (two_sum, two_prod) без FMA, поэтому
+ * компилятору запрещено склеивать умножение со сложением
+ */
+
+#ifdef __GNUC__
+#pragma GCC push_options
+#pragma GCC optimize("fp-contract=off")
+#endif
+
+typedef struct {
+    double hi, lo;
+} dd_t;
+
+// Точная сумма двух double: s + e == a + b
+static inline dd_t dd_two_sum(double a, double b) {
+    double s = a + b;
+    double bb = s - a;
+    double e = (a - (s - bb)) + (b - bb);
+    return (dd_t){s, e};
+}
+
+// То же при |a| >= |b|
+static inline dd_t dd_quick_two_sum(double a, double b) {
+    double s = a + b;
+    double e = b - (s - a);
+    return (dd_t){s, e};
+}
+
+// Точное произведение двух double через разбиение Деккера
+static inline dd_t dd_two_prod(double a, double b) {
+    const double split = 134217729.0;  // 2^27 + 1
+    double p = a * b;
+    double ta = split * a, tb = split * b;
+    double a_hi = ta - (ta - a), a_lo = a - a_hi;
+    double b_hi = tb - (tb - b), b_lo = b - b_hi;
+    double e = ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo;
+    return (dd_t){p, e};
+}
+
+static inline dd_t dd_add(dd_t a, dd_t b) {
+    dd_t s = dd_two_sum(a.hi, b.hi);
+    dd_t t = dd_two_sum(a.lo, b.lo);
+    s.lo += t.hi;
+    s = dd_quick_two_sum(s.hi, s.lo);
+    s.lo += t.lo;
+    return dd_quick_two_sum(s.hi, s.lo);
+}
+
+static inline dd_t dd_sub(dd_t a, dd_t b) {
+    return dd_add(a, (dd_t){-b.hi, -b.lo});
+}
+
+static inline dd_t dd_add_double(dd_t a, double b) {
+    dd_t s = dd_two_sum(a.hi, b);
+    s.lo += a.lo;
+    return dd_quick_two_sum(s.hi, s.lo);
+}
+
+static inline dd_t dd_mul(dd_t a, dd_t b) {
+    dd_t p = dd_two_prod(a.hi, b.hi);
+    p.lo += a.hi * b.lo + a.lo * b.hi;
+    return dd_quick_two_sum(p.hi, p.lo);
+}
+
+// Умножение на степень двойки точное
+static inline dd_t dd_mul_pow2(dd_t a, double b) {
+    return (dd_t){a.hi * b, a.lo * b};
+}
+
+#ifdef __GNUC__
+#pragma GCC pop_options
+#endif
+
+#endif // DOUBLE_DOUBLE_H
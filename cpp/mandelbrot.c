@@ -1,20 +1,161 @@
 #include "mandelbrot.h"
+#include "double_double.h"
 #include <math.h>
+#include <stdlib.h>
+#include <string.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 /*
- * Вычисление множества Мандельброта
+ * Общие параметры расчёта одного кадра
  *
- * Алгоритм:
- * Для каждого пикселя (x,y) мы преобразуем его в координату комплексной плоскости (cx,cy)
- * Затем итерируем формулу: z_{n+1} = z_n^2 + c, где z0 = 0, c = (cx, cy)
- * Пиксель принадлежит множеству Мандельброта, если последовательность не уходит в бесконечность
+ * Мандельброт и Жюлиа отличаются только начальными значениями:
+ *   Мандельброт: z0 = 0, c = координата пикселя
+ *   Жюлиа:       z0 = координата пикселя, c = (c_real, c_imag)
+ * Поэтому все ядра (скалярное и SIMD) работают с одной структурой
  */
-CALCULATE_API void calculate_mandelbrot(double center_x, double center_y, double zoom,
-                         int width, int height, int* output, int max_iterations) {
+typedef struct {
+    int julia;                  // 0 - Мандельброт, 1 - Жюлиа
+    double c_real, c_imag;      // Параметр C для Julia
+    double center_x, center_y;  // Центр видимой области
+    double center_x_lo;         // Младшие части центра (только для double-double)
+    double center_y_lo;
+    double pixel_to_real;       // Шаг пикселя по X
+    double pixel_to_imag;       // Шаг пикселя по Y
+    double origin_x, origin_y;  // Пиксель кадра, попадающий в центр, минус угол прямоугольника
+    int stride;                 // Шаг между соседними элементами output в пикселях кадра
+    int width, height;          // Размер output (всего кадра или его прямоугольника)
+    int max_iterations;
+    int interior_checks;        // Битовая маска FRACTAL_CHECK_*
+    double cycle_epsilon2;      // Квадрат допуска для поиска циклов орбиты
+    double bailout2;            // Квадрат радиуса ухода (больше при сглаживании)
+    FractalControl* control;    // Отмена и прогресс (может быть NULL)
+} FractalParams;
 
-    /*
-     * Параметры преобразования пикселей → комплексные координаты
-     */
+/*
+ * Отмена и прогресс: флаг читается перед каждой строкой/куском работы,
+ * счётчик готовых строк увеличивается атомарно из всех потоков
+ */
+static inline int render_cancelled(const FractalControl* control) {
+    return control != NULL && control->cancel;
+}
+
+static inline void render_progress(FractalControl* control) {
+    if (control != NULL) {
+        #pragma omp atomic
+        control->work_done++;
+    }
+}
+
+static void render_start(FractalControl* control, int work_total) {
+    if (control != NULL) {
+        control->work_done = 0;
+        control->work_total = work_total;
+    }
+}
+
+/*
+ * Аналитические проверки внутренних точек (включены по умолчанию)
+ */
+static int default_interior_checks = FRACTAL_CHECK_CARDIOID | FRACTAL_CHECK_PERIODICITY;
+
+/*
+ * Допуск поиска циклов в долях шага пикселя: орбита считается
+ * зациклившейся, если вернулась к сохранённой точке ближе, чем на
+ * тысячную долю пикселя. Так допуск автоматически уменьшается при зуме
+ */
+#define CYCLE_TOLERANCE 1e-3
+
+/*
+ * Радиус ухода: 2 для целых итераций, 256 (в квадрате) при сглаживании.
+ * Чем больше радиус, тем точнее log-log формула и меньше разрывов на
+ * границах полос, а лишних итераций всего 2-3 на ушедший пиксель
+ */
+#define ESCAPE_BAILOUT2 4.0
+#define SMOOTH_BAILOUT2 65536.0
+
+/*
+ * Дробное число итераций (normalized iteration count)
+ *
+ *   mu = n + 1 - log2(ln|z_n| / ln R)
+ *
+ * z_n - первое значение орбиты за радиусом ухода R, поэтому mu лежит
+ * в (n, n + 1] и непрерывно меняется между соседними пикселями: палитра
+ * не даёт полос. Внутренние точки получают ровно max_iterations
+ */
+static inline float smooth_iteration(int iteration, double z_real, double z_imag, int max_iterations) {
+    if (iteration >= max_iterations) {
+        return (float)max_iterations;
+    }
+    double mu = iteration + 1 - log2(log(z_real * z_real + z_imag * z_imag) / log(SMOOTH_BAILOUT2));
+    return mu > 0.0 ? (float)mu : 0.0f;
+}
+
+/*
+ * Состояние орбиты для продолжения расчёта с большим max_iterations
+ *
+ * Для пикселя, дошедшего до max_iterations без ухода, в orbit пишется
+ * последнее z, для всех остальных (ушедших или доказанно внутренних -
+ * по кардиоиде или циклу орбиты) - ORBIT_NONE. Так вызывающий отличает
+ * внутренние точки, которые продолжать не нужно, от незавершённых
+ */
+#define ORBIT_NONE INFINITY
+
+static inline void store_orbit(double* orbit, int k, int unfinished, double z_real, double z_imag) {
+    orbit[2 * k] = unfinished ? z_real : ORBIT_NONE;
+    orbit[2 * k + 1] = unfinished ? z_imag : ORBIT_NONE;
+}
+
+/*
+ * Лежит ли точка c в главной кардиоиде или круге периода 2
+ *
+ * Кардиоида: q = (x - 1/4)^2 + y^2,  q * (q + (x - 1/4)) <= y^2 / 4
+ * Круг:      (x + 1)^2 + y^2 <= 1/16
+ * Орбиты таких точек никогда не уходят на бесконечность, поэтому
+ * пиксель сразу получает max_iterations без единой итерации
+ */
+static inline int in_cardioid_or_bulb(double x, double y) {
+    double y2 = y * y;
+    double xq = x - 0.25;
+    double q = xq * xq + y2;
+    if (q * (q + xq) <= 0.25 * y2) {
+        return 1;
+    }
+    double xb = x + 1.0;
+    return xb * xb + y2 <= 0.0625;
+}
+
+/*
+ * Ядро: считает count пикселей с координатами (xs[k], ys[k]) и пишет
+ * итерации в out[k], а если smooth != NULL - ещё и дробное число итераций
+ * в smooth[k] (за тот же проход). Если orbit != NULL, в orbit[2k], orbit[2k+1]
+ * пишется состояние орбиты (см. store_orbit). Пиксели могут идти в любом
+ * порядке - это нужно режиму угадывания, который считает только границы прямоугольников
+ */
+typedef void (*point_kernel_fn)(const FractalParams* p, const int* xs, const int* ys,
+                                int count, int* out, float* smooth, double* orbit);
+
+/*
+ * Количество потоков для параллельного цикла
+ * num_threads <= 0 - берём все доступные ядра (omp_get_max_threads)
+ * Без OpenMP всегда работаем в одном потоке
+ */
+static int resolve_num_threads(int num_threads) {
+#ifdef _OPENMP
+    return num_threads > 0 ? num_threads : omp_get_max_threads();
+#else
+    (void)num_threads;
+    return 1;
+#endif
+}
+
+/*
+ * Параметры преобразования пикселей → комплексные координаты
+ */
+static void init_view(FractalParams* p, double center_x, double center_y, double zoom,
+                      int width, int height, int max_iterations) {
     double scale = 2.0 / zoom;  // Масштаб: 2.0 покрывает диапазон [-1, 1] при zoom=1
     double aspect_ratio = (double)width / height;  // Соотношение сторон
 
@@ -22,101 +163,941 @@ CALCULATE_API void calculate_mandelbrot(double center_x, double center_y, double
      * Вычисляем смещение для перевода пикселей в комплексные координаты
      * Мы хотим чтобы центр экрана (width/2, height/2) соответствовал (center_x, center_y)
      */
-    double pixel_to_real = scale / width;     // Коэффициент для X координаты
-    double pixel_to_imag = scale / aspect_ratio / height;  // Коэффициент для Y координаты
+    p->pixel_to_real = scale / width;     // Коэффициент для X координаты
+    p->pixel_to_imag = scale / aspect_ratio / height;  // Коэффициент для Y координаты
+    p->center_x = center_x;
+    p->center_y = center_y;
+    p->origin_x = width / 2.0;
+    p->origin_y = height / 2.0;
+    p->stride = 1;
+    p->width = width;
+    p->height = height;
+    p->max_iterations = max_iterations;
+    p->interior_checks = default_interior_checks;
+    p->bailout2 = ESCAPE_BAILOUT2;
 
+    double cycle_epsilon = p->pixel_to_real * CYCLE_TOLERANCE;
+    p->cycle_epsilon2 = cycle_epsilon * cycle_epsilon;
+}
+
+/*
+ * Сужает расчёт до прямоугольника кадра (с шагом stride)
+ *
+ * Элемент x прямоугольника - это пиксель region->x + x * stride кадра,
+ * поэтому сдвигается только origin: (x * stride - (width/2 - region->x))
+ * точно равно (region->x + x * stride - width/2) в double, и результат
+ * совпадает с полным кадром
+ */
+static void apply_region(const FractalRegion* region, double* origin_x, double* origin_y,
+                         int* stride, int* width, int* height) {
+    if (region == NULL) {
+        return;
+    }
+    *origin_x -= region->x;
+    *origin_y -= region->y;
+    *stride = region->stride > 1 ? region->stride : 1;
+    *width = region->width;
+    *height = region->height;
+}
+
+/*
+ * Скалярное ядро - один пиксель за раз (запасной вариант для любого CPU)
+ */
+static void point_kernel_scalar(const FractalParams* p, const int* xs, const int* ys,
+                                int count, int* out, float* smooth, double* orbit) {
     /*
-     * Основной цикл по всем пикселям
-     * Пока БЕЗ многопоточности - добавим OpenMP позже
+     * Циклы ищем, только если предыдущий пиксель оказался внутри
+     * множества: снаружи проверка лишь замедляет итерации
      */
-//    #pragma omp parallel for collapse(2) schedule(dynamic)
-    for (int y = 0; y < height; y++) {
-        for (int x = 0; x < width; x++) {
+    int previous_inside = 1;
 
-            /*
-             * Преобразуем координаты пикселя в точку комплексной плоскости
-             *
-             * (x - width/2.0)  - смещение от центра экрана
-             * * pixel_to_real   - масштабирование к мировым координатам
-             * + center_x        - смещение к выбранному центру
-             */
-            double cx = (x - width / 2.0) * pixel_to_real + center_x;
-            double cy = (y - height / 2.0) * pixel_to_imag + center_y;
+    for (int k = 0; k < count; k++) {
+        /*
+         * Преобразуем координаты пикселя в точку комплексной плоскости
+         *
+         * (x * stride - origin_x) - смещение от центра экрана (для всего кадра
+         *                   stride = 1, origin_x = width/2)
+         * * pixel_to_real   - масштабирование к мировым координатам
+         * + center_x        - смещение к выбранному центру
+         */
+        double px = (xs[k] * p->stride - p->origin_x) * p->pixel_to_real + p->center_x;
+        double py = (ys[k] * p->stride - p->origin_y) * p->pixel_to_imag + p->center_y;
 
-            /*
-             * Итерационный процесс для определения принадлежности точке множеству
-             * z_real, z_imag - текущее значение z в итерации
-             * Мы начинаем с z0 = 0
-             */
-            double z_real = 0.0;
-            double z_imag = 0.0;
+        if (!p->julia && (p->interior_checks & FRACTAL_CHECK_CARDIOID) && in_cardioid_or_bulb(px, py)) {
+            out[k] = p->max_iterations;
+            if (smooth) smooth[k] = (float)p->max_iterations;
+            if (orbit) store_orbit(orbit, k, 0, 0.0, 0.0);
+            continue;
+        }
+
+        double z_real, z_imag, c_real, c_imag;
+        if (p->julia) {
+            z_real = px;  z_imag = py;
+            c_real = p->c_real;  c_imag = p->c_imag;
+        } else {
+            z_real = 0.0;  z_imag = 0.0;
+            c_real = px;  c_imag = py;
+        }
 
-            int iteration = 0;
+        int iteration = 0;
+        int cycled = 0;
 
+        /*
+         * Поиск циклов по Бренту: запоминаем z и сравниваем с ним следующие
+         * значения орбиты. Длина окна удваивается, поэтому цикл любого
+         * периода будет найден не позже чем через ~2 * (предпериод + период) итераций
+         */
+        int check_cycles = (p->interior_checks & FRACTAL_CHECK_PERIODICITY) && previous_inside;
+        double saved_real = z_real, saved_imag = z_imag;
+        int cycle_window = 1, cycle_steps = 0;
+
+        /*
+         * Условия остановки:
+         * 1. |z| > 2.0 (точка гарантировано уходит в бесконечность)
+         * 2. Достигнуто max_iterations (точка вероятно принадлежит множеству)
+         *
+         * Мы проверяем |z|^2 < 4 вместо |z| < 2 чтобы избежать квадратного корня
+         * (при сглаживании радиус больше - см. SMOOTH_BAILOUT2)
+         */
+        while (z_real * z_real + z_imag * z_imag < p->bailout2 && iteration < p->max_iterations) {
             /*
-             * Условия остановки:
-             * 1. |z| > 2.0 (точка гарантировано уходит в бесконечность)
-             * 2. Достигнуто max_iterations (точка вероятно принадлежит множеству)
-             *
-             * Мы проверяем |z|^2 < 4 вместо |z| < 2 чтобы избежать квадратного корня
+             * z^2 = (real + imag*i)^2 = (real^2 - imag^2) + (2*real*imag)*i
              */
-            while (z_real * z_real + z_imag * z_imag < 4.0 && iteration < max_iterations) {
-                /*
-                 * Формула Мандельброта: z_{n+1} = z_n^2 + c
-                 *
-                 * Для комплексных чисел:
-                 * z^2 = (real + imag*i)^2 = (real^2 - imag^2) + (2*real*imag)*i
-                 */
-                double temp = z_real * z_real - z_imag * z_imag + cx;  // real часть
-                z_imag = 2.0 * z_real * z_imag + cy;                   // imag часть
-                z_real = temp;
+            double temp = z_real * z_real - z_imag * z_imag + c_real;  // real часть
+            z_imag = 2.0 * z_real * z_imag + c_imag;                   // imag часть
+            z_real = temp;
+
+            iteration++;
 
-                iteration++;
+            if (check_cycles) {
+                double d_real = z_real - saved_real;
+                double d_imag = z_imag - saved_imag;
+                if (d_real * d_real + d_imag * d_imag < p->cycle_epsilon2) {
+                    iteration = p->max_iterations;  // Орбита зациклилась - точка внутри множества
+                    cycled = 1;
+                    break;
+                }
+                if (++cycle_steps == cycle_window) {
+                    saved_real = z_real;
+                    saved_imag = z_imag;
+                    cycle_steps = 0;
+                    cycle_window *= 2;
+                }
             }
+        }
 
-            /*
-             * Записываем результат в выходной массив
-             * iteration = 0..max_iterations
-             * - iteration == max_iterations: точка в множестве (обычно чёрный)
-             * - iteration < max_iterations: точка вне множества (цвет зависит от итерации)
-             */
-            output[y * width + x] = iteration;
+        previous_inside = iteration == p->max_iterations;
+
+        /*
+         * iteration == max_iterations: точка в множестве (обычно чёрный)
+         * iteration < max_iterations: точка вне множества (цвет зависит от итерации)
+         */
+        out[k] = iteration;
+        if (smooth) smooth[k] = smooth_iteration(iteration, z_real, z_imag, p->max_iterations);
+        if (orbit) store_orbit(orbit, k, iteration == p->max_iterations && !cycled, z_real, z_imag);
+    }
+}
+
+/*
+ * Ядро double-double для зумов, где double уже не различает пиксели,
+ * но метод возмущений ещё не нужен (шаг пикселя примерно до 1e-28)
+ *
+ * Центр задаётся парой (center_x, center_x_lo), смещение пикселя
+ * от центра мало и точно представимо в double
+ */
+#ifdef __GNUC__
+__attribute__((optimize("fp-contract=off")))
+#endif
+static void point_kernel_double_double(const FractalParams* p, const int* xs, const int* ys,
+                                       int count, int* out, float* smooth, double* orbit) {
+    (void)orbit;  // Продолжение орбит в double-double не поддерживается (render передаёт NULL)
+    const dd_t center_x = {p->center_x, p->center_x_lo};
+    const dd_t center_y = {p->center_y, p->center_y_lo};
+    int previous_inside = 1;
+
+    for (int k = 0; k < count; k++) {
+        dd_t px = dd_add_double(center_x, (xs[k] * p->stride - p->origin_x) * p->pixel_to_real);
+        dd_t py = dd_add_double(center_y, (ys[k] * p->stride - p->origin_y) * p->pixel_to_imag);
+
+        if (!p->julia && (p->interior_checks & FRACTAL_CHECK_CARDIOID) && in_cardioid_or_bulb(px.hi, py.hi)) {
+            out[k] = p->max_iterations;
+            if (smooth) smooth[k] = (float)p->max_iterations;
+            continue;
         }
+
+        dd_t z_real, z_imag, c_real, c_imag;
+        if (p->julia) {
+            z_real = px;  z_imag = py;
+            c_real = (dd_t){p->c_real, 0.0};  c_imag = (dd_t){p->c_imag, 0.0};
+        } else {
+            z_real = (dd_t){0.0, 0.0};  z_imag = (dd_t){0.0, 0.0};
+            c_real = px;  c_imag = py;
+        }
+
+        int check_cycles = (p->interior_checks & FRACTAL_CHECK_PERIODICITY) && previous_inside;
+        dd_t saved_real = z_real, saved_imag = z_imag;
+        int cycle_window = 1, cycle_steps = 0;
+        int iteration = 0;
+
+        while (iteration < p->max_iterations) {
+            dd_t zr2 = dd_mul(z_real, z_real);
+            dd_t zi2 = dd_mul(z_imag, z_imag);
+            if (zr2.hi + zi2.hi >= p->bailout2) {
+                break;
+            }
+
+            z_imag = dd_add(dd_mul_pow2(dd_mul(z_real, z_imag), 2.0), c_imag);
+            z_real = dd_add(dd_sub(zr2, zi2), c_real);
+            iteration++;
+
+            if (check_cycles) {
+                double d_real = dd_sub(z_real, saved_real).hi;
+                double d_imag = dd_sub(z_imag, saved_imag).hi;
+                if (d_real * d_real + d_imag * d_imag < p->cycle_epsilon2) {
+                    iteration = p->max_iterations;
+                    break;
+                }
+                if (++cycle_steps == cycle_window) {
+                    saved_real = z_real;
+                    saved_imag = z_imag;
+                    cycle_steps = 0;
+                    cycle_window *= 2;
+                }
+            }
+        }
+
+        previous_inside = iteration == p->max_iterations;
+        out[k] = iteration;
+        if (smooth) smooth[k] = smooth_iteration(iteration, z_real.hi, z_imag.hi, p->max_iterations);
     }
 }
 
-CALCULATE_API void calculate_julia(
+/*
+ * SIMD-ядра: 2/4/8 пикселей за раз (SSE2/AVX2/AVX-512)
+ *
+ * Тело ядра одно - escape_kernel.inc, оно подключается несколько раз
+ * с разной шириной вектора и атрибутом target. Выбор варианта делается
+ * один раз при загрузке библиотеки по возможностям процессора
+ */
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__))
+#define FRACTAL_HAVE_X86_SIMD 1
+
+#define KERNEL_NAME point_kernel_sse2
+#define KERNEL_LANES 2
+#define KERNEL_TARGET "sse2"
+#define KERNEL_REAL double
+#define KERNEL_INT long long
+#include "escape_kernel.inc"
+
+#define KERNEL_NAME point_kernel_avx2
+#define KERNEL_LANES 4
+#define KERNEL_TARGET "avx2"
+#define KERNEL_REAL double
+#define KERNEL_INT long long
+#include "escape_kernel.inc"
+
+#define KERNEL_NAME point_kernel_avx512
+#define KERNEL_LANES 8
+#define KERNEL_TARGET "avx512f"
+#define KERNEL_REAL double
+#define KERNEL_INT long long
+#include "escape_kernel.inc"
+
+/*
+ * float32-варианты для неглубоких видов: вдвое больше дорожек в том же регистре
+ */
+#define KERNEL_NAME point_kernel_sse2_float
+#define KERNEL_LANES 4
+#define KERNEL_TARGET "sse2"
+#define KERNEL_REAL float
+#define KERNEL_INT int
+#include "escape_kernel.inc"
+
+#define KERNEL_NAME point_kernel_avx2_float
+#define KERNEL_LANES 8
+#define KERNEL_TARGET "avx2"
+#define KERNEL_REAL float
+#define KERNEL_INT int
+#include "escape_kernel.inc"
+
+#define KERNEL_NAME point_kernel_avx512_float
+#define KERNEL_LANES 16
+#define KERNEL_TARGET "avx512f"
+#define KERNEL_REAL float
+#define KERNEL_INT int
+#include "escape_kernel.inc"
+#endif
+
+typedef struct {
+    const char* name;
+    point_kernel_fn fn;        // double
+    point_kernel_fn fn_float;  // float32 (NULL - считаем в double)
+} KernelVariant;
+
+/*
+ * Таблица вариантов: от самого широкого к запасному скалярному
+ */
+static const KernelVariant kernel_variants[] = {
+#ifdef FRACTAL_HAVE_X86_SIMD
+    {"avx512", point_kernel_avx512, point_kernel_avx512_float},
+    {"avx2", point_kernel_avx2, point_kernel_avx2_float},
+    {"sse2", point_kernel_sse2, point_kernel_sse2_float},
+#endif
+    {"scalar", point_kernel_scalar, NULL},
+};
+
+#define KERNEL_VARIANT_COUNT ((int)(sizeof(kernel_variants) / sizeof(kernel_variants[0])))
+
+static const KernelVariant* active_kernel = &kernel_variants[KERNEL_VARIANT_COUNT - 1];
+
+static int kernel_supported(const KernelVariant* variant) {
+#ifdef FRACTAL_HAVE_X86_SIMD
+    if (strcmp(variant->name, "avx512") == 0) return __builtin_cpu_supports("avx512f");
+    if (strcmp(variant->name, "avx2") == 0) return __builtin_cpu_supports("avx2");
+    if (strcmp(variant->name, "sse2") == 0) return __builtin_cpu_supports("sse2");
+#endif
+    return strcmp(variant->name, "scalar") == 0;
+}
+
+/*
+ * Выбор самого широкого поддерживаемого ядра при загрузке библиотеки
+ */
+#ifdef __GNUC__
+__attribute__((constructor))
+#endif
+static void select_best_kernel(void) {
+#ifdef FRACTAL_HAVE_X86_SIMD
+    __builtin_cpu_init();
+#endif
+    for (int i = 0; i < KERNEL_VARIANT_COUNT; i++) {
+        if (kernel_supported(&kernel_variants[i])) {
+            active_kernel = &kernel_variants[i];
+            return;
+        }
+    }
+}
+
+CALCULATE_API const char* fractal_kernel_variant(void) {
+    return active_kernel->name;
+}
+
+CALCULATE_API void fractal_set_interior_checks(int checks) {
+    default_interior_checks = checks;
+}
+
+CALCULATE_API int fractal_select_kernel(const char* name) {
+    for (int i = 0; i < KERNEL_VARIANT_COUNT; i++) {
+        if (strcmp(kernel_variants[i].name, name) == 0 && kernel_supported(&kernel_variants[i])) {
+            active_kernel = &kernel_variants[i];
+            return 1;
+        }
+    }
+    return 0;
+}
+
+/*
+ * Ядро для нужной точности
+ * Если у варианта нет float32-ядра (скалярный), считаем в double
+ */
+static point_kernel_fn kernel_for_precision(int* precision) {
+    if (*precision == FRACTAL_PRECISION_DOUBLE_DOUBLE) {
+        return point_kernel_double_double;
+    }
+    if (*precision == FRACTAL_PRECISION_FLOAT && active_kernel->fn_float != NULL) {
+        return active_kernel->fn_float;
+    }
+    *precision = FRACTAL_PRECISION_DOUBLE;
+    return active_kernel->fn;
+}
+
+/*
+ * Номер текущего потока OpenMP (0 без OpenMP)
+ */
+static int current_thread(void) {
+#ifdef _OPENMP
+    return omp_get_thread_num();
+#else
+    return 0;
+#endif
+}
+
+/*
+ * Основной цикл по строкам кадра
+ *
+ * Строки раздаются потокам динамически по одной: строки, пересекающие
+ * множество, считаются в разы дольше строк снаружи, и статическое
+ * разбиение оставило бы большинство ядер без работы
+ */
+static void render_rows(const FractalParams* p, point_kernel_fn kernel, int* output,
+                        float* smooth, double* orbit, int num_threads) {
+    int threads = resolve_num_threads(num_threads);
+
+    // Номера столбцов общие, номер строки - свой буфер у каждого потока
+    int* columns = malloc(sizeof(int) * p->width);
+    int* rows = malloc(sizeof(int) * p->width * threads);
+    if (columns == NULL || rows == NULL) {
+        free(columns);
+        free(rows);
+        return;
+    }
+    for (int x = 0; x < p->width; x++) {
+        columns[x] = x;
+    }
+    render_start(p->control, p->height);
+
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+    {
+        int* row = rows + (size_t)current_thread() * p->width;
+
+        #pragma omp for schedule(dynamic, 1)
+        for (int y = 0; y < p->height; y++) {
+            // Из omp for нельзя выйти break: после отмены оставшиеся строки пропускаются
+            if (render_cancelled(p->control)) {
+                continue;
+            }
+            for (int x = 0; x < p->width; x++) {
+                row[x] = y;
+            }
+            kernel(p, columns, row, p->width, output + (size_t)y * p->width,
+                   smooth ? smooth + (size_t)y * p->width : NULL,
+                   orbit ? orbit + (size_t)y * p->width * 2 : NULL);
+            render_progress(p->control);
+        }
+    }
+
+    free(columns);
+    free(rows);
+}
+
+/*
+ * Дозаполнение кадра (FRACTAL_RENDER_MISSING)
+ *
+ * output уже содержит известные итерации (из более грубого уровня,
+ * сдвинутого кадра или кэша), а -1 отмечает пиксели, которые нужно
+ * посчитать. Ядро получает только эти пиксели строки, остальные не меняются
+ */
+static void render_missing(const FractalParams* p, point_kernel_fn kernel, int* output,
+                           float* smooth, double* orbit, int num_threads) {
+    int threads = resolve_num_threads(num_threads);
+
+    // На каждый поток: столбцы, номер строки и итерации пропущенных пикселей
+    int* buffers = malloc(sizeof(int) * p->width * 3 * threads);
+    float* smooth_buffers = smooth ? malloc(sizeof(float) * p->width * threads) : NULL;
+    double* orbit_buffers = orbit ? malloc(sizeof(double) * p->width * 2 * threads) : NULL;
+    if (buffers == NULL || (smooth && smooth_buffers == NULL) || (orbit && orbit_buffers == NULL)) {
+        free(buffers);
+        free(smooth_buffers);
+        free(orbit_buffers);
+        return;
+    }
+    render_start(p->control, p->height);
+
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+    {
+        int* xs = buffers + (size_t)current_thread() * p->width * 3;
+        int* ys = xs + p->width;
+        int* values = ys + p->width;
+        float* smooth_values = smooth ? smooth_buffers + (size_t)current_thread() * p->width : NULL;
+        double* orbit_values = orbit ? orbit_buffers + (size_t)current_thread() * p->width * 2 : NULL;
+
+        #pragma omp for schedule(dynamic, 1)
+        for (int y = 0; y < p->height; y++) {
+            if (render_cancelled(p->control)) {
+                continue;
+            }
+            int* out_row = output + (size_t)y * p->width;
+            int count = 0;
+            for (int x = 0; x < p->width; x++) {
+                if (out_row[x] < 0) {
+                    xs[count] = x;
+                    ys[count] = y;
+                    count++;
+                }
+            }
+            if (count > 0) {
+                kernel(p, xs, ys, count, values, smooth_values, orbit_values);
+                for (int k = 0; k < count; k++) {
+                    size_t index = (size_t)y * p->width + xs[k];
+                    out_row[xs[k]] = values[k];
+                    if (smooth) smooth[index] = smooth_values[k];
+                    if (orbit) {
+                        orbit[2 * index] = orbit_values[2 * k];
+                        orbit[2 * index + 1] = orbit_values[2 * k + 1];
+                    }
+                }
+            }
+            render_progress(p->control);
+        }
+    }
+
+    free(buffers);
+    free(smooth_buffers);
+    free(orbit_buffers);
+}
+
+/*
+ * Режим угадывания (алгоритм Мариани-Сильвера)
+ *
+ * Кадр делится на блоки GUESS_BLOCK x GUESS_BLOCK, у каждого блока
+ * считается только граница. Если на всей границе одинаковое число итераций,
+ * внутренность заливается этим значением без вычислений. Иначе блок
+ * делится пополам по длинной стороне (линия раздела считается) и каждая
+ * половина проверяется так же. Маленькие прямоугольники считаются целиком
+ */
+#define GUESS_BLOCK 64
+#define GUESS_MIN_SIZE 4
+
+typedef struct {
+    const FractalParams* p;
+    point_kernel_fn kernel;
+    int* output;
+    float* smooth;          // NULL, если дробные итерации не нужны
+    int* xs;                // Буферы на GUESS_BLOCK * GUESS_BLOCK точек
+    int* ys;
+    int* values;
+    float* smooth_values;
+} GuessContext;
+
+static void guess_compute_points(GuessContext* g, int count) {
+    if (count == 0 || render_cancelled(g->p->control)) {
+        return;
+    }
+    g->kernel(g->p, g->xs, g->ys, count, g->values, g->smooth ? g->smooth_values : NULL, NULL);
+    for (int k = 0; k < count; k++) {
+        size_t index = (size_t)g->ys[k] * g->p->width + g->xs[k];
+        g->output[index] = g->values[k];
+        if (g->smooth) g->smooth[index] = g->smooth_values[k];
+    }
+}
+
+/*
+ * Считает все пиксели прямоугольника [x0, x1] x [y0, y1] (границы включительно)
+ */
+static void guess_compute_rect(GuessContext* g, int x0, int y0, int x1, int y1) {
+    int count = 0;
+    for (int y = y0; y <= y1; y++) {
+        for (int x = x0; x <= x1; x++) {
+            g->xs[count] = x;
+            g->ys[count] = y;
+            count++;
+        }
+    }
+    guess_compute_points(g, count);
+}
+
+/*
+ * Дробные итерации внутри однородного прямоугольника: целая часть везде
+ * одна и та же, а дробная плавно меняется, поэтому интерполируем
+ * по строке между левой и правой границей
+ */
+static void guess_fill_smooth(GuessContext* g, int x0, int y0, int x1, int y1) {
+    int width = g->p->width;
+    for (int y = y0 + 1; y < y1; y++) {
+        float* row = g->smooth + (size_t)y * width;
+        float left = row[x0], right = row[x1];
+        for (int x = x0 + 1; x < x1; x++) {
+            row[x] = left + (right - left) * (float)(x - x0) / (float)(x1 - x0);
+        }
+    }
+}
+
+/*
+ * Граница прямоугольника уже посчитана: заливаем, считаем или делим
+ */
+static void guess_rect(GuessContext* g, int x0, int y0, int x1, int y1) {
+    if (x1 - x0 < 2 || y1 - y0 < 2) {
+        return;  // Внутренних пикселей нет
+    }
+    if (render_cancelled(g->p->control)) {
+        return;  // Граница могла остаться недосчитанной - не заливаем
+    }
+
+    int width = g->p->width;
+    int* out = g->output;
+    int value = out[(size_t)y0 * width + x0];
+    int uniform = 1;
+
+    for (int x = x0; x <= x1 && uniform; x++) {
+        uniform = out[(size_t)y0 * width + x] == value && out[(size_t)y1 * width + x] == value;
+    }
+    for (int y = y0 + 1; y < y1 && uniform; y++) {
+        uniform = out[(size_t)y * width + x0] == value && out[(size_t)y * width + x1] == value;
+    }
+
+    if (uniform) {
+        for (int y = y0 + 1; y < y1; y++) {
+            for (int x = x0 + 1; x < x1; x++) {
+                out[(size_t)y * width + x] = value;
+            }
+        }
+        if (g->smooth) {
+            guess_fill_smooth(g, x0, y0, x1, y1);
+        }
+        return;
+    }
+
+    if (x1 - x0 <= GUESS_MIN_SIZE || y1 - y0 <= GUESS_MIN_SIZE) {
+        guess_compute_rect(g, x0 + 1, y0 + 1, x1 - 1, y1 - 1);
+        return;
+    }
+
+    if (x1 - x0 >= y1 - y0) {
+        int xm = (x0 + x1) / 2;
+        guess_compute_rect(g, xm, y0 + 1, xm, y1 - 1);
+        guess_rect(g, x0, y0, xm, y1);
+        guess_rect(g, xm, y0, x1, y1);
+    } else {
+        int ym = (y0 + y1) / 2;
+        guess_compute_rect(g, x0 + 1, ym, x1 - 1, ym);
+        guess_rect(g, x0, y0, x1, ym);
+        guess_rect(g, x0, ym, x1, y1);
+    }
+}
+
+static void render_guessing(const FractalParams* p, point_kernel_fn kernel, int* output,
+                            float* smooth, int num_threads) {
+    int threads = resolve_num_threads(num_threads);
+    int blocks_x = (p->width + GUESS_BLOCK - 1) / GUESS_BLOCK;
+    int blocks_y = (p->height + GUESS_BLOCK - 1) / GUESS_BLOCK;
+    size_t buffer_size = (size_t)GUESS_BLOCK * GUESS_BLOCK;
+
+    int* buffers = malloc(sizeof(int) * buffer_size * 3 * threads);
+    float* smooth_buffers = smooth ? malloc(sizeof(float) * buffer_size * threads) : NULL;
+    if (buffers == NULL || (smooth && smooth_buffers == NULL)) {
+        free(buffers);
+        free(smooth_buffers);
+        return;
+    }
+
+    render_start(p->control, blocks_x * blocks_y);
+
+    #pragma omp parallel num_threads(threads) if(threads > 1)
+    {
+        int* own = buffers + buffer_size * 3 * current_thread();
+        float* own_smooth = smooth ? smooth_buffers + buffer_size * current_thread() : NULL;
+        GuessContext g = {p, kernel, output, smooth,
+                          own, own + buffer_size, own + 2 * buffer_size, own_smooth};
+
+        #pragma omp for schedule(dynamic, 1)
+        for (int block = 0; block < blocks_x * blocks_y; block++) {
+            if (render_cancelled(p->control)) {
+                continue;
+            }
+            int x0 = (block % blocks_x) * GUESS_BLOCK;
+            int y0 = (block / blocks_x) * GUESS_BLOCK;
+            int x1 = (x0 + GUESS_BLOCK < p->width ? x0 + GUESS_BLOCK : p->width) - 1;
+            int y1 = (y0 + GUESS_BLOCK < p->height ? y0 + GUESS_BLOCK : p->height) - 1;
+
+            // Граница блока: верхняя и нижняя строки, затем боковые столбцы
+            int count = 0;
+            for (int x = x0; x <= x1; x++) {
+                g.xs[count] = x;  g.ys[count] = y0;  count++;
+                if (y1 > y0) {
+                    g.xs[count] = x;  g.ys[count] = y1;  count++;
+                }
+            }
+            for (int y = y0 + 1; y < y1; y++) {
+                g.xs[count] = x0;  g.ys[count] = y;  count++;
+                if (x1 > x0) {
+                    g.xs[count] = x1;  g.ys[count] = y;  count++;
+                }
+            }
+            guess_compute_points(&g, count);
+            guess_rect(&g, x0, y0, x1, y1);
+            render_progress(p->control);
+        }
+    }
+
+    free(buffers);
+    free(smooth_buffers);
+}
+
+/*
+ * Возвращает фактически использованную точность (FRACTAL_PRECISION_*)
+ *
+ * Состояние орбит (orbit) пишется только в режимах FULL и MISSING
+ * и только для точностей float и double: угадывание не итерирует
+ * залитые пиксели, а double-double не сводится к z в double
+ */
+static int render(FractalParams* p, int* output, float* smooth, double* orbit, int num_threads,
+                  int render_mode, int precision) {
+    point_kernel_fn kernel = kernel_for_precision(&precision);
+    if (smooth) {
+        p->bailout2 = SMOOTH_BAILOUT2;
+    }
+    if (precision == FRACTAL_PRECISION_DOUBLE_DOUBLE) {
+        orbit = NULL;
+    }
+    if (render_mode == FRACTAL_RENDER_GUESS) {
+        render_guessing(p, kernel, output, smooth, num_threads);
+    } else if (render_mode == FRACTAL_RENDER_MISSING) {
+        render_missing(p, kernel, output, smooth, orbit, num_threads);
+    } else {
+        render_rows(p, kernel, output, smooth, orbit, num_threads);
+    }
+    return precision;
+}
+
+/*
+ * Вычисление множества Мандельброта
+ *
+ * Алгоритм:
+ * Для каждого пикселя (x,y) мы преобразуем его в координату комплексной плоскости (cx,cy)
+ * Затем итерируем формулу: z_{n+1} = z_n^2 + c, где z0 = 0, c = (cx, cy)
+ * Пиксель принадлежит множеству Мандельброта, если последовательность не уходит в бесконечность
+ */
+CALCULATE_API int calculate_mandelbrot(double center_x, double center_y, double zoom,
+                         int width, int height, int* output, float* smooth, double* orbit,
+                         int max_iterations,
+                         int num_threads, int render_mode,
+                         int precision, double center_x_lo, double center_y_lo,
+                         const FractalRegion* region, FractalControl* control) {
+    FractalParams p = {0};
+    init_view(&p, center_x, center_y, zoom, width, height, max_iterations);
+    apply_region(region, &p.origin_x, &p.origin_y, &p.stride, &p.width, &p.height);
+    p.control = control;
+    p.center_x_lo = center_x_lo;
+    p.center_y_lo = center_y_lo;
+    return render(&p, output, smooth, orbit, num_threads, render_mode, precision);
+}
+
+CALCULATE_API int calculate_julia(
     double c_real, double c_imag,      // Параметр C для Julia
     double center_x, double center_y,
     double zoom,
     int width, int height,
     int* output,
-    int max_iterations
+    float* smooth,                     // Дробные итерации или NULL
+    double* orbit,                     // Состояние орбит или NULL
+    int max_iterations,
+    int num_threads,
+    int render_mode,
+    int precision,
+    double center_x_lo, double center_y_lo,  // Младшие части центра для double-double
+    const FractalRegion* region,             // Прямоугольник кадра или NULL
+    FractalControl* control                  // Отмена и прогресс или NULL
 ) {
-    double scale = 2.0 / zoom;
-    double aspect_ratio = (double)width / height;
-    double world_width = scale;
-    double world_height = scale / aspect_ratio;
-    double pixel_to_real = world_width / width;
-    double pixel_to_imag = world_height / height;
+    // Формула Жюлиа: z = z² + c (c - фиксированный параметр, начальное z = координате пикселя)
+    FractalParams p = {0};
+    init_view(&p, center_x, center_y, zoom, width, height, max_iterations);
+    apply_region(region, &p.origin_x, &p.origin_y, &p.stride, &p.width, &p.height);
+    p.control = control;
+    p.julia = 1;
+    p.c_real = c_real;
+    p.c_imag = c_imag;
+    p.center_x_lo = center_x_lo;
+    p.center_y_lo = center_y_lo;
+    return render(&p, output, smooth, orbit, num_threads, render_mode, precision);
+}
 
-    for (int y = 0; y < height; y++) {
-        for (int x = 0; x < width; x++) {
-            // Начальное z = координате пикселя
-            double z_real = (x - width / 2.0) * pixel_to_real + center_x;
-            double z_imag = (y - height / 2.0) * pixel_to_imag + center_y;
+/*
+ * Продолжение орбит до большего max_iterations
+ *
+ * Пиксели, дошедшие до from_iterations без ухода, не нужно считать с нуля:
+ * z_{from_iterations} сохранён в orbit, и итерации продолжаются с него по той
+ * же формуле, что и в ядрах double (без FMA), поэтому результат совпадает
+ * с расчётом нового кадра с нуля. Циклы ищутся заново, начиная с сохранённого z
+ */
+#define RESUME_CHUNK 256  // Пикселей в одном куске работы (для прогресса и отмены)
+
+#ifdef __GNUC__
+__attribute__((optimize("fp-contract=off")))
+#endif
+static void resume_point(const FractalParams* p, int pixel, int from_iterations,
+                         double* orbit, int* iteration_out, float* smooth_out) {
+    int x = pixel % p->width;
+    int y = pixel / p->width;
+    double px = (x - p->origin_x) * p->pixel_to_real + p->center_x;
+    double py = (y - p->origin_y) * p->pixel_to_imag + p->center_y;
+    double c_real = p->julia ? p->c_real : px;
+    double c_imag = p->julia ? p->c_imag : py;
+    double z_real = orbit[0], z_imag = orbit[1];
+
+    int iteration = from_iterations;
+    int cycled = 0;
+    int check_cycles = p->interior_checks & FRACTAL_CHECK_PERIODICITY;
+    double saved_real = z_real, saved_imag = z_imag;
+    int cycle_window = 1, cycle_steps = 0;
+
+    while (z_real * z_real + z_imag * z_imag < p->bailout2 && iteration < p->max_iterations) {
+        double temp = z_real * z_real - z_imag * z_imag + c_real;
+        z_imag = 2.0 * z_real * z_imag + c_imag;
+        z_real = temp;
+        iteration++;
+
+        if (check_cycles) {
+            double d_real = z_real - saved_real;
+            double d_imag = z_imag - saved_imag;
+            if (d_real * d_real + d_imag * d_imag < p->cycle_epsilon2) {
+                iteration = p->max_iterations;
+                cycled = 1;
+                break;
+            }
+            if (++cycle_steps == cycle_window) {
+                saved_real = z_real;
+                saved_imag = z_imag;
+                cycle_steps = 0;
+                cycle_window *= 2;
+            }
+        }
+    }
+
+    *iteration_out = iteration;
+    if (smooth_out) *smooth_out = smooth_iteration(iteration, z_real, z_imag, p->max_iterations);
+    store_orbit(orbit, 0, iteration == p->max_iterations && !cycled, z_real, z_imag);
+}
+
+CALCULATE_API void resume_orbits(int julia, double c_real, double c_imag,
+                                 double center_x, double center_y, double zoom,
+                                 int width, int height, const int* pixels, int count,
+                                 double* orbit, int* iterations, float* smooth,
+                                 int from_iterations, int max_iterations,
+                                 int num_threads, FractalControl* control) {
+    FractalParams p = {0};
+    init_view(&p, center_x, center_y, zoom, width, height, max_iterations);
+    p.julia = julia;
+    p.c_real = c_real;
+    p.c_imag = c_imag;
+    if (smooth) {
+        p.bailout2 = SMOOTH_BAILOUT2;
+    }
+
+    int threads = resolve_num_threads(num_threads);
+    int chunks = (count + RESUME_CHUNK - 1) / RESUME_CHUNK;
+    render_start(control, chunks);
+
+    #pragma omp parallel for schedule(dynamic, 1) num_threads(threads) if(threads > 1)
+    for (int chunk = 0; chunk < chunks; chunk++) {
+        if (render_cancelled(control)) {
+            continue;
+        }
+        int end = (chunk + 1) * RESUME_CHUNK < count ? (chunk + 1) * RESUME_CHUNK : count;
+        for (int k = chunk * RESUME_CHUNK; k < end; k++) {
+            resume_point(&p, pixels[k], from_iterations, orbit + 2 * (size_t)k, iterations + k,
+                         smooth ? smooth + k : NULL);
+        }
+        render_progress(control);
+    }
+}
+
+/*
+ * Глубокий зум методом возмущений (perturbation theory)
+ *
+ * Когда шаг пикселя меньше точности double, соседние пиксели получают
+ * одинаковые координаты. Поэтому одна опорная орбита Z_n считается
+ * в Python с высокой точностью (Decimal), а для каждого пикселя в double
+ * итерируется только малое отклонение δ от неё:
+ *
+ *   z_n = Z_n + δ_n,   δ_{n+1} = 2 * Z_n * δ_n + δ_n^2 + δc
+ *
+ * Мандельброт: δ_0 = 0, δc = смещение пикселя от опорной точки
+ * Жюлиа:       δ_0 = смещение пикселя, δc = 0
+ *
+ * Первые series_iterations итераций пропускаются с помощью ряда
+ * δ_n ≈ A*d + B*d^2 + C*d^3 (d - смещение пикселя), коэффициенты
+ * которого передаются в series = {A_re, A_im, B_re, B_im, C_re, C_im}
+ *
+ * Глитчи (|z_n| < |δ_n| - отклонение перестаёт быть малым по сравнению
+ * с орбитой) и конец опорной орбиты обрабатываются перебазированием:
+ * δ = z_n - Z_0 и опорная орбита продолжается с начала. После него m = 0
+ * и шаг читает Z_1, поэтому нужна орбита хотя бы из двух точек (более
+ * короткую Python не передаёт - см. perturbation.calculate_perturbation)
+ */
+static void perturbation_row(int julia, const double* ref_real, const double* ref_imag,
+                             int ref_length, const double* series, int series_iterations,
+                             double pixel_spacing, double origin_x, double origin_y,
+                             int stride, int width, int y,
+                             int* out_row, float* smooth_row, int max_iterations,
+                             int missing_only) {
+    double bailout2 = smooth_row ? SMOOTH_BAILOUT2 : ESCAPE_BAILOUT2;
+
+    double d_imag = (y * stride - origin_y) * pixel_spacing;
+
+    for (int x = 0; x < width; x++) {
+        if (missing_only && out_row[x] >= 0) {
+            continue;  // FRACTAL_RENDER_MISSING: пиксель уже посчитан
+        }
+        double d_real = (x * stride - origin_x) * pixel_spacing;
+        double dc_real = julia ? 0.0 : d_real;
+        double dc_imag = julia ? 0.0 : d_imag;
+
+        // Пропуск итераций рядом: δ = A*d + B*d^2 + C*d^3
+        double d2_real = d_real * d_real - d_imag * d_imag;
+        double d2_imag = 2.0 * d_real * d_imag;
+        double d3_real = d2_real * d_real - d2_imag * d_imag;
+        double d3_imag = d2_real * d_imag + d2_imag * d_real;
 
-            int iteration = 0;
+        double delta_real = series[0] * d_real - series[1] * d_imag
+                          + series[2] * d2_real - series[3] * d2_imag
+                          + series[4] * d3_real - series[5] * d3_imag;
+        double delta_imag = series[0] * d_imag + series[1] * d_real
+                          + series[2] * d2_imag + series[3] * d2_real
+                          + series[4] * d3_imag + series[5] * d3_real;
+
+        int iteration = series_iterations;
+        int m = series_iterations;  // Позиция на опорной орбите
+        double z_real = 0.0, z_imag = 0.0;
+
+        while (iteration < max_iterations) {
+            z_real = ref_real[m] + delta_real;
+            z_imag = ref_imag[m] + delta_imag;
+            double z_norm = z_real * z_real + z_imag * z_imag;
+
+            if (z_norm >= bailout2) {
+                break;
+            }
 
-            // Формула Жюлиа: z = z² + c (c - фиксированный параметр)
-            while (z_real * z_real + z_imag * z_imag < 4.0 && iteration < max_iterations) {
-                double temp = z_real * z_real - z_imag * z_imag + c_real;
-                z_imag = 2.0 * z_real * z_imag + c_imag;
-                z_real = temp;
-                iteration++;
+            // Глитч или конец опорной орбиты - перебазирование на её начало
+            if (z_norm < delta_real * delta_real + delta_imag * delta_imag || m == ref_length - 1) {
+                if (ref_length < 2) {
+                    break;  // Орбита из одной точки: шага Z_0 -> Z_1 нет, ref[1] не существует
+                }
+                delta_real = z_real - ref_real[0];
+                delta_imag = z_imag - ref_imag[0];
+                m = 0;
             }
 
-            output[y * width + x] = iteration;
+            double zr = ref_real[m], zi = ref_imag[m];
+            double next_real = 2.0 * (zr * delta_real - zi * delta_imag)
+                             + delta_real * delta_real - delta_imag * delta_imag + dc_real;
+            double next_imag = 2.0 * (zr * delta_imag + zi * delta_real)
+                             + 2.0 * delta_real * delta_imag + dc_imag;
+            delta_real = next_real;
+            delta_imag = next_imag;
+
+            m++;
+            iteration++;
         }
+
+        out_row[x] = iteration;
+        if (smooth_row) smooth_row[x] = smooth_iteration(iteration, z_real, z_imag, max_iterations);
     }
-}
\ No newline at end of file
+}
+
+CALCULATE_API void calculate_perturbation(int julia,
+                                          const double* ref_real, const double* ref_imag,
+                                          int ref_length,
+                                          const double* series, int series_iterations,
+                                          double pixel_spacing, int width, int height,
+                                          int* output, float* smooth, int max_iterations,
+                                          int num_threads, int render_mode,
+                                          const FractalRegion* region, FractalControl* control) {
+    int threads = resolve_num_threads(num_threads);
+    double origin_x = width / 2.0, origin_y = height / 2.0;
+    int stride = 1;
+    apply_region(region, &origin_x, &origin_y, &stride, &width, &height);
+    render_start(control, height);
+
+    #pragma omp parallel for schedule(dynamic, 1) num_threads(threads) if(threads > 1)
+    for (int y = 0; y < height; y++) {
+        if (render_cancelled(control)) {
+            continue;
+        }
+        perturbation_row(julia, ref_real, ref_imag, ref_length, series, series_iterations,
+                         pixel_spacing, origin_x, origin_y, stride, width, y,
+                         output + (size_t)y * width,
+                         smooth ? smooth + (size_t)y * width : NULL, max_iterations,
+                         render_mode == FRACTAL_RENDER_MISSING);
+        render_progress(control);
+    }
+}
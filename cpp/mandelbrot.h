@@ -18,6 +18,50 @@ extern "C" {
 #else
 #define CALCULATE_API __attribute__((visibility("default")))
 #endif
+    /*
+     * Режимы расчёта кадра
+     */
+#define FRACTAL_RENDER_FULL 0   // Каждый пиксель итерируется отдельно
+#define FRACTAL_RENDER_GUESS 1  // Мариани-Сильвер: однородные прямоугольники заливаются по границе
+#define FRACTAL_RENDER_MISSING 2  // Только пиксели с output < 0, остальные уже известны и не меняются
+
+    /*
+     * Точность итераций (выбирается по шагу пикселя)
+     */
+#define FRACTAL_PRECISION_DOUBLE 0         // Средние зумы
+#define FRACTAL_PRECISION_FLOAT 1          // Неглубокие виды: float32 SIMD, вдвое больше дорожек
+#define FRACTAL_PRECISION_DOUBLE_DOUBLE 2  // Зумы ~1e13..1e28, пока не нужен метод возмущений
+
+    /*
+     * Управление идущим расчётом из другого потока
+     *
+     * Вызывающий обнуляет структуру и может в любой момент выставить cancel = 1:
+     * потоки проверяют флаг перед каждой строкой (в режиме угадывания - перед
+     * каждым куском работы) и быстро завершаются, оставляя output недосчитанным.
+     * work_done атомарно растёт по мере готовности строк (блоков в режиме
+     * угадывания), work_total библиотека заполняет в начале расчёта
+     */
+    typedef struct {
+        volatile int cancel;
+        volatile int work_done;
+        volatile int work_total;
+    } FractalControl;
+
+    /*
+     * Прямоугольник кадра, который нужно посчитать (в пикселях всего кадра)
+     *
+     * Элемент (i, j) output - пиксель кадра (x + i * stride, y + j * stride),
+     * stride <= 1 - каждый пиксель. Координаты пикселей считаются так же,
+     * как для всего кадра, поэтому результат совпадает с соответствующими
+     * пикселями полного расчёта бит в бит.
+     * output (и smooth) тогда имеет размер region->width * region->height
+     */
+    typedef struct {
+        int x, y;
+        int width, height;
+        int stride;
+    } FractalRegion;
+
     /*
      * Вычисление множества Мандельброта
      *
@@ -26,16 +70,109 @@ extern "C" {
      *   zoom               - уровень масштабирования (1.0 = стандартный вид)
      *   width, height      - размеры выходного изображения в пикселях
      *   output             - указатель на массив для результатов (width * height)
+     *   smooth             - массив float (width * height) для дробного числа итераций
+     *                        (сглаженная раскраска) или NULL, если оно не нужно.
+     *                        Считается за тот же проход с радиусом ухода 256,
+     *                        поэтому целые итерации тогда больше на 2-3
+     *   orbit              - массив double (2 * width * height) для состояния орбит
+     *                        или NULL: для пикселя, дошедшего до max_iterations без
+     *                        ухода, - последнее z (re, im), для остальных посчитанных - INFINITY.
+     *                        Пишется только в режимах FULL и MISSING с точностью float
+     *                        или double, см. resume_orbits
      *   max_iterations     - максимальное количество итераций на пиксель
+     *   num_threads        - количество потоков OpenMP (0 - все доступные ядра)
+     *   render_mode        - FRACTAL_RENDER_FULL, FRACTAL_RENDER_GUESS или FRACTAL_RENDER_MISSING
+     *                        (дозаполнение: output на входе содержит уже известные
+     *                        итерации и -1 там, где их нужно посчитать)
+     *   precision          - FRACTAL_PRECISION_* (точность итераций)
+     *   center_x_lo, center_y_lo - младшие части центра для double-double (иначе 0)
+     *   region             - считаемый прямоугольник кадра (FractalRegion) или NULL - весь кадр
+     *   control            - отмена и прогресс (FractalControl) или NULL
      *
      * Возвращает:
-     *   void - результат записывается в output массив
+     *   фактически использованную точность FRACTAL_PRECISION_*
+     *   (без SIMD float32 заменяется на double); результат - в output массиве
+     */
+    CALCULATE_API int calculate_mandelbrot(double center_x, double center_y, double zoom,
+                             int width, int height, int* output, float* smooth, double* orbit,
+                             int max_iterations, int num_threads, int render_mode,
+                             int precision, double center_x_lo, double center_y_lo,
+                             const FractalRegion* region, FractalControl* control);
+
+    CALCULATE_API int calculate_julia(double c_real, double c_imag, double center_x, double center_y,
+                             double zoom, int width, int height, int* output, float* smooth,
+                             double* orbit, int max_iterations,
+                             int num_threads, int render_mode,
+                             int precision, double center_x_lo, double center_y_lo,
+                             const FractalRegion* region, FractalControl* control);
+
+    /*
+     * Продолжение орбит, сохранённых calculate_mandelbrot/calculate_julia,
+     * до большего max_iterations (без пересчёта первых from_iterations итераций)
+     *
+     * Параметры:
+     *   julia                  - 0 для Мандельброта, 1 для Жюлиа
+     *   c_real, c_imag         - параметр C для Жюлиа (иначе не используется)
+     *   center_x, center_y, zoom, width, height - вид всего кадра
+     *   pixels                 - индексы пикселей кадра (y * width + x), count штук
+     *   orbit                  - z этих пикселей (2 * count double); на выходе -
+     *                            новое состояние (INFINITY - пиксель завершён)
+     *   iterations             - итерации пикселей (count int) на выходе
+     *   smooth                 - дробные итерации (count float) или NULL; должно
+     *                            совпадать с тем, считались ли они в исходном кадре
+     *   from_iterations        - max_iterations, с которым было сохранено orbit
+     *   max_iterations, num_threads, control - как у calculate_mandelbrot
+     *                            (точность всегда double)
+     */
+    CALCULATE_API void resume_orbits(int julia, double c_real, double c_imag,
+                             double center_x, double center_y, double zoom,
+                             int width, int height, const int* pixels, int count,
+                             double* orbit, int* iterations, float* smooth,
+                             int from_iterations, int max_iterations,
+                             int num_threads, FractalControl* control);
+
+    /*
+     * Глубокий зум методом возмущений
+     *
+     * Параметры:
+     *   julia                  - 0 для Мандельброта, 1 для Жюлиа
+     *   ref_real, ref_imag     - опорная орбита Z_0..Z_{ref_length-1} в центре кадра
+     *   series                 - коэффициенты ряда {A_re, A_im, B_re, B_im, C_re, C_im}
+     *   series_iterations      - сколько итераций пропускается рядом
+     *   pixel_spacing          - шаг пикселя в комплексной плоскости
+     *   width, height, output, smooth, max_iterations, num_threads, region, control -
+     *                            как у calculate_mandelbrot
+     *   render_mode            - FRACTAL_RENDER_MISSING или любой другой (весь кадр)
+     */
+    CALCULATE_API void calculate_perturbation(int julia,
+                             const double* ref_real, const double* ref_imag, int ref_length,
+                             const double* series, int series_iterations,
+                             double pixel_spacing, int width, int height,
+                             int* output, float* smooth, int max_iterations, int num_threads,
+                             int render_mode, const FractalRegion* region, FractalControl* control);
+
+    /*
+     * Проверки, позволяющие не итерировать заведомо внутренние точки
      */
-    CALCULATE_API void calculate_mandelbrot(double center_x, double center_y, double zoom,
-                             int width, int height, int* output, int max_iterations);
+#define FRACTAL_CHECK_CARDIOID 1     // Главная кардиоида и круг периода 2 (только Мандельброт)
+#define FRACTAL_CHECK_PERIODICITY 2  // Поиск циклов орбиты по Бренту (оба фрактала)
 
-    CALCULATE_API void calculate_julia(double c_real, double c_imag, double center_x, double center_y,
-                             double zoom, int width, int height, int* output, int max_iterations);
+    /*
+     * Включает/выключает проверки внутренних точек (маска FRACTAL_CHECK_*)
+     */
+    CALCULATE_API void fractal_set_interior_checks(int checks);
+
+    /*
+     * Имя SIMD-ядра, выбранного при загрузке библиотеки:
+     * "avx512", "avx2", "sse2" или "scalar"
+     */
+    CALCULATE_API const char* fractal_kernel_variant(void);
+
+    /*
+     * Принудительный выбор ядра по имени
+     * Возвращает 0, если вариант неизвестен или не поддерживается процессором
+     */
+    CALCULATE_API int fractal_select_kernel(const char* name);
 
 #ifdef __cplusplus
 }
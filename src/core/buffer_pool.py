@@ -0,0 +1,71 @@
+"""Пул выходных буферов для FractalEngine
+
+При панорамировании кадр пересчитывается на каждое движение мыши, и
+каждый раз новый массив width x height - лишняя аллокация. Пул хранит
+освободившиеся массивы по (форме, типу) и отдаёт их повторно.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class BufferPool:
+    """Потокобезопасный пул массивов NumPy, сгруппированных по форме и dtype
+
+    acquire() берётся в потоке расчёта, а release() обычно вызывает
+    UI-поток, когда кадр заменён новым, поэтому всё под одной блокировкой.
+    Свободных массивов хранится не больше max_free: при смене размера окна
+    старые формы вытесняются первыми
+    """
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._free = OrderedDict()  # (shape, dtype) -> [массивы]
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype):
+        """Свободный массив нужной формы (содержимое не определено)"""
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            arrays = self._free.get(key)
+            if arrays:
+                array = arrays.pop()
+                if not arrays:
+                    del self._free[key]
+                self._count -= 1
+                return array
+        return np.empty(key[0], dtype=key[1])
+
+    def release(self, array):
+        """Возвращает массив в пул (после этого его нельзя использовать)"""
+        if array is None:
+            return
+        # FractalResult и другие представления - возвращаем исходный буфер
+        while array.base is not None and isinstance(array.base, np.ndarray):
+            array = array.base
+        if not array.flags.c_contiguous or not array.flags.owndata:
+            return
+
+        key = (array.shape, array.dtype)
+        with self._lock:
+            arrays = self._free.setdefault(key, [])
+            if any(free is array for free in arrays):
+                return
+            arrays.append(array)
+            self._free.move_to_end(key)
+            self._count += 1
+
+            while self._count > self.max_free:
+                oldest_key, oldest = next(iter(self._free.items()))
+                oldest.pop(0)
+                self._count -= 1
+                if not oldest:
+                    del self._free[oldest_key]
+
+    def clear(self):
+        """Освобождает все свободные массивы"""
+        with self._lock:
+            self._free.clear()
+            self._count = 0
@@ -1,201 +1,170 @@
+"""Цветовые схемы: палитры как массивы NumPy
+
+Палитра - массив uint8 (size, 3) с цветами (r, g, b). Схемы заданы
+векторными выражениями от позиции i в [0, 256), поэтому размер палитры
+может быть любым: 256 - как раньше, 4096 - для плавной раскраски.
+Готовые палитры кэшируются и строятся только при первом обращении
+"""
+import threading
+
 import numpy as np
-from PyQt6.QtGui import QColor
+
+from .coloring import palette_lut
+
+# Размер палитры по умолчанию (индекс - число итераций по модулю размера)
+DEFAULT_LUT_SIZE = 256
+
+
+def _positions(size):
+    """Позиции элементов палитры размера size на шкале [0, 256) исходных схем"""
+    if size < 1:
+        raise ValueError(f"Palette size must be positive: {size}")
+    return np.arange(size) * (256.0 / size)
+
+
+def _stack(r, g, b):
+    """Каналы (числа или массивы) -> палитра uint8 (size, 3); дробные части отбрасываются"""
+    channels = np.broadcast_arrays(r, g, b)
+    return np.clip(np.floor(np.stack(channels, axis=1)), 0, 255).astype(np.uint8)
 
 
 class ColorSchemes:
+    # Встроенные схемы в порядке показа в интерфейсе
+    SCHEME_NAMES = ("classic", "rainbow", "fire", "ocean", "forest", "pink_dream", "neon", "sunset")
+
+    _palettes = {}  # (имя, размер) -> палитра uint8 (только для чтения)
+    _luts = {}  # (имя, размер) -> палитра uint32 0xFFRRGGBB
+    _lock = threading.Lock()
+
     @staticmethod
-    def get_scheme(scheme_name):
-        schemes = {
-            "classic": ColorSchemes.classic_scheme(),
-            "rainbow": ColorSchemes.rainbow_scheme(),
-            "fire": ColorSchemes.fire_scheme(),
-            "ocean": ColorSchemes.ocean_scheme(),
-            "forest": ColorSchemes.forest_scheme(),
-            "pink_dream": ColorSchemes.pink_dream_scheme(),
-            "neon": ColorSchemes.neon_scheme(),
-            "sunset": ColorSchemes.sunset_scheme()
-        }
-        return schemes.get(scheme_name, ColorSchemes.classic_scheme())
+    def get_scheme(scheme_name, size=DEFAULT_LUT_SIZE):
+        """Палитра схемы - массив uint8 (size, 3); неизвестное имя - классическая схема
+
+        Результат общий для всех вызовов и доступен только для чтения
+        """
+        if scheme_name not in ColorSchemes.SCHEME_NAMES:
+            scheme_name = "classic"
+        key = (scheme_name, size)
+        palette = ColorSchemes._palettes.get(key)
+        if palette is None:
+            palette = getattr(ColorSchemes, f"{scheme_name}_scheme")(size)
+            palette.flags.writeable = False
+            with ColorSchemes._lock:
+                palette = ColorSchemes._palettes.setdefault(key, palette)
+        return palette
 
     @staticmethod
-    def classic_scheme():
+    def get_lut(scheme_name, size=DEFAULT_LUT_SIZE):
+        """Палитра схемы как uint32 0xFFRRGGBB (coloring.palette_lut), тоже из кэша"""
+        if scheme_name not in ColorSchemes.SCHEME_NAMES:
+            scheme_name = "classic"
+        key = (scheme_name, size)
+        lut = ColorSchemes._luts.get(key)
+        if lut is None:
+            lut = palette_lut(ColorSchemes.get_scheme(scheme_name, size))
+            lut.flags.writeable = False
+            with ColorSchemes._lock:
+                lut = ColorSchemes._luts.setdefault(key, lut)
+        return lut
+
+    @staticmethod
+    def classic_scheme(size=DEFAULT_LUT_SIZE):
         """Классическая сине-белая схема"""
-        colors = []
-        for i in range(256):
-            if i < 64:
-                r, g, b = 0, 0, i * 4
-            elif i < 128:
-                r, g, b = 0, (i - 64) * 4, 255
-            elif i < 192:
-                r, g, b = (i - 128) * 4, 255, 255
-            else:
-                r, g, b = 255, 255, 255
-            colors.append((r, g, b))
-        return colors
+        i = _positions(size)
+        r = np.select([i < 128, i < 192], [0, (i - 128) * 4], 255)
+        g = np.select([i < 64, i < 128], [0, (i - 64) * 4], 255)
+        b = np.where(i < 64, i * 4, 255)
+        return _stack(r, g, b)
 
     @staticmethod
-    def rainbow_scheme():
+    def rainbow_scheme(size=DEFAULT_LUT_SIZE):
         """Радужная схема"""
-        colors = []
-        for i in range(256):
-            # Плавный переход через все цвета радуги
-            hue = (i / 256.0) * 360
-            color = QColor.fromHsv(int(hue), 255, 255)
-            colors.append((color.red(), color.green(), color.blue()))
-        return colors
+        # Плавный переход через все цвета радуги: HSV с полной насыщенностью и яркостью
+        sector = _positions(size) / 256.0 * 6
+        f = sector % 1
+        rising, falling = np.round(f * 255), np.round((1 - f) * 255)
+        channels = []
+        for offset in (1, 5, 3):  # Сдвиг сектора для r, g, b
+            k = (sector.astype(int) + offset) % 6
+            channels.append(np.select([k < 2, k == 2, k < 5], [255, falling, 0], rising))
+        return _stack(*channels)
 
     @staticmethod
-    def fire_scheme():
+    def fire_scheme(size=DEFAULT_LUT_SIZE):
         """Огненная схема"""
-        colors = []
-        for i in range(256):
-            if i < 85:
-                r = i * 3
-                g = 0
-                b = 0
-            elif i < 170:
-                r = 255
-                g = (i - 85) * 3
-                b = 0
-            else:
-                r = 255
-                g = 255
-                b = (i - 170) * 3
-            colors.append((r, g, b))
-        return colors
+        i = _positions(size)
+        r = np.where(i < 85, i * 3, 255)
+        g = np.select([i < 85, i < 170], [0, (i - 85) * 3], 255)
+        b = np.where(i < 170, 0, (i - 170) * 3)
+        return _stack(r, g, b)
 
     @staticmethod
-    def ocean_scheme():
+    def ocean_scheme(size=DEFAULT_LUT_SIZE):
         """Океанская схема"""
-        colors = []
-        for i in range(256):
-            # От темно-синего к бирюзовому и белому
-            if i < 128:
-                r = 0
-                g = i * 2
-                b = 128 + i
-            else:
-                r = (i - 128) * 2
-                g = 255
-                b = 255
-            colors.append((r, g, b))
-        return colors
+        # От темно-синего к бирюзовому и белому
+        i = _positions(size)
+        r = np.where(i < 128, 0, (i - 128) * 2)
+        g = np.where(i < 128, i * 2, 255)
+        b = np.where(i < 128, 128 + i, 255)
+        return _stack(r, g, b)
 
     @staticmethod
-    def forest_scheme():
+    def forest_scheme(size=DEFAULT_LUT_SIZE):
         """Лесная схема"""
-        colors = []
-        for i in range(256):
-            # От темно-зеленого к салатовому и белому
-            if i < 100:
-                r = 0
-                g = 50 + i * 2
-                b = 0
-            elif i < 200:
-                r = (i - 100) * 2
-                g = 255
-                b = (i - 100)
-            else:
-                r = 255
-                g = 255
-                b = 200 + (i - 200)
-            colors.append((r, g, b))
-        return colors
+        # От темно-зеленого к салатовому и белому
+        i = _positions(size)
+        r = np.select([i < 100, i < 200], [0, (i - 100) * 2], 255)
+        g = np.where(i < 100, 50 + i * 2, 255)
+        b = np.select([i < 100, i < 200], [0, i - 100], 200 + (i - 200))
+        return _stack(r, g, b)
 
     @staticmethod
-    def pink_dream_scheme():
+    def pink_dream_scheme(size=DEFAULT_LUT_SIZE):
         """Розовый шёлк - очень мягкий и элегантный 🌸
         надеюсь вам очень понравиться этот цвет, лично я ослеп"""
-        colors = []
-        for i in range(256):
-            # Очень плавные переходы как у шёлка
-            if i < 90:
-                # От кремово-розового к нежно-розовому
-                t = i / 90.0
-                r = 245 + int(10 * t)  # 245 → 255
-                g = 225 + int(15 * t)  # 225 → 240
-                b = 235 + int(15 * t)  # 235 → 250
-            elif i < 160:
-                # Нежно-розовый → сиренево-розовый
-                t = (i - 90) / 70.0
-                r = 255
-                g = 240 - int(25 * t)  # 240 → 215
-                b = 250 - int(20 * t)  # 250 → 230
-            elif i < 220:
-                # Сиренево-розовый → лавандовый
-                t = (i - 160) / 60.0
-                r = 255 - int(20 * t)  # 255 → 235
-                g = 215 - int(10 * t)  # 215 → 205
-                b = 230 + int(25 * t)  # 230 → 255
-            else:
-                # К белому с лавандовым оттенком
-                t = (i - 220) / 36.0
-                r = 235 + int(20 * t)  # 235 → 255
-                g = 205 + int(50 * t)  # 205 → 255
-                b = 255
-
-            colors.append((r, g, b))
-        return colors
+        # Очень плавные переходы как у шёлка: четыре участка со своим t от 0 до 1
+        i = _positions(size)
+        segments = [i < 90, i < 160, i < 220]
+        t = np.select(segments, [i / 90.0, (i - 90) / 70.0, (i - 160) / 60.0], (i - 220) / 36.0)
+        r = np.select(segments, [245 + np.floor(10 * t), 255, 255 - np.floor(20 * t)],
+                      235 + np.floor(20 * t))
+        g = np.select(segments, [225 + np.floor(15 * t), 240 - np.floor(25 * t), 215 - np.floor(10 * t)],
+                      205 + np.floor(50 * t))
+        b = np.select(segments, [235 + np.floor(15 * t), 250 - np.floor(20 * t), 230 + np.floor(25 * t)],
+                      255)
+        return _stack(r, g, b)
 
     @staticmethod
-    def neon_scheme():
+    def neon_scheme(size=DEFAULT_LUT_SIZE):
         """Неоновая схема"""
-        colors = []
-        for i in range(256):
-            # Яркие неоновые цвета
-            phase = (i / 256.0) * 3.14159 * 2
-            r = int(128 + 127 * np.sin(phase))
-            g = int(128 + 127 * np.sin(phase + 2.094))
-            b = int(128 + 127 * np.sin(phase + 4.188))
-            colors.append((r, g, b))
-        return colors
+        # Яркие неоновые цвета
+        phase = (_positions(size) / 256.0) * 3.14159 * 2
+        return _stack(128 + 127 * np.sin(phase),
+                      128 + 127 * np.sin(phase + 2.094),
+                      128 + 127 * np.sin(phase + 4.188))
 
     @staticmethod
-    def sunset_scheme():
+    def sunset_scheme(size=DEFAULT_LUT_SIZE):
         """Схема заката"""
-        colors = []
-        for i in range(256):
-            # От оранжевого к красному и фиолетовому
-            if i < 100:
-                r = 255
-                g = 100 + i
-                b = 0
-            elif i < 180:
-                r = 255
-                g = 200 - (i - 100)
-                b = (i - 100) * 3
-            else:
-                r = 255 - (i - 180)
-                g = 50
-                b = 255
-            colors.append((r, g, b))
-        return colors
+        # От оранжевого к красному и фиолетовому
+        i = _positions(size)
+        segments = [i < 100, i < 180]
+        r = np.where(i < 180, 255, 255 - (i - 180))
+        g = np.select(segments, [100 + i, 200 - (i - 100)], 50)
+        b = np.select(segments, [0, (i - 100) * 3], 255)
+        return _stack(r, g, b)
 
     @staticmethod
-    def custom_scheme(colors_list):
-        """Кастомная схема из списка цветов"""
+    def custom_scheme(colors_list, size=DEFAULT_LUT_SIZE):
+        """Кастомная схема из списка цветов
+
+        Цвета равномерно расставляются по палитре (первый - в начале,
+        последний - в конце), между ними - линейная интерполяция
+        """
         if len(colors_list) < 2:
-            return ColorSchemes.classic_scheme()
-
-        # Интерполяция между цветами
-        colors = []
-        steps = 256
-        segments = len(colors_list) - 1
-        steps_per_segment = steps // segments
-
-        for seg in range(segments):
-            start_color = colors_list[seg]
-            end_color = colors_list[seg + 1]
-
-            for i in range(steps_per_segment):
-                t = i / steps_per_segment
-                r = int(start_color[0] + (end_color[0] - start_color[0]) * t)
-                g = int(start_color[1] + (end_color[1] - start_color[1]) * t)
-                b = int(start_color[2] + (end_color[2] - start_color[2]) * t)
-                colors.append((r, g, b))
-
-        # Добавляем оставшиеся шаги
-        while len(colors) < 256:
-            colors.append(colors_list[-1])
-
-        return colors[:256]
\ No newline at end of file
+            return ColorSchemes.classic_scheme(size)
+
+        colors = np.asarray(colors_list, dtype=np.float64).reshape(-1, 3)
+        stops = np.linspace(0, size - 1, len(colors))
+        positions = np.arange(size)
+        return _stack(*(np.interp(positions, stops, colors[:, channel]) for channel in range(3)))
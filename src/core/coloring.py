@@ -0,0 +1,119 @@
+"""Раскраска итераций в пиксели 0xFFRRGGBB (формат QImage.Format_RGB32)
+
+Палитра хранится как массив uint32 (LUT), и кадр раскрашивается одной
+векторной выборкой lut[data % n] вместо вызова Python на каждый пиксель.
+Для выравнивания гистограммы LUT строится по кадру (IterationHistogram).
+Пиксели показываются через QImage поверх того же буфера (image_from_pixels)
+"""
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtGui import QImage
+
+# Цвет непосчитанных (-1) и внутренних (max_iterations) пикселей
+INTERIOR_COLOR = 0xFF000000
+
+
+def palette_lut(colors):
+    """Список (r, g, b) -> массив uint32 0xFFRRGGBB той же длины"""
+    rgb = np.asarray(colors, dtype=np.uint32).reshape(-1, 3)
+    if len(rgb) == 0:
+        raise ValueError("Palette must contain at least one color")
+    return INTERIOR_COLOR | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+
+def colorize(data, lut, max_iterations=None, out=None):
+    """Раскрашивает итерации data по палитре lut (palette_lut)
+
+    Пиксель получает lut[data % len(lut)]; непосчитанные (data < 0) и, если
+    задан max_iterations, внутренние (data >= max_iterations) - INTERIOR_COLOR.
+    out - массив uint32 формы data.shape (можно срез буфера изображения),
+    без него создаётся новый
+    """
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint32)
+    elif out.shape != data.shape:
+        raise ValueError(f"Output buffer shape {out.shape} does not match {data.shape}")
+    # mode="wrap" берёт индекс по модулю длины палитры
+    np.take(lut, data, out=out, mode='wrap')
+    interior = data < 0
+    if max_iterations is not None:
+        interior |= data >= max_iterations
+    out[interior] = INTERIOR_COLOR
+    return out
+
+
+def image_from_pixels(pixels):
+    """QImage поверх массива uint32 (height, width) 0xFFRRGGBB без копирования
+
+    Изображение и массив делят память: раскраска в массив сразу видна в
+    изображении, а рисование QPainter меняет массив. Массив прикреплён
+    к изображению и живёт, пока живёт оно
+    """
+    height, width = pixels.shape
+    image = QImage(sip.voidptr(pixels.ctypes.data), width, height, pixels.strides[0],
+                   QImage.Format.Format_RGB32)
+    image.pixels = pixels
+    return image
+
+
+def image_pixels(image):
+    """Память изображения RGB32 как массив uint32 (height, width) для записи на месте
+
+    bits() отделяет изображение от неявно разделяемых копий, поэтому запись
+    всегда попадает в то изображение, которое показывается
+    """
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint32).reshape(image.height(), image.bytesPerLine() // 4)
+    return rows[:, :image.width()]
+
+
+class IterationHistogram:
+    """Гистограмма итераций показанного кадра - для раскраски с выравниванием
+
+    counts[i + 1] - сколько пикселей с i итерациями (counts[0] - непосчитанные -1).
+    Кадр, собираемый по тайлам, обновляется за O(размер тайла): replace()
+    вычитает пиксели, которые были на месте тайла, и добавляет новые
+    """
+
+    def __init__(self, data=None):
+        self.reset(data)
+
+    def reset(self, data=None):
+        """Очищает гистограмму и, если задан data, строит её заново по нему"""
+        self.counts = np.zeros(0, dtype=np.int64)
+        if data is not None:
+            self.add(data)
+
+    def add(self, data, sign=1):
+        """Добавляет пиксели data (sign=-1 - вычитает)"""
+        bins = np.bincount(np.asarray(data).ravel() + 1)
+        if len(bins) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(bins) - len(self.counts)))
+        self.counts[:len(bins)] += sign * bins
+
+    def replace(self, old, new):
+        """Пиксели old на месте куска кадра заменяются на new"""
+        self.add(old, -1)
+        self.add(new)
+
+    def equalized_indices(self, palette_size, max_iterations):
+        """Индекс палитры для каждой итерации 0..max_iterations-1 при выравнивании
+
+        Итерация i получает позицию по доле ушедших пикселей с числом
+        итераций не больше i (CDF), поэтому цвета палитры делятся между
+        пикселями поровну, как бы узко ни лежали итерации кадра.
+        Пока ушедших пикселей нет - обычная раскраска i % palette_size
+        """
+        counts = self.counts[1:max_iterations + 1]
+        total = counts.sum()
+        if total == 0:
+            return np.arange(max_iterations) % palette_size
+        cdf = np.cumsum(counts, dtype=np.float64) / total
+        indices = np.full(max_iterations, palette_size - 1, dtype=np.intp)  # Итерации, которых в кадре ещё не было
+        indices[:len(cdf)] = np.minimum((cdf * palette_size).astype(np.intp), palette_size - 1)
+        return indices
+
+    def equalized_lut(self, lut, max_iterations):
+        """LUT длины max_iterations с выравниванием гистограммы (для colorize)"""
+        return lut[self.equalized_indices(len(lut), max_iterations)]
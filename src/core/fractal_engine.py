@@ -2,9 +2,185 @@ import ctypes
 import numpy as np
 import os
 import sys
+import threading
+import time
+
+from . import perturbation
+from .buffer_pool import BufferPool
+from .precision import (
+    PRECISION_CODES, PRECISION_NAMES, PRECISION_TIERS, choose_precision, split_double_double
+)
+
+# Проверки внутренних точек (см. FRACTAL_CHECK_* в mandelbrot.h)
+CHECK_CARDIOID = 1
+CHECK_PERIODICITY = 2
+
+# Режимы расчёта кадра (см. FRACTAL_RENDER_* в mandelbrot.h)
+RENDER_MODES = {
+    "full": 0,   # Каждый пиксель итерируется отдельно
+    "guess": 1,  # Мариани-Сильвер: однородные прямоугольники заливаются по границе
+    "missing": 2,  # Дозаполнение: считаются только элементы out, равные -1
+}
+
+
+def nullable_ndpointer(**kwargs):
+    """ndpointer, который вместо массива принимает и None (NULL в C)"""
+    base = np.ctypeslib.ndpointer(**kwargs)
+
+    def from_param(cls, obj):
+        return None if obj is None else base.from_param(obj)
+
+    return type(base.__name__ + "_or_null", (base,), {'from_param': classmethod(from_param)})
+
+
+# Выходные буферы: ctypes сам проверяет тип, размерность и непрерывность массива
+INT_BUFFER = np.ctypeslib.ndpointer(dtype=np.intc, ndim=2, flags='C_CONTIGUOUS,WRITEABLE')
+SMOOTH_BUFFER = nullable_ndpointer(dtype=np.float32, ndim=2, flags='C_CONTIGUOUS,WRITEABLE')
+ORBIT_BUFFER = nullable_ndpointer(dtype=np.float64, ndim=3, flags='C_CONTIGUOUS,WRITEABLE')
+
+# Предел памяти на состояние орбит одного кадра: 16 байт на незавершённый пиксель,
+# кадр 1920x1080, целиком лежащий внутри множества, - около 32 МБ. Тот же предел
+# у буфера орбит одного расчёта (ORBIT_PIXEL_BYTES на каждый пиксель куска)
+MAX_ORBIT_BYTES = 32 * 1024 * 1024
+
+# Буфер орбит: z (два double) на пиксель - в 4 раза больше кадра итераций intc
+ORBIT_PIXEL_BYTES = 2 * 8
+
+# Свободных массивов в пуле буферов движка
+BUFFER_POOL_SIZE = 16
+
+# Точности, для которых библиотека сохраняет состояние орбит
+ORBIT_PRECISIONS = ("float32", "double")
+
+
+class RenderControl(ctypes.Structure):
+    """Отмена и прогресс идущего расчёта (FractalControl в mandelbrot.h)
+
+    Передаётся в calculate_* как control=. Библиотека проверяет cancel
+    перед каждой строкой и увеличивает work_done по мере готовности,
+    поэтому cancel() и progress можно вызывать из другого потока
+    """
+    _fields_ = [
+        ('_cancel', ctypes.c_int),
+        ('work_done', ctypes.c_int),
+        ('work_total', ctypes.c_int),
+    ]
+
+    def cancel(self):
+        """Просит библиотеку прервать расчёт как можно скорее"""
+        self._cancel = 1
+
+    @property
+    def cancelled(self):
+        return bool(self._cancel)
+
+    @property
+    def progress(self):
+        """Доля готовой работы от 0.0 до 1.0"""
+        total = self.work_total
+        return min(self.work_done / total, 1.0) if total > 0 else 0.0
+
+
+class FractalRegion(ctypes.Structure):
+    """Прямоугольник кадра в пикселях с шагом stride (FractalRegion в mandelbrot.h)"""
+    _fields_ = [
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('stride', ctypes.c_int),
+    ]
+
+
+class OrbitState:
+    """Незавершённые орбиты кадра - чтобы поднять max_iterations без пересчёта
+
+    pixels         - индексы пикселей кадра (y * width + x), дошедших до
+                     max_iterations без ухода (intc)
+    z              - последнее z этих пикселей, массив (n, 2) float64
+    interior       - индексы пикселей, доказанно лежащих внутри множества
+                     (кардиоида или цикл орбиты): им продолжение не нужно
+    max_iterations - предел, до которого посчитаны орбиты
+    smooth         - считались ли дробные итерации (у них другой радиус ухода)
+
+    Пиксели кадра с max_iterations, которых нет ни в pixels, ни в interior
+    (например, взятые из кэша), при продолжении считаются заново
+    """
+
+    def __init__(self, pixels, z, interior, max_iterations, smooth):
+        self.pixels = np.asarray(pixels, dtype=np.intc)
+        self.z = np.asarray(z, dtype=np.float64).reshape(-1, 2)
+        self.interior = np.asarray(interior, dtype=np.intc)
+        self.max_iterations = max_iterations
+        self.smooth = smooth
+
+    @property
+    def nbytes(self):
+        return self.pixels.nbytes + self.z.nbytes + self.interior.nbytes
+
+    @classmethod
+    def merge(cls, states, max_bytes=MAX_ORBIT_BYTES):
+        """Объединяет состояния кусков одного кадра (None пропускаются)
+
+        Возвращает None, если объединять нечего, куски посчитаны с разными
+        настройками или результат больше max_bytes
+        """
+        states = [state for state in states if state is not None]
+        if not states:
+            return None
+        first = states[0]
+        if any((state.max_iterations, state.smooth) != (first.max_iterations, first.smooth)
+               for state in states):
+            return None
+        if sum(state.nbytes for state in states) > max_bytes:
+            return None
+        return cls(np.concatenate([state.pixels for state in states]),
+                   np.concatenate([state.z for state in states]),
+                   np.concatenate([state.interior for state in states]),
+                   first.max_iterations, first.smooth)
+
+
+class FractalResult(np.ndarray):
+    """Массив итераций (height, width) с метаданными расчёта в атрибуте info
+
+    info: precision   - уровень точности ("float32", "double", ...)
+          kernel      - SIMD-вариант ядра или "perturbation"
+          render_mode - режим расчёта кадра
+          time        - время расчёта в секундах
+          cancelled   - расчёт прерван через control.cancel(), кадр неполный
+          region      - (x, y, width, height) посчитанного прямоугольника кадра
+          stride      - шаг выборки пикселей кадра (1 - каждый пиксель)
+
+    smooth - дробное число итераций (float32, та же форма) или None,
+             если расчёт шёл без smooth=True. При срезах не переносится
+    orbits - OrbitState для продолжения до большего max_iterations или None
+             (расчёт без keep_orbits=True). При срезах не переносится
+    """
+
+    def __new__(cls, array, info=None, smooth=None, orbits=None):
+        result = np.asarray(array).view(cls)
+        result.info = dict(info or {})
+        result.smooth = smooth
+        result.orbits = orbits
+        return result
+
+    def __array_finalize__(self, obj):
+        if obj is not None:
+            self.info = dict(getattr(obj, 'info', {}))
+            self.smooth = None
+            self.orbits = None
 
 
 class FractalEngine:
+    """Обёртка над C-библиотекой фракталов
+
+    Обычно нужен один экземпляр на процесс - get_engine(). Методы расчёта
+    можно вызывать из нескольких потоков одновременно: C-функции не имеют
+    общего состояния, ctypes отпускает GIL на время вызова, а пул буферов
+    защищён блокировкой. select_kernel и set_interior_checks меняют
+    настройки библиотеки для всего процесса
+    """
+
     def __init__(self):
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -29,6 +205,11 @@ class FractalEngine:
             raise FileNotFoundError(f"Не удалось загрузить библиотеку фракталов")
 
         self._setup_function_types()
+        print(f"✅ Ядро вычислений: {self.kernel_variant}")
+
+        # Освободившиеся кадры переиспользуются (см. release). Кроме кадров, в пуле
+        # живут буферы тайлов и орбит: у прогрессивного кадра это около дюжины форм
+        self.buffers = BufferPool(max_free=BUFFER_POOL_SIZE)
 
     def _setup_function_types(self):
         # Mandelbrot
@@ -36,10 +217,18 @@ class FractalEngine:
             ctypes.c_double, ctypes.c_double,  # center_x, center_y
             ctypes.c_double,  # zoom
             ctypes.c_int, ctypes.c_int,  # width, height
-            ctypes.POINTER(ctypes.c_int),  # output
-            ctypes.c_int  # max_iterations
+            INT_BUFFER,  # output
+            SMOOTH_BUFFER,  # smooth (None - не нужен)
+            ORBIT_BUFFER,  # orbit (None - состояние орбит не нужно)
+            ctypes.c_int,  # max_iterations
+            ctypes.c_int,  # num_threads
+            ctypes.c_int,  # render_mode
+            ctypes.c_int,  # precision
+            ctypes.c_double, ctypes.c_double,  # center_x_lo, center_y_lo
+            ctypes.POINTER(FractalRegion),  # region (None - весь кадр)
+            ctypes.POINTER(RenderControl)  # control (None - без отмены)
         ]
-        self.lib.calculate_mandelbrot.restype = None
+        self.lib.calculate_mandelbrot.restype = ctypes.c_int  # использованная точность
 
         # Julia
         self.lib.calculate_julia.argtypes = [
@@ -47,25 +236,362 @@ class FractalEngine:
             ctypes.c_double, ctypes.c_double,  # center_x, center_y
             ctypes.c_double,  # zoom
             ctypes.c_int, ctypes.c_int,  # width, height
-            ctypes.POINTER(ctypes.c_int),  # output
-            ctypes.c_int  # max_iterations
+            INT_BUFFER,  # output
+            SMOOTH_BUFFER,  # smooth (None - не нужен)
+            ORBIT_BUFFER,  # orbit (None - состояние орбит не нужно)
+            ctypes.c_int,  # max_iterations
+            ctypes.c_int,  # num_threads
+            ctypes.c_int,  # render_mode
+            ctypes.c_int,  # precision
+            ctypes.c_double, ctypes.c_double,  # center_x_lo, center_y_lo
+            ctypes.POINTER(FractalRegion),  # region (None - весь кадр)
+            ctypes.POINTER(RenderControl)  # control (None - без отмены)
         ]
-        self.lib.calculate_julia.restype = None
-
-    def calculate_mandelbrot(self, center_x, center_y, zoom, width, height, max_iterations):
-        """Вычисляет множество Мандельброта"""
-        output_array = (ctypes.c_int * (width * height))()
-        self.lib.calculate_mandelbrot(
-            center_x, center_y, zoom,
-            width, height, output_array, max_iterations
-        )
-        return np.ctypeslib.as_array(output_array).reshape(height, width)
-
-    def calculate_julia(self, c_real, c_imag, center_x, center_y, zoom, width, height, max_iterations):
-        """Вычисляет множество Жюлиа"""
-        output_array = (ctypes.c_int * (width * height))()
-        self.lib.calculate_julia(
-            c_real, c_imag, center_x, center_y, zoom,
-            width, height, output_array, max_iterations
-        )
-        return np.ctypeslib.as_array(output_array).reshape(height, width)
\ No newline at end of file
+        self.lib.calculate_julia.restype = ctypes.c_int  # использованная точность
+
+        # Глубокий зум (метод возмущений)
+        self.lib.calculate_perturbation.argtypes = [
+            ctypes.c_int,  # julia
+            ctypes.POINTER(ctypes.c_double), ctypes.POINTER(ctypes.c_double),  # ref_real, ref_imag
+            ctypes.c_int,  # ref_length
+            ctypes.POINTER(ctypes.c_double),  # series
+            ctypes.c_int,  # series_iterations
+            ctypes.c_double,  # pixel_spacing
+            ctypes.c_int, ctypes.c_int,  # width, height
+            INT_BUFFER,  # output
+            SMOOTH_BUFFER,  # smooth
+            ctypes.c_int,  # max_iterations
+            ctypes.c_int,  # num_threads
+            ctypes.c_int,  # render_mode (учитывается только "missing")
+            ctypes.POINTER(FractalRegion),  # region
+            ctypes.POINTER(RenderControl)  # control
+        ]
+        self.lib.calculate_perturbation.restype = None
+
+        # Продолжение орбит до большего max_iterations
+        self.lib.resume_orbits.argtypes = [
+            ctypes.c_int,  # julia
+            ctypes.c_double, ctypes.c_double,  # c_real, c_imag
+            ctypes.c_double, ctypes.c_double,  # center_x, center_y
+            ctypes.c_double,  # zoom
+            ctypes.c_int, ctypes.c_int,  # width, height
+            np.ctypeslib.ndpointer(dtype=np.intc, ndim=1, flags='C_CONTIGUOUS'),  # pixels
+            ctypes.c_int,  # count
+            np.ctypeslib.ndpointer(dtype=np.float64, ndim=2, flags='C_CONTIGUOUS,WRITEABLE'),  # orbit
+            np.ctypeslib.ndpointer(dtype=np.intc, ndim=1, flags='C_CONTIGUOUS,WRITEABLE'),  # iterations
+            nullable_ndpointer(dtype=np.float32, ndim=1, flags='C_CONTIGUOUS,WRITEABLE'),  # smooth
+            ctypes.c_int,  # from_iterations
+            ctypes.c_int,  # max_iterations
+            ctypes.c_int,  # num_threads
+            ctypes.POINTER(RenderControl)  # control
+        ]
+        self.lib.resume_orbits.restype = None
+
+        # Выбор SIMD-ядра (делается библиотекой при загрузке)
+        self.lib.fractal_kernel_variant.argtypes = []
+        self.lib.fractal_kernel_variant.restype = ctypes.c_char_p
+
+        self.lib.fractal_select_kernel.argtypes = [ctypes.c_char_p]
+        self.lib.fractal_select_kernel.restype = ctypes.c_int
+
+        self.lib.fractal_set_interior_checks.argtypes = [ctypes.c_int]
+        self.lib.fractal_set_interior_checks.restype = None
+
+    @property
+    def kernel_variant(self):
+        """Имя выбранного ядра: 'avx512', 'avx2', 'sse2' или 'scalar'"""
+        return self.lib.fractal_kernel_variant().decode()
+
+    def select_kernel(self, variant):
+        """Принудительно выбирает ядро (например, для бенчмарков)
+
+        Возвращает False, если процессор не поддерживает этот вариант
+        """
+        return bool(self.lib.fractal_select_kernel(variant.encode()))
+
+    def set_interior_checks(self, cardioid=True, periodicity=True):
+        """Включает/выключает быстрые проверки внутренних точек
+
+        cardioid    - главная кардиоида и круг периода 2 (только Мандельброт)
+        periodicity - поиск циклов орбиты по Бренту (оба фрактала)
+        """
+        checks = 0
+        if cardioid:
+            checks |= CHECK_CARDIOID
+        if periodicity:
+            checks |= CHECK_PERIODICITY
+        self.lib.fractal_set_interior_checks(checks)
+
+    @staticmethod
+    def _render_mode_code(render_mode):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {render_mode}")
+        return RENDER_MODES[render_mode]
+
+    def release(self, result):
+        """Возвращает буферы кадра в пул, когда кадр больше не нужен
+
+        Следующий расчёт того же размера запишет результат в них же,
+        поэтому после release массив (и result.smooth) использовать нельзя
+        """
+        if result is None:
+            return
+        self.buffers.release(getattr(result, 'smooth', None))
+        self.buffers.release(result)
+
+    def _output_buffer(self, array, shape, dtype):
+        """Массив вызывающего (проверяется форма) или свободный буфер из пула"""
+        if array is None:
+            return self.buffers.acquire(shape, dtype)
+        if array.shape != shape:
+            raise ValueError(f"Output buffer shape {array.shape} does not match {shape}")
+        return array
+
+    def calculate_mandelbrot(self, center_x, center_y, zoom, width, height, max_iterations,
+                             num_threads=0, render_mode="full", precision="auto", smooth=False,
+                             out=None, smooth_out=None, control=None, region=None, stride=1,
+                             keep_orbits=False):
+        """Вычисляет множество Мандельброта
+
+        num_threads - количество потоков для расчёта (0 - все доступные ядра)
+        render_mode - "full" (каждый пиксель), "guess" (угадывание по границам)
+                      или "missing" (дозаполнение: out на входе содержит уже
+                      известные итерации и -1 там, где их нужно посчитать)
+        precision   - "auto" (по шагу пикселя, float32 так не выбирается)
+                      или один из PRECISION_TIERS
+        smooth      - заодно посчитать дробное число итераций (result.smooth)
+                      для раскраски без полос; радиус ухода тогда больше
+        out         - готовый массив intc (height, width), C-непрерывный, в который
+                      пишется результат; без него буфер берётся из пула движка
+        smooth_out  - то же для дробных итераций (float32), включает smooth
+        control     - RenderControl для отмены и прогресса из другого потока;
+                      после отмены result.info['cancelled'] = True
+        region      - (x, y, w, h): посчитать только этот прямоугольник кадра
+                      width x height; результат (и out) тогда формы (h, w)
+                      и совпадает с куском полного кадра бит в бит
+        stride      - шаг выборки: элемент (j, i) результата - пиксель кадра
+                      (x + i * stride, y + j * stride); так считаются превью
+        keep_orbits - сохранить z незавершённых пикселей в result.orbits
+                      (OrbitState), чтобы потом продолжить их resume_mandelbrot.
+                      Только для точностей float32 и double и не в режиме "guess";
+                      если буфер орбит куска или состояние больше MAX_ORBIT_BYTES,
+                      result.orbits = None
+
+        center_x/center_y могут быть Decimal: при зуме глубже точности double
+        включается double-double, а затем метод возмущений (render_mode там не важен).
+        Выбранная точность записывается в result.info['precision']
+        """
+        return self._calculate(False, 0.0, 0.0, center_x, center_y, zoom, width, height,
+                               max_iterations, num_threads, render_mode, precision, smooth,
+                               out, smooth_out, control, region, stride, keep_orbits)
+
+    def calculate_julia(self, c_real, c_imag, center_x, center_y, zoom, width, height, max_iterations,
+                        num_threads=0, render_mode="full", precision="auto", smooth=False,
+                        out=None, smooth_out=None, control=None, region=None, stride=1,
+                        keep_orbits=False):
+        """Вычисляет множество Жюлиа
+
+        Параметры как у calculate_mandelbrot, c_real/c_imag - параметр C
+        """
+        return self._calculate(True, c_real, c_imag, center_x, center_y, zoom, width, height,
+                               max_iterations, num_threads, render_mode, precision, smooth,
+                               out, smooth_out, control, region, stride, keep_orbits)
+
+    @staticmethod
+    def _region(width, height, region, stride):
+        """Проверенный прямоугольник (x, y, w, h) кадра и FractalRegion для C"""
+        if stride < 1:
+            raise ValueError(f"Stride must be positive: {stride}")
+        if region is None:
+            region = (0, 0, -(-width // stride), -(-height // stride))
+        x, y, region_width, region_height = region
+        if region_width <= 0 or region_height <= 0 or x < 0 or y < 0 \
+                or x + (region_width - 1) * stride >= width or y + (region_height - 1) * stride >= height:
+            raise ValueError(f"Region {region} with stride {stride} is outside the {width}x{height} frame")
+        return tuple(region), FractalRegion(x, y, region_width, region_height, stride)
+
+    def resume_mandelbrot(self, center_x, center_y, zoom, width, height, max_iterations, orbits,
+                          out, smooth_out=None, num_threads=0, control=None):
+        """Поднимает max_iterations готового кадра без пересчёта с нуля
+
+        orbits     - OrbitState кадра (result.orbits расчёта с keep_orbits=True)
+        out        - итерации этого кадра (height, width); пиксели из orbits
+                     дописываются на месте, пиксели orbits.interior получают
+                     новый max_iterations
+        smooth_out - дробные итерации кадра, если orbits.smooth
+
+        Вид (центр, зум, размер) должен быть тем же, что при расчёте orbits.
+        Продолжение всегда идёт в double. Возвращает FractalResult поверх out
+        с новым состоянием в result.orbits (None после отмены - тогда
+        недосчитанные пиксели out равны -1)
+        """
+        return self._resume(False, 0.0, 0.0, center_x, center_y, zoom, width, height,
+                            max_iterations, orbits, out, smooth_out, num_threads, control)
+
+    def resume_julia(self, c_real, c_imag, center_x, center_y, zoom, width, height, max_iterations,
+                     orbits, out, smooth_out=None, num_threads=0, control=None):
+        """Как resume_mandelbrot, c_real/c_imag - параметр C"""
+        return self._resume(True, c_real, c_imag, center_x, center_y, zoom, width, height,
+                            max_iterations, orbits, out, smooth_out, num_threads, control)
+
+    def _resume(self, julia, c_real, c_imag, center_x, center_y, zoom, width, height,
+                max_iterations, orbits, out, smooth_out, num_threads, control):
+        if max_iterations < orbits.max_iterations:
+            raise ValueError(f"Cannot resume orbits computed to {orbits.max_iterations} "
+                             f"iterations down to {max_iterations}")
+        if orbits.smooth != (smooth_out is not None):
+            raise ValueError("smooth_out must be given exactly when the orbits were computed with smooth")
+        if out.shape != (height, width) or (smooth_out is not None and smooth_out.shape != out.shape):
+            raise ValueError(f"Output buffer shape {out.shape} does not match {(height, width)}")
+
+        count = len(orbits.pixels)
+        z = orbits.z.copy()
+        iterations = np.full(count, -1, dtype=np.intc)
+        smooth_values = np.empty(count, dtype=np.float32) if orbits.smooth else None
+        start = time.perf_counter()
+        if count:
+            self.lib.resume_orbits(
+                int(julia), c_real, c_imag, float(center_x), float(center_y), zoom,
+                width, height, orbits.pixels, count, z, iterations, smooth_values,
+                orbits.max_iterations, max_iterations, num_threads, control
+            )
+
+        out.flat[orbits.pixels] = iterations
+        out.flat[orbits.interior] = max_iterations
+        if smooth_out is not None:
+            smooth_out.flat[orbits.pixels] = smooth_values
+            smooth_out.flat[orbits.interior] = max_iterations
+
+        cancelled = control is not None and control.cancelled
+        state = None
+        if not cancelled:
+            unfinished = np.isfinite(z[:, 0])
+            finished_inside = ~unfinished & (iterations == max_iterations)
+            state = OrbitState(orbits.pixels[unfinished], z[unfinished],
+                               np.concatenate([orbits.interior, orbits.pixels[finished_inside]]),
+                               max_iterations, orbits.smooth)
+
+        return FractalResult(out, {
+            'precision': "double",
+            'kernel': "resume",
+            'render_mode': "resume",
+            'time': time.perf_counter() - start,
+            'cancelled': cancelled,
+            'region': (0, 0, width, height),
+            'stride': 1,
+        }, smooth_out, state)
+
+    def _calculate(self, julia, c_real, c_imag, center_x, center_y, zoom, width, height,
+                   max_iterations, num_threads, render_mode, precision, smooth, out, smooth_out,
+                   control, region, stride, keep_orbits=False):
+        mode = self._render_mode_code(render_mode)
+        if precision == "auto":
+            precision = choose_precision(zoom, width)
+        elif precision not in PRECISION_TIERS:
+            raise ValueError(f"Unknown precision: {precision}")
+
+        region, region_struct = self._region(width, height, region, stride)
+        x, y, region_width, region_height = region
+        if render_mode == "missing" and (out is None or (smooth and smooth_out is None)):
+            raise ValueError("Render mode 'missing' needs out (and smooth_out) with known pixels")
+        if keep_orbits and render_mode == "guess":
+            raise ValueError("Orbits cannot be kept in render mode 'guess'")
+
+        shape = (region_height, region_width)
+        output = self._output_buffer(out, shape, np.intc)
+        smooth_array = None
+        if smooth or smooth_out is not None:
+            smooth_array = self._output_buffer(smooth_out, shape, np.float32)
+        orbit = None
+        if keep_orbits and precision in ORBIT_PRECISIONS \
+                and region_width * region_height * ORBIT_PIXEL_BYTES <= MAX_ORBIT_BYTES:
+            # Буфер орбит нужен только до OrbitState, поэтому берётся из пула и сразу
+            # возвращается. NaN - пиксель не считался (известен заранее в режиме "missing")
+            orbit = self.buffers.acquire(shape + (2,), np.float64)
+            orbit.fill(np.nan)
+        start = time.perf_counter()
+
+        if precision == "perturbation":
+            rendered = perturbation.calculate_perturbation(
+                self.lib, julia, center_x, center_y, zoom, width, height,
+                max_iterations, c_real, c_imag, num_threads=num_threads,
+                out=output, smooth=smooth_array, render_mode=mode, region=region_struct,
+                control=control
+            )
+            kernel = "perturbation"
+            if rendered is None:
+                # Опорная точка ушла сразу: пиксели вокруг неё уходят за считанные
+                # итерации, и точности double-double для них хватает
+                precision = "double-double"
+        if precision != "perturbation":
+            center_x, center_x_lo = split_double_double(center_x)
+            center_y, center_y_lo = split_double_double(center_y)
+            if julia:
+                used = self.lib.calculate_julia(
+                    c_real, c_imag, center_x, center_y, zoom,
+                    width, height, output, smooth_array, orbit, max_iterations, num_threads, mode,
+                    PRECISION_CODES[precision], center_x_lo, center_y_lo, region_struct, control
+                )
+            else:
+                used = self.lib.calculate_mandelbrot(
+                    center_x, center_y, zoom,
+                    width, height, output, smooth_array, orbit, max_iterations, num_threads, mode,
+                    PRECISION_CODES[precision], center_x_lo, center_y_lo, region_struct, control
+                )
+            precision = PRECISION_NAMES[used]
+            kernel = self.kernel_variant
+
+        orbits = None
+        if orbit is not None:
+            if precision in ORBIT_PRECISIONS:
+                orbits = self._orbit_state(output, orbit, region, stride, width, max_iterations,
+                                           smooth_array is not None)
+            self.buffers.release(orbit)  # OrbitState хранит копии
+
+        return FractalResult(output, {
+            'precision': precision,
+            'kernel': kernel,
+            'render_mode': render_mode,
+            'time': time.perf_counter() - start,
+            'cancelled': control is not None and control.cancelled,
+            'region': tuple(region),
+            'stride': stride,
+        }, smooth_array, orbits)
+
+    @staticmethod
+    def _orbit_state(output, orbit, region, stride, width, max_iterations, smooth):
+        """OrbitState по буферу orbit куска кадра (None, если он больше MAX_ORBIT_BYTES)"""
+        at_max = output == max_iterations
+        finite = np.isfinite(orbit[..., 0])
+        unfinished = at_max & finite
+        interior = at_max & ~finite & ~np.isnan(orbit[..., 0])
+
+        x, y = region[0], region[1]
+
+        def frame_indices(mask):
+            rows, columns = np.nonzero(mask)
+            return (y + rows * stride) * width + x + columns * stride
+
+        count = np.count_nonzero(unfinished)
+        if count * (2 * 8 + np.dtype(np.intc).itemsize) > MAX_ORBIT_BYTES:
+            return None
+        return OrbitState(frame_indices(unfinished), orbit[unfinished],
+                          frame_indices(interior), max_iterations, smooth)
+
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Общий для процесса FractalEngine, создаётся при первом обращении
+
+    Поиск и загрузка библиотеки и настройка argtypes выполняются один раз,
+    а не на каждый расчёт. Безопасно вызывать из любого потока
+    """
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = FractalEngine()
+    return _shared_engine
@@ -0,0 +1,177 @@
+"""Глубокий зум методом возмущений
+
+Опорная орбита в центре кадра считается с высокой точностью через Decimal,
+а отклонения пикселей от неё - в double в C (calculate_perturbation).
+"""
+import ctypes
+import math
+import threading
+from collections import OrderedDict
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from .precision import pixel_spacing
+
+# Запас знаков Decimal сверх порядка шага пикселя
+EXTRA_DIGITS = 20
+
+# Ряд используется, пока член третьего порядка меньше этой доли первого
+SERIES_TOLERANCE = 1e-9
+
+# Как часто (в итерациях Decimal) опорная орбита проверяет отмену расчёта
+CANCEL_CHECK_INTERVAL = 256
+
+# Сколько последних опорных орбит хранить: кадр, посчитанный по тайлам,
+# считает орбиту один раз, а не на каждый тайл
+REFERENCE_CACHE_SIZE = 4
+
+_reference_cache = OrderedDict()
+_reference_lock = threading.Lock()
+
+
+def decimal_precision(zoom, width):
+    """Количество значащих цифр Decimal, достаточное для этого зума"""
+    spacing = pixel_spacing(zoom, width)
+    return max(28, int(-math.log10(spacing)) + EXTRA_DIGITS)
+
+
+def reference_orbit(julia, center_x, center_y, c_real, c_imag, max_iterations, precision,
+                    control=None):
+    """Опорная орбита Z_0..Z_n в точке центра кадра
+
+    Считается в Decimal с precision знаками, результат округляется до double
+    (отклонения пикселей всё равно малы по сравнению с самой орбитой).
+    Орбита обрывается на первой точке с |Z| > 2, на max_iterations
+    или при отмене расчёта через control
+    """
+    with localcontext() as ctx:
+        ctx.prec = precision
+        center_x, center_y = Decimal(center_x), Decimal(center_y)
+
+        if julia:
+            z_real, z_imag = center_x, center_y
+            c_real, c_imag = Decimal(c_real), Decimal(c_imag)
+        else:
+            z_real, z_imag = Decimal(0), Decimal(0)
+            c_real, c_imag = center_x, center_y
+
+        orbit_real = [float(z_real)]
+        orbit_imag = [float(z_imag)]
+
+        for n in range(max_iterations):
+            if control is not None and n % CANCEL_CHECK_INTERVAL == 0 and control.cancelled:
+                break
+            zr2 = z_real * z_real
+            zi2 = z_imag * z_imag
+            if zr2 + zi2 > 4:
+                break
+            z_imag = 2 * z_real * z_imag + c_imag
+            z_real = zr2 - zi2 + c_real
+            orbit_real.append(float(z_real))
+            orbit_imag.append(float(z_imag))
+
+    return np.array(orbit_real), np.array(orbit_imag)
+
+
+def series_approximation(julia, orbit_real, orbit_imag, max_delta, max_iterations):
+    """Коэффициенты ряда δ_n ≈ A*d + B*d^2 + C*d^3 и число пропускаемых итераций
+
+    max_delta - наибольшее смещение пикселя от центра (угол кадра).
+    Ряд продолжается, пока член третьего порядка на углу кадра пренебрежимо
+    мал по сравнению с линейным
+    """
+    a = complex(1 if julia else 0)
+    b = 0j
+    c = 0j
+    limit = min(len(orbit_real) - 1, max_iterations)
+    n = 0
+
+    while n < limit:
+        z = complex(orbit_real[n], orbit_imag[n])
+        next_a = 2 * z * a + (0 if julia else 1)
+        next_b = 2 * z * b + a * a
+        next_c = 2 * z * c + 2 * a * b
+
+        if not all(map(math.isfinite, (next_a.real, next_a.imag, next_c.real, next_c.imag))):
+            break
+        # >= - чтобы не продолжать ряд, когда все коэффициенты вырождены в ноль
+        if abs(next_c) * max_delta ** 3 >= SERIES_TOLERANCE * abs(next_a) * max_delta:
+            break
+
+        a, b, c = next_a, next_b, next_c
+        n += 1
+
+    series = np.array([a.real, a.imag, b.real, b.imag, c.real, c.imag])
+    return n, series
+
+
+def prepare_reference(julia, center_x, center_y, zoom, width, height, max_iterations,
+                      c_real=0.0, c_imag=0.0, control=None):
+    """Опорная орбита и ряд для кадра: (orbit_real, orbit_imag, series_iterations, series)
+
+    Результат кэшируется (REFERENCE_CACHE_SIZE последних кадров), кроме
+    прерванных расчётов - их орбита может быть оборвана
+    """
+    key = (bool(julia), Decimal(center_x), Decimal(center_y), zoom, width, height,
+           max_iterations, c_real, c_imag)
+    with _reference_lock:
+        if key in _reference_cache:
+            _reference_cache.move_to_end(key)
+            return _reference_cache[key]
+
+    spacing = pixel_spacing(zoom, width)
+    precision = decimal_precision(zoom, width)
+
+    orbit_real, orbit_imag = reference_orbit(
+        julia, center_x, center_y, c_real, c_imag, max_iterations, precision, control
+    )
+    max_delta = spacing * math.hypot(width / 2.0, height / 2.0)
+    series_iterations, series = series_approximation(
+        julia, orbit_real, orbit_imag, max_delta, max_iterations
+    )
+    reference = (orbit_real, orbit_imag, series_iterations, series)
+
+    if control is None or not control.cancelled:
+        with _reference_lock:
+            _reference_cache[key] = reference
+            while len(_reference_cache) > REFERENCE_CACHE_SIZE:
+                _reference_cache.popitem(last=False)
+    return reference
+
+
+def calculate_perturbation(lib, julia, center_x, center_y, zoom, width, height,
+                           max_iterations, c_real=0.0, c_imag=0.0, num_threads=0,
+                           out=None, smooth=None, render_mode=0, region=None, control=None):
+    """Рендер кадра методом возмущений, возвращает массив итераций (height, width)
+
+    out    - массив intc (height, width) для результата (по умолчанию новый)
+    smooth - массив float32 (height, width) для дробного числа итераций или None
+    render_mode - код режима; для дозаполнения ("missing") считаются только
+                  элементы out, равные -1, остальные режимы считают всё
+    region - FractalRegion: считается только этот прямоугольник кадра,
+             out и smooth тогда размером с него
+    control - RenderControl для отмены и прогресса или None
+
+    Возвращает None, если опорная орбита - одна точка (Жюлиа с |центр| > 2
+    или отмена на первом шаге): следовать нечему, кадр считается напрямую
+    """
+    orbit_real, orbit_imag, series_iterations, series = prepare_reference(
+        julia, center_x, center_y, zoom, width, height, max_iterations, c_real, c_imag, control
+    )
+    if len(orbit_real) < 2:
+        return None
+
+    double_p = ctypes.POINTER(ctypes.c_double)
+    if out is None:
+        shape = (region.height, region.width) if region is not None else (height, width)
+        out = np.empty(shape, dtype=np.intc)
+    lib.calculate_perturbation(
+        int(julia),
+        orbit_real.ctypes.data_as(double_p), orbit_imag.ctypes.data_as(double_p),
+        len(orbit_real),
+        series.ctypes.data_as(double_p), series_iterations,
+        pixel_spacing(zoom, width), width, height,
+        out, smooth, max_iterations, num_threads, render_mode, region, control
+    )
+    return out
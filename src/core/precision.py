@@ -0,0 +1,56 @@
+"""Выбор точности вычислений по шагу пикселя
+
+    float32        - только по явному запросу: float32 SIMD (вдвое больше дорожек)
+    double         - неглубокие и средние зумы (уровень по умолчанию)
+    double-double  - пока шаг пикселя не меньше ~1e-28
+    perturbation   - глубже: метод возмущений (см. perturbation.py)
+
+float32 автоматически не выбирается никогда: choose_precision возвращает только
+double, double-double или perturbation, а float32 включается лишь явным
+precision="float32". Безопасного порога по шагу пикселя для него нет -
+по сравнению с double меняются итерации примерно у 0.1% пикселей при
+100 итерациях и у 0.7-1.3% при 1000, даже на превью шириной 32 пикселя.
+"""
+from decimal import Decimal
+
+# Коды точности в C (FRACTAL_PRECISION_* в mandelbrot.h)
+PRECISION_CODES = {
+    "double": 0,
+    "float32": 1,
+    "double-double": 2,
+}
+PRECISION_NAMES = {code: name for name, code in PRECISION_CODES.items()}
+
+# Границы уровней по шагу пикселя. У float32 около 7 знаков, и ошибка орбиты
+# за сотни итераций у радиуса выхода сравнима с пикселем при любом шаге -
+# поэтому для него границы нет (см. docstring модуля)
+# Ниже этого шага double уже не различает соседние пиксели
+# (при |z| ~ 2 точность double около 4e-16, нужен запас на рост ошибки орбиты)
+DOUBLE_PIXEL_LIMIT = 1e-13
+# У double-double около 32 знаков - с тем же запасом
+DOUBLE_DOUBLE_PIXEL_LIMIT = 1e-28
+
+PRECISION_TIERS = ("float32", "double", "double-double", "perturbation")
+
+
+def pixel_spacing(zoom, width):
+    """Шаг пикселя в комплексной плоскости (как в init_view в mandelbrot.c)"""
+    return 2.0 / zoom / width
+
+
+def choose_precision(zoom, width):
+    """Самая дешёвая точность, которой хватает для этого зума (никогда не float32)"""
+    spacing = pixel_spacing(zoom, width)
+    if spacing >= DOUBLE_PIXEL_LIMIT:
+        return "double"
+    if spacing >= DOUBLE_DOUBLE_PIXEL_LIMIT:
+        return "double-double"
+    return "perturbation"
+
+
+def split_double_double(value):
+    """Раскладывает число (float, Decimal или строку) на пару double hi + lo"""
+    value = Decimal(value)
+    hi = float(value)
+    lo = float(value - Decimal(hi))
+    return hi, lo
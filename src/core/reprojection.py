@@ -0,0 +1,116 @@
+"""Повторное использование пикселей прошлого кадра при навигации
+
+Кадр для нового вида собирается из уже посчитанного: известные пиксели
+копируются, а неизвестные помечаются -1 и досчитываются движком в режиме
+render_mode="missing".
+
+Сетки кадров совпадают при сдвиге на целое число пикселей и при зуме
+ровно в 2 раза, если центры обоих кадров привязаны к сетке тайлов
+(tile_cache.snap_center): при приближении известна каждая вторая точка
+по обеим осям (1/4 кадра), при отдалении - вся центральная четверть.
+"""
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from .perturbation import decimal_precision
+from .precision import PRECISION_TIERS, choose_precision
+
+# Допуск (в пикселях), с которым сдвиг центра считается привязанным к сетке
+PIXEL_TOLERANCE = 1e-3
+
+# Параметры вида, которые должны совпадать, чтобы пиксели можно было переиспользовать
+VIEW_KEYS = ('width', 'height', 'max_iterations', 'c_real', 'c_imag')
+
+# Отношения шагов пикселя (новый / старый), при которых сетки совпадают:
+# приближение x2, сдвиг, отдаление x2
+SNAP_RATIOS = (0.5, 1.0, 2.0)
+
+
+def pixel_steps(params):
+    """Шаг пикселя по x и y - так же, как в init_view (mandelbrot.c)"""
+    scale = 2.0 / params['zoom']
+    width, height = params['width'], params['height']
+    return scale / width, scale / (width / height) / height
+
+
+def frame_mapping(old_params, new_params):
+    """Как новый вид ложится на сетку старого: (ratio, bx, by) или None
+
+    Пиксель (x, y) нового кадра - это точка (ratio * x + bx, ratio * y + by)
+    старого; ratio - одно из SNAP_RATIOS. None - если виды отличаются не только
+    центром и зумом, сетки не совпадают или кадры вообще не пересекаются.
+    Пиксели, посчитанные с меньшей точностью, чем нужна новому виду
+    (приближение double -> double-double), тоже не переиспользуются
+    """
+    if any(old_params.get(key) != new_params.get(key) for key in VIEW_KEYS):
+        return None
+    ratio = old_params['zoom'] / new_params['zoom']
+    if ratio not in SNAP_RATIOS:
+        return None
+
+    width, height = new_params['width'], new_params['height']
+    old_tier = PRECISION_TIERS.index(choose_precision(old_params['zoom'], width))
+    if old_tier < PRECISION_TIERS.index(choose_precision(new_params['zoom'], width)):
+        return None
+    step_x, step_y = pixel_steps(old_params)
+    grid = 0.5 if ratio < 1 else 1.0
+
+    with localcontext() as ctx:
+        ctx.prec = decimal_precision(max(old_params['zoom'], new_params['zoom']), width)
+        offset_x = (Decimal(new_params['center_x']) - Decimal(old_params['center_x'])) / Decimal(step_x)
+        offset_y = (Decimal(new_params['center_y']) - Decimal(old_params['center_y'])) / Decimal(step_y)
+        bx = offset_x + Decimal((1.0 - ratio) * width / 2.0)
+        by = offset_y + Decimal((1.0 - ratio) * height / 2.0)
+
+    snapped_x = float((bx / Decimal(grid)).to_integral_value()) * grid
+    snapped_y = float((by / Decimal(grid)).to_integral_value()) * grid
+    if abs(bx - Decimal(snapped_x)) > PIXEL_TOLERANCE or abs(by - Decimal(snapped_y)) > PIXEL_TOLERANCE:
+        return None
+
+    new_x, _ = _axis_lines(ratio, snapped_x, width)
+    new_y, _ = _axis_lines(ratio, snapped_y, height)
+    if new_x.start >= new_x.stop or new_y.start >= new_y.stop:
+        return None
+    return ratio, snapped_x, snapped_y
+
+
+def reproject_frame(previous, mapping, out):
+    """Записывает в out пиксели прошлого кадра по mapping; остальные = -1"""
+    ratio, bx, by = mapping
+    height, width = previous.shape
+    new_x, old_x = _axis_lines(ratio, bx, width)
+    new_y, old_y = _axis_lines(ratio, by, height)
+    out.fill(-1)
+    out[new_y, new_x] = previous[old_y, old_x]
+    return out
+
+
+def _axis_lines(ratio, offset, size):
+    """Срезы (новые, старые) линий одной оси, которые есть в обоих кадрах
+
+    Новая линия n - это старая ratio * n + offset
+    """
+    if ratio == 1:
+        d = int(offset)
+        return slice(max(-d, 0), size - max(d, 0)), slice(max(d, 0), size - max(-d, 0))
+    if ratio > 1:
+        # Отдаление: старая линия 2n + offset
+        return _every_other(int(offset), size)
+    # Приближение: новая линия 2o - 2 * offset
+    old, new = _every_other(-int(2 * offset), size)
+    return new, old
+
+
+def _every_other(d, size):
+    """Срезы индексов i и 2i + d, где оба лежат в [0, size)"""
+    first = max(0, -(-(-d) // 2))
+    stop = min(size, -(-(size - d) // 2))
+    if first >= stop:
+        return slice(0, 0), slice(0, 0)
+    return slice(first, stop), slice(2 * first + d, 2 * stop + d, 2)
+
+
+def missing_fraction(frame):
+    """Доля пикселей кадра, которые ещё нужно посчитать"""
+    return np.count_nonzero(frame < 0) / frame.size
@@ -0,0 +1,154 @@
+"""Планировщик расчётов кадров: побеждает последний запрос
+
+Навигация присылает новый вид на каждое движение мыши и каждый щелчок
+колеса. Запрос не запускается сразу, а становится ожидающим (pending),
+заменяя прошлый ожидающий: пачка событий превращается в один расчёт
+последнего вида. Каждый запрос получает номер поколения - сигналы
+расчётов прошлых поколений отбрасываются, а их готовые кадры возвращаются
+в пул буферов. Считают POOL_SIZE постоянных потоков, новые QThread
+на каждый запрос не создаются
+"""
+import queue
+
+import numpy as np
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from .fractal_engine import get_engine
+
+# Потоков в пуле: пока один доводит отменённый расчёт до следующей строки,
+# другой уже считает новый вид. Сам кадр параллелится внутри библиотеки,
+# поэтому больше потоков только делили бы ядра между устаревшими видами
+POOL_SIZE = 2
+
+
+class RenderThread(QThread):
+    """Постоянный поток пула: по одному выполняет расчёты из своей очереди"""
+    job_done = pyqtSignal(object)  # Расчёт закончен, отменён или упал - поток свободен
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = queue.Queue()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:  # Остановка пула
+                return
+            job.run()
+            self.job_done.emit(job)
+
+
+class RenderScheduler(QObject):
+    # Сигналы расчёта последнего поколения (как у FractalWorker)
+    progress_updated = pyqtSignal(int)
+    preview_ready = pyqtSignal(int, np.ndarray)
+    tile_ready = pyqtSignal(int, int, np.ndarray)
+    calculation_finished = pyqtSignal(np.ndarray)
+    error_occurred = pyqtSignal(str)
+    calculation_cancelled = pyqtSignal()  # Расчёт последнего поколения отменён, замены ему нет
+
+    def __init__(self, create_job, pool_size=POOL_SIZE, engine=None):
+        super().__init__()
+        if pool_size < 1:
+            raise ValueError(f"Pool size must be positive: {pool_size}")
+        # create_job(fractal_type, params, **options) -> FractalWorker; вызывается
+        # только при запуске, поэтому видит состояние UI на этот момент
+        self.create_job = create_job
+        self.engine = engine if engine is not None else get_engine()
+        self.generation = 0
+        self.current = None  # Последний запущенный расчёт
+        self.pending = None  # (fractal_type, params, options) ещё не запущенного запроса
+        self._busy = {}  # Поток -> его расчёт
+
+        self._threads = [RenderThread() for _ in range(pool_size)]
+        for thread in self._threads:
+            thread.job_done.connect(self._on_job_done)
+            thread.start()
+
+        # Запуск откладывается до конца текущей пачки событий
+        self._dispatch_timer = QTimer()
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.timeout.connect(self._dispatch)
+
+    def request(self, fractal_type, params, **options):
+        """Просит посчитать вид; прошлый ожидающий запрос заменяется, идущий - отменяется"""
+        self.generation += 1
+        self.pending = (fractal_type, params, options)
+        if self.current is not None:
+            self.current.cancel()
+        if not self._dispatch_timer.isActive():
+            self._dispatch_timer.start(0)
+
+    def is_busy(self):
+        """Есть ли незавершённый запрос последнего поколения"""
+        return self.pending is not None or (
+            self.current is not None and self.current.generation == self.generation
+            and self.current in self._busy.values()
+        )
+
+    def _dispatch(self):
+        """Запускает ожидающий запрос, если есть свободный поток (иначе - по его освобождении)"""
+        if self.pending is None:
+            return
+        thread = next((thread for thread in self._threads if thread not in self._busy), None)
+        if thread is None:
+            return
+
+        fractal_type, params, options = self.pending
+        self.pending = None
+        job = self.create_job(fractal_type, params, **options)
+        job.generation = self.generation
+        job.progress_updated.connect(self._on_progress_updated)
+        job.preview_ready.connect(self._on_preview_ready)
+        job.tile_ready.connect(self._on_tile_ready)
+        job.calculation_finished.connect(self._on_calculation_finished)
+        job.error_occurred.connect(self._on_error)
+        self.current = job
+        self._busy[thread] = job
+        thread.jobs.put(job)
+
+    def _is_current(self):
+        """Сигнал пришёл от расчёта последнего поколения"""
+        job = self.sender()
+        return job is not None and job.generation == self.generation
+
+    def _on_progress_updated(self, progress):
+        if self._is_current():
+            self.progress_updated.emit(progress)
+
+    def _on_preview_ready(self, stride, preview):
+        if self._is_current():
+            self.preview_ready.emit(stride, preview)
+
+    def _on_tile_ready(self, x, y, tile):
+        if self._is_current():
+            self.tile_ready.emit(x, y, tile)
+
+    def _on_calculation_finished(self, result):
+        if self._is_current():
+            self.calculation_finished.emit(result)
+        else:
+            # Кадр устаревшего вида никто не покажет
+            self.engine.release(result)
+
+    def _on_error(self, error_msg):
+        if self._is_current():
+            self.error_occurred.emit(error_msg)
+
+    def _on_job_done(self, job):
+        """Поток освободился: все сигналы его расчёта уже доставлены, можно запускать следующий"""
+        self._busy.pop(self.sender(), None)
+        if job.is_cancelled and job.generation == self.generation and self.pending is None:
+            self.calculation_cancelled.emit()
+        self._dispatch()
+
+    def shutdown(self, timeout=1000):
+        """Отменяет расчёт и останавливает потоки пула (при закрытии окна)"""
+        self.pending = None
+        self._dispatch_timer.stop()
+        for job in self._busy.values():
+            job.cancel()
+        for thread in self._threads:
+            thread.jobs.put(None)
+        for thread in self._threads:
+            thread.wait(timeout)
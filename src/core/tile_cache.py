@@ -0,0 +1,201 @@
+"""Кэш тайлов итераций - пирамида по уровням зума
+
+Тайлы лежат на глобальной сетке: пиксель с индексом g находится в точке
+g * шаг пикселя, тайл (tx, ty) накрывает пиксели [tx * size, (tx + 1) * size).
+Уровень пирамиды - шаг пикселя (step_x, step_y): при зуме x2 шаг ровно
+делится пополам, и тайл распадается на 4 тайла следующего уровня.
+Кадр, центр которого привязан к сетке (snap_center), собирается из
+закэшированных тайлов, а считаются только промахи.
+"""
+import threading
+from collections import OrderedDict
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from .perturbation import decimal_precision
+from .reprojection import PIXEL_TOLERANCE, pixel_steps
+
+# Сторона тайла кэша в пикселях (совпадает с тайлами FractalWorker)
+CACHE_TILE_SIZE = 64
+
+# Бюджет памяти по умолчанию: ~4000 тайлов 64x64, несколько десятков кадров 800x600
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def view_key(fractal_type, params):
+    """Часть ключа тайла, общая для всего кадра: всё, кроме (tx, ty)"""
+    return (fractal_type, params.get('c_real'), params.get('c_imag'),
+            pixel_steps(params), params['max_iterations'])
+
+
+def grid_origin(params):
+    """Глобальный индекс пикселя (0, 0) кадра: (gx, gy) или None, если кадр не на сетке"""
+    step_x, step_y = pixel_steps(params)
+    origin = []
+    with localcontext() as ctx:
+        ctx.prec = decimal_precision(params['zoom'], params['width'])
+        for center, step, size in ((params['center_x'], step_x, params['width']),
+                                   (params['center_y'], step_y, params['height'])):
+            index = Decimal(center) / Decimal(step) - Decimal(size) / 2
+            rounded = index.to_integral_value()
+            if abs(index - rounded) > PIXEL_TOLERANCE:
+                return None
+            origin.append(int(rounded))
+    return tuple(origin)
+
+
+def snap_center(center, step, size, zoom):
+    """Ближайший к center центр, при котором кадр из size пикселей лежит на сетке"""
+    with localcontext() as ctx:
+        ctx.prec = decimal_precision(zoom, size)
+        half = Decimal(size) / 2
+        index = (Decimal(center) / Decimal(step) - half).to_integral_value()
+        return (index + half) * Decimal(step)
+
+
+def grid_tiles(origin, shape, tile_size=CACHE_TILE_SIZE):
+    """Куски кадра по тайлам сетки: (tx, ty, x, y, w, h, x в тайле, y в тайле)
+
+    origin - grid_origin() кадра, shape - (height, width)
+    """
+    height, width = shape
+    gx, gy = origin
+    for ty in range(gy // tile_size, (gy + height - 1) // tile_size + 1):
+        y = max(ty * tile_size - gy, 0)
+        tile_height = min((ty + 1) * tile_size - gy, height) - y
+        for tx in range(gx // tile_size, (gx + width - 1) // tile_size + 1):
+            x = max(tx * tile_size - gx, 0)
+            tile_width = min((tx + 1) * tile_size - gx, width) - x
+            yield tx, ty, x, y, tile_width, tile_height, gx + x - tx * tile_size, gy + y - ty * tile_size
+
+
+class TileCache:
+    """Потокобезопасный LRU-кэш тайлов с бюджетом в байтах
+
+    Тайл хранится целиком (size x size, np.intc); пиксели, которых ещё не
+    было в кадрах, равны -1. Ключ - (тип фрактала, c_real, c_imag, уровень,
+    tx, ty, max_iterations). Счётчики hits/misses/evictions доступны через stats()
+
+    store - необязательное второе звено на диске (src.db.tile_store.TileStore):
+    промахи памяти ищутся в нём, а новые тайлы записываются туда в flush()
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, tile_size=CACHE_TILE_SIZE, store=None):
+        self.max_bytes = max_bytes
+        self.tile_size = tile_size
+        self.store = store
+        self._tiles = OrderedDict()  # ключ -> тайл
+        self._dirty = set()  # Ключи тайлов, изменённых после последнего flush()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(view, tx, ty):
+        """Ключ тайла (tx, ty) кадра с view_key() = view"""
+        fractal_type, c_real, c_imag, level, max_iterations = view
+        return fractal_type, c_real, c_imag, level, tx, ty, max_iterations
+
+    def fill_frame(self, view, origin, frame):
+        """Копирует в неизвестные (-1) пиксели frame всё, что есть в кэше
+
+        Возвращает число найденных тайлов
+        """
+        pieces = list(grid_tiles(origin, frame.shape, self.tile_size))
+        keys = [self.key(view, tx, ty) for tx, ty, *_ in pieces]
+        tiles = {}
+        with self._lock:
+            for key in keys:
+                tile = self._tiles.get(key)
+                if tile is not None:
+                    self._tiles.move_to_end(key)
+                    tiles[key] = tile.copy()
+
+        missing = [key for key in keys if key not in tiles]
+        if self.store is not None and missing:
+            # Чтение с диска - без блокировки: оно может ждать другой процесс
+            loaded = self.store.load(missing, self.tile_size)
+            with self._lock:
+                for key, tile in loaded.items():
+                    if key not in self._tiles:
+                        self._tiles[key] = tile.copy()
+                        self._bytes += tile.nbytes
+                self.disk_hits += len(loaded)
+                self._evict()
+            tiles.update(loaded)
+
+        with self._lock:
+            self.hits += len(tiles)
+            self.misses += len(pieces) - len(tiles)
+
+        for key, (_, _, x, y, width, height, tile_x, tile_y) in zip(keys, pieces):
+            tile = tiles.get(key)
+            if tile is None:
+                continue
+            part = tile[tile_y:tile_y + height, tile_x:tile_x + width]
+            target = frame[y:y + height, x:x + width]
+            np.copyto(target, part, where=(target < 0) & (part >= 0))
+        return len(tiles)
+
+    def store_frame(self, view, origin, frame, region):
+        """Сохраняет известные пиксели прямоугольника region = (x, y, w, h) кадра"""
+        rx, ry, rw, rh = region
+        for tx, ty, x, y, width, height, tile_x, tile_y in grid_tiles(origin, frame.shape, self.tile_size):
+            x0, y0 = max(x, rx), max(y, ry)
+            x1, y1 = min(x + width, rx + rw), min(y + height, ry + rh)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            part = frame[y0:y1, x0:x1]
+            key = self.key(view, tx, ty)
+            with self._lock:
+                tile = self._tiles.get(key)
+                if tile is None:
+                    tile = np.full((self.tile_size, self.tile_size), -1, dtype=np.intc)
+                    self._tiles[key] = tile
+                    self._bytes += tile.nbytes
+                else:
+                    self._tiles.move_to_end(key)
+                target = tile[tile_y + y0 - y:tile_y + y1 - y, tile_x + x0 - x:tile_x + x1 - x]
+                np.copyto(target, part, where=part >= 0)
+                self._dirty.add(key)
+                self._evict()
+
+    def flush(self):
+        """Записывает изменённые тайлы в store (если он есть) одной транзакцией"""
+        if self.store is None:
+            return
+        with self._lock:
+            dirty = {key: self._tiles[key].copy() for key in self._dirty if key in self._tiles}
+            self._dirty.clear()
+        self.store.save(dirty)
+
+    def _evict(self):
+        """Вытесняет давно не использованные тайлы сверх бюджета (под блокировкой)"""
+        while self._bytes > self.max_bytes and self._tiles:
+            key, tile = self._tiles.popitem(last=False)
+            self._bytes -= tile.nbytes
+            self._dirty.discard(key)
+            self.evictions += 1
+
+    def stats(self):
+        """Счётчики кэша: попадания, промахи, вытеснения, число тайлов и занятые байты в памяти"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,  # Из hits - найдено на диске
+                'evictions': self.evictions,
+                'tiles': len(self._tiles),
+                'bytes': self._bytes,
+            }
+
+    def clear(self):
+        """Удаляет все тайлы из памяти (счётчики и store сохраняются)"""
+        with self._lock:
+            self._tiles.clear()
+            self._dirty.clear()
+            self._bytes = 0
@@ -1,41 +1,85 @@
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+import threading
+import time
 import numpy as np
-from .fractal_engine import FractalEngine
+from .coloring import colorize
+from .fractal_engine import FractalResult, OrbitState, RenderControl, get_engine
+from .reprojection import missing_fraction, reproject_frame
+from .tile_cache import grid_origin, grid_tiles, view_key
 
+# Как часто (в секундах) опрашивается прогресс идущего расчёта
+PROGRESS_INTERVAL = 0.05
 
-class FractalWorker(QThread):
+# Сторона тайла в пикселях: тайл 64x64 даже при 3000 итерациях считается
+# за миллисекунды, поэтому первые пиксели появляются в первом же кадре UI
+TILE_SIZE = 64
+
+# Шаги превью при навигации: 1/8, 1/4 и 1/2 разрешения, затем полный кадр.
+# Каждый уровень содержит все точки предыдущего (каждую вторую по обеим
+# осям), поэтому досчитываются только 3/4 его пикселей
+PREVIEW_STRIDES = (8, 4, 2)
+
+
+class FractalWorker(QObject):
+    """Расчёт одного кадра по тайлам
+
+    Своего потока у расчёта нет: run() вызывает постоянный поток пула
+    RenderScheduler (scheduler.py), а сигналы доходят до UI через очередь
+    событий главного потока
+    """
     # Сигналы для общения с главным потоком
     progress_updated = pyqtSignal(int)  # Прогресс в %
-    calculation_finished = pyqtSignal(np.ndarray)  # Готовый результат
+    preview_ready = pyqtSignal(int, np.ndarray)  # Шаг и итерации грубого превью
+    tile_ready = pyqtSignal(int, int, np.ndarray)  # x, y и итерации готового тайла
+    calculation_finished = pyqtSignal(np.ndarray)  # Готовый результат (весь кадр)
     error_occurred = pyqtSignal(str)  # Ошибка
 
-    def __init__(self, fractal_type, params):
+    def __init__(self, fractal_type, params, num_threads=0, engine=None, progressive=False,
+                 reuse=None, cache=None, resume=None):
         super().__init__()
         self.fractal_type = fractal_type
         self.params = params
+        self.num_threads = num_threads  # 0 - все доступные ядра
+        self.progressive = progressive  # Сначала превью PREVIEW_STRIDES, потом полный кадр
+        # (прошлый кадр, frame_mapping): при панорамировании и зуме x2 считаются
+        # только пиксели, которых нет в прошлом кадре
+        self.reuse = reuse
+        # TileCache: кадр на сетке тайлов сначала собирается из кэша
+        self.cache = cache
+        # Прошлый кадр того же вида с меньшим max_iterations и orbits: его
+        # незавершённые пиксели продолжаются, а не считаются с нуля
+        self.resume = resume
+        self._orbit_states = []  # OrbitState всех посчитанных кусков кадра
         self.is_cancelled = False
-        self.engine = FractalEngine()
+        self.generation = 0  # Номер запроса в RenderScheduler: по нему отбрасываются устаревшие сигналы
+        # Общий движок процесса: библиотека загружается один раз,
+        # а пул буферов живёт дольше одного расчёта
+        self.engine = engine if engine is not None else get_engine()
+        # Через control библиотека видит отмену и сообщает, сколько строк готово
+        self.control = RenderControl()
+        self._done = threading.Event()
+        self._tiles_done = 0
+        self._tiles_total = 1
 
     def run(self):
         """Основной метод, выполняется в отдельном потоке"""
         try:
-            self.progress_updated.emit(10)  # Начало вычислений
+            self.progress_updated.emit(0)  # Начало вычислений
 
             if self.is_cancelled:
                 return
 
-            # Вычисляем фрактал
-            if self.fractal_type == "Mandelbrot":
-                result = self.engine.calculate_mandelbrot(**self.params)
-            elif self.fractal_type == "Julia":
-                result = self.engine.calculate_julia(
-                    self.params['c_real'], self.params['c_imag'],
-                    **{k: v for k, v in self.params.items() if k not in ['c_real', 'c_imag']}
-                )
-            else:
-                raise ValueError(f"Unknown fractal type: {self.fractal_type}")
+            # Поток занят вызовом C, поэтому прогресс опрашивает вспомогательный поток
+            poller = threading.Thread(target=self._report_progress, daemon=True)
+            poller.start()
+            try:
+                result = self._calculate()
+            finally:
+                self._done.set()
+                poller.join()
 
             if self.is_cancelled:
+                self.engine.release(result)
                 return
 
             self.progress_updated.emit(100)  # Вычисления завершены
@@ -44,6 +88,205 @@ class FractalWorker(QThread):
         except Exception as e:
             self.error_occurred.emit(f"Ошибка вычислений: {str(e)}")
 
+    def _calculate(self):
+        """Вычисляем фрактал по тайлам, отправляя каждый готовый тайл в UI
+
+        Тайлы пишутся в общий кадр, а tile_ready получает его срез:
+        кадр живёт до release в главном окне, поэтому срез остаётся валидным
+        """
+        if self.fractal_type not in ("Mandelbrot", "Julia"):
+            raise ValueError(f"Unknown fractal type: {self.fractal_type}")
+
+        width, height = self.params['width'], self.params['height']
+        origin = grid_origin(self.params) if self.cache is not None else None
+        if origin is not None:
+            # Тайлы расчёта совпадают с тайлами кэша
+            view = view_key(self.fractal_type, self.params)
+            tiles = [(x, y, tile_width, tile_height) for _, _, x, y, tile_width, tile_height, _, _
+                     in grid_tiles(origin, (height, width), TILE_SIZE)]
+        else:
+            view = None
+            tiles = [(x, y, min(TILE_SIZE, width - x), min(TILE_SIZE, height - y))
+                     for y in range(0, height, TILE_SIZE)
+                     for x in range(0, width, TILE_SIZE)]
+        self._tiles_total = len(tiles)
+
+        frame = self.engine.buffers.acquire((height, width), np.intc)
+        try:
+            return self._fill_frame(frame, tiles, view, origin)
+        except BaseException:
+            # Упавший расчёт не должен уносить буфер кадра из пула
+            self.engine.release(frame)
+            raise
+
+    def _fill_frame(self, frame, tiles, view, origin):
+        """Заполняет frame по тайлам (из прошлого кадра, кэша или расчётом) и возвращает результат"""
+        height, width = frame.shape
+        start = time.perf_counter()
+        info = {}
+
+        # Пиксели, которые UI ещё не видел: их тайлы надо отправить, даже если считать нечего
+        unseen = None
+        if self.resume is not None:
+            unseen = self._resume_frame(frame)
+        elif self.reuse is not None:
+            previous, mapping = self.reuse
+            reproject_frame(previous, mapping, frame)
+        else:
+            frame.fill(-1)
+        if view is not None:
+            known = frame >= 0
+            if self.cache.fill_frame(view, origin, frame):
+                from_cache = (frame >= 0) & ~known
+                unseen = from_cache if unseen is None else unseen | from_cache
+        if self.progressive and not (frame >= 0).any():
+            # Полный кадр дозаполняет превью 1/2: известна каждая вторая точка
+            coarse = self._calculate_previews(width, height)
+            if coarse is not None:
+                frame[::2, ::2] = coarse
+
+        reused = 1.0 - missing_fraction(frame)
+        render = dict(render_mode="missing") if reused > 0 else {}
+
+        for region in tiles:
+            if self.is_cancelled:
+                break
+            x, y, tile_width, tile_height = region
+            if render and not (frame[y:y + tile_height, x:x + tile_width] < 0).any():
+                # Тайл целиком взят из прошлого кадра или кэша
+                if view is not None:
+                    self.cache.store_frame(view, origin, frame, region)
+                self._tiles_done += 1
+                if unseen is not None and unseen[y:y + tile_height, x:x + tile_width].any():
+                    self.tile_ready.emit(x, y, frame[y:y + tile_height, x:x + tile_width])
+                continue
+            if render:
+                render['out'] = self.engine.buffers.acquire((tile_height, tile_width), np.intc)
+                render['out'][:] = frame[y:y + tile_height, x:x + tile_width]
+            try:
+                tile = self._calculate_part(region=region, **render)
+            except BaseException:
+                self.engine.release(render.get('out'))
+                raise
+            frame[y:y + tile_height, x:x + tile_width] = tile
+            info = tile.info
+            self.engine.release(tile)
+            if view is not None and not info['cancelled']:
+                self.cache.store_frame(view, origin, frame, region)
+            self._tiles_done += 1
+            if not self.is_cancelled:
+                self.tile_ready.emit(x, y, frame[y:y + tile_height, x:x + tile_width])
+
+        if view is not None:
+            self.cache.flush()
+
+        return FractalResult(frame, dict(
+            info,
+            time=time.perf_counter() - start,
+            cancelled=self.is_cancelled,
+            region=(0, 0, width, height),
+            reused=reused,  # Доля пикселей, взятых из прошлого кадра, кэша или превью
+        ), orbits=OrbitState.merge(self._orbit_states))
+
+    def _resume_frame(self, frame):
+        """Заполняет frame прошлым кадром, продолжая его незавершённые орбиты
+
+        Пиксели прошлого кадра с его max_iterations, для которых нет
+        состояния орбиты, становятся -1 и досчитываются тайлами.
+        Возвращает маску пикселей, изменившихся для UI
+        """
+        previous = self.resume
+        orbits = previous.orbits
+        np.copyto(frame, previous)
+        changed = frame == orbits.max_iterations
+        frame[changed] = -1
+
+        params = {k: v for k, v in self.params.items() if k not in ['c_real', 'c_imag']}
+        if self.fractal_type == "Mandelbrot":
+            result = self.engine.resume_mandelbrot(
+                **params, orbits=orbits, out=frame, num_threads=self.num_threads, control=self.control
+            )
+        else:
+            result = self.engine.resume_julia(
+                self.params['c_real'], self.params['c_imag'], **params, orbits=orbits, out=frame,
+                num_threads=self.num_threads, control=self.control
+            )
+        self._orbit_states.append(result.orbits)
+        return changed & (frame >= 0)
+
+    def _calculate_previews(self, width, height):
+        """Превью с шагами PREVIEW_STRIDES; возвращает последнее (или None при отмене)
+
+        Массивы превью не берутся из пула: UI рисует их уже после того,
+        как worker перешёл к следующему уровню
+        """
+        previous = None
+        for stride in PREVIEW_STRIDES:
+            if self.is_cancelled:
+                return None
+            level = np.full((-(-height // stride), -(-width // stride)), -1, dtype=np.intc)
+            if previous is not None:
+                level[::2, ::2] = previous
+            self._calculate_part(out=level, render_mode="missing", stride=stride)
+            if self.is_cancelled:
+                return None
+            self.preview_ready.emit(stride, level)
+            previous = level
+        return previous
+
+    def _calculate_part(self, **kwargs):
+        """Расчёт с параметрами кадра; kwargs - region, stride, out и т.п.
+
+        Состояние орбит куска запоминается, чтобы кадр потом можно было
+        продолжить до большего max_iterations (FractalResult.orbits)
+        """
+        if self.fractal_type == "Mandelbrot":
+            result = self.engine.calculate_mandelbrot(
+                **self.params, num_threads=self.num_threads, control=self.control,
+                keep_orbits=True, **kwargs
+            )
+        else:
+            result = self.engine.calculate_julia(
+                self.params['c_real'], self.params['c_imag'],
+                **{k: v for k, v in self.params.items() if k not in ['c_real', 'c_imag']},
+                num_threads=self.num_threads, control=self.control, keep_orbits=True, **kwargs
+            )
+        if not result.info['cancelled']:
+            self._orbit_states.append(result.orbits)
+        return result
+
+    def _report_progress(self):
+        """Шлёт progress_updated, пока идёт расчёт (сигналы Qt можно слать из любого потока)"""
+        last = 0
+        while not self._done.wait(PROGRESS_INTERVAL):
+            done = min(self._tiles_done + self.control.progress, self._tiles_total)
+            percent = int(done / self._tiles_total * 100)
+            if percent != last and not self.is_cancelled:
+                self.progress_updated.emit(percent)
+                last = percent
+
     def cancel(self):
-        """Отмена вычислений"""
-        self.is_cancelled = True
\ No newline at end of file
+        """Отмена вычислений: библиотека бросает расчёт на следующей строке"""
+        self.is_cancelled = True
+        self.control.cancel()
+
+
+class RecolorWorker(QThread):
+    """Перекраска готового кадра новой палитрой без пересчёта итераций
+
+    Раскраска (векторная, NumPy отпускает GIL) идёт в фоне, а в UI
+    приходят два готовых буфера 0xFFRRGGBB: изображение и его копия для
+    frame_image. Так окно не замирает, а картинка меняется целиком
+    """
+    recolored = pyqtSignal(int, np.ndarray, np.ndarray)  # Поколение, пиксели и их копия
+
+    def __init__(self, generation, data, lut, max_iterations):
+        super().__init__()
+        self.generation = generation  # Номер запроса: устаревшие результаты UI отбрасывает
+        self.data = data
+        self.lut = lut
+        self.max_iterations = max_iterations
+
+    def run(self):
+        pixels = colorize(self.data, self.lut, self.max_iterations)
+        self.recolored.emit(self.generation, pixels, pixels.copy())
@@ -1,6 +1,66 @@
 import sqlite3
 import os
 
+# Стандартные пресеты, добавляемые в пустую БД
+DEFAULT_PRESETS = [
+    # Мандельброт пресеты
+    {
+        'name': 'Классический Мандельброт',
+        'fractal_type': 'Mandelbrot',
+        'center_x': -0.5, 'center_y': 0.0,
+        'zoom': 1.0, 'max_iterations': 256
+    },
+    {
+        'name': 'Мандельброт - спирали',
+        'fractal_type': 'Mandelbrot',
+        'center_x': -0.743, 'center_y': 0.126,
+        'zoom': 200.0, 'max_iterations': 512
+    },
+    {
+        'name': 'Мандельброт - острова',
+        'fractal_type': 'Mandelbrot',
+        'center_x': -1.250, 'center_y': 0.020,
+        'zoom': 80.0, 'max_iterations': 300
+    },
+
+    # Жюлиа пресеты (красивые!)
+    {
+        'name': 'Жюлиа - Дракон',
+        'fractal_type': 'Julia',
+        'center_x': 0.0, 'center_y': 0.0,
+        'zoom': 1.2, 'max_iterations': 300,
+        'c_real': -0.7269, 'c_imag': 0.1889
+    },
+    {
+        'name': 'Жюлиа - Кружева',
+        'fractal_type': 'Julia',
+        'center_x': 0.0, 'center_y': 0.0,
+        'zoom': 1.5, 'max_iterations': 400,
+        'c_real': -0.4, 'c_imag': 0.6
+    },
+    {
+        'name': 'Жюлиа - Снежинки',
+        'fractal_type': 'Julia',
+        'center_x': 0.0, 'center_y': 0.0,
+        'zoom': 1.8, 'max_iterations': 350,
+        'c_real': 0.285, 'c_imag': 0.01
+    },
+    {
+        'name': 'Жюлиа - Огненный цветок',
+        'fractal_type': 'Julia',
+        'center_x': 0.0, 'center_y': 0.0,
+        'zoom': 1.3, 'max_iterations': 280,
+        'c_real': -0.8, 'c_imag': 0.156
+    },
+    {
+        'name': 'Жюлиа - Космическая спираль',
+        'fractal_type': 'Julia',
+        'center_x': 0.0, 'center_y': 0.0,
+        'zoom': 1.6, 'max_iterations': 320,
+        'c_real': -0.70176, 'c_imag': -0.3842
+    }
+]
+
 
 class Database:
     def __init__(self, db_path="fractals.db"):
@@ -84,65 +144,6 @@ class Database:
 
     def _add_default_presets(self):
         """Добавляет стандартные пресеты при инициализации БД"""
-        presets = [
-            # Мандельброт пресеты
-            {
-                'name': 'Классический Мандельброт',
-                'fractal_type': 'Mandelbrot',
-                'center_x': -0.5, 'center_y': 0.0,
-                'zoom': 1.0, 'max_iterations': 256
-            },
-            {
-                'name': 'Мандельброт - спирали',
-                'fractal_type': 'Mandelbrot',
-                'center_x': -0.743, 'center_y': 0.126,
-                'zoom': 200.0, 'max_iterations': 512
-            },
-            {
-                'name': 'Мандельброт - острова',
-                'fractal_type': 'Mandelbrot',
-                'center_x': -1.250, 'center_y': 0.020,
-                'zoom': 80.0, 'max_iterations': 300
-            },
-
-            # Жюлиа пресеты (красивые!)
-            {
-                'name': 'Жюлиа - Дракон',
-                'fractal_type': 'Julia',
-                'center_x': 0.0, 'center_y': 0.0,
-                'zoom': 1.2, 'max_iterations': 300,
-                'c_real': -0.7269, 'c_imag': 0.1889
-            },
-            {
-                'name': 'Жюлиа - Кружева',
-                'fractal_type': 'Julia',
-                'center_x': 0.0, 'center_y': 0.0,
-                'zoom': 1.5, 'max_iterations': 400,
-                'c_real': -0.4, 'c_imag': 0.6
-            },
-            {
-                'name': 'Жюлиа - Снежинки',
-                'fractal_type': 'Julia',
-                'center_x': 0.0, 'center_y': 0.0,
-                'zoom': 1.8, 'max_iterations': 350,
-                'c_real': 0.285, 'c_imag': 0.01
-            },
-            {
-                'name': 'Жюлиа - Огненный цветок',
-                'fractal_type': 'Julia',
-                'center_x': 0.0, 'center_y': 0.0,
-                'zoom': 1.3, 'max_iterations': 280,
-                'c_real': -0.8, 'c_imag': 0.156
-            },
-            {
-                'name': 'Жюлиа - Космическая спираль',
-                'fractal_type': 'Julia',
-                'center_x': 0.0, 'center_y': 0.0,
-                'zoom': 1.6, 'max_iterations': 320,
-                'c_real': -0.70176, 'c_imag': -0.3842
-            }
-        ]
-
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
 
@@ -151,7 +152,7 @@ class Database:
             count = cursor.fetchone()[0]
 
             if count == 0:
-                for preset in presets:
+                for preset in DEFAULT_PRESETS:
                     cursor.execute('''
                         INSERT INTO fractal_presets 
                         (name, fractal_type, center_x, center_y, zoom, max_iterations, c_real, c_imag)
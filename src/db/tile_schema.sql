@@ -0,0 +1,17 @@
+-- Кэш тайлов итераций (отдельный файл рядом с fractals.db)
+CREATE TABLE IF NOT EXISTS tiles (
+    fractal_type TEXT NOT NULL,
+    c_real REAL NOT NULL,  -- 0 для Мандельброта
+    c_imag REAL NOT NULL,
+    step_x REAL NOT NULL,  -- Уровень пирамиды - шаг пикселя
+    step_y REAL NOT NULL,
+    tx TEXT NOT NULL,  -- Индексы тайла десятичной строкой: на глубоком зуме они больше int64
+    ty TEXT NOT NULL,
+    max_iterations INTEGER NOT NULL,
+    data BLOB NOT NULL,  -- zlib(int32 size x size), неизвестные пиксели = -1
+    size INTEGER NOT NULL,  -- Длина data в байтах
+    last_used REAL NOT NULL,
+    PRIMARY KEY (fractal_type, c_real, c_imag, step_x, step_y, tx, ty, max_iterations)
+);
+
+CREATE INDEX IF NOT EXISTS tiles_last_used ON tiles (last_used);
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+
+import numpy as np
+
+# Файл кэша тайлов лежит рядом с fractals.db
+TILE_STORE_NAME = "fractal_tiles.db"
+
+# Бюджет файла по умолчанию (сжатые тайлы занимают 1-5 КБ)
+DEFAULT_STORE_BYTES = 256 * 1024 * 1024
+
+# Сколько ждать (в секундах), пока другой процесс держит запись
+BUSY_TIMEOUT = 5.0
+
+# Версия tile_schema.sql (PRAGMA user_version); 2 - tx/ty хранятся как TEXT
+TILE_SCHEMA_VERSION = 2
+
+# Ошибки, при которых расчёт продолжается без диска
+STORE_ERRORS = (sqlite3.Error, OverflowError, ValueError)
+
+
+class TileStore:
+    """Тайлы итераций в SQLite, общие для перезапусков и нескольких процессов
+
+    Ключи - те же, что у TileCache. База работает в режиме WAL: читатели
+    не ждут писателя и видят согласованный снимок, поэтому вытеснение
+    (самые давно использованные тайлы, пока файл больше max_bytes) безопасно
+    при одновременном чтении из других процессов. Каждый вызов открывает
+    своё соединение, так что методы можно звать из любого потока.
+
+    Кэш необязателен: ошибки SQLite (база занята, диск полон) печатаются,
+    а расчёт идёт дальше без диска. Тайл при записи сливается с уже
+    лежащим в базе, поэтому частичный тайл одного процесса не затирает
+    посчитанные пиксели другого
+    """
+
+    def __init__(self, db_path=TILE_STORE_NAME, max_bytes=DEFAULT_STORE_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        # Ключи прочитанных тайлов: last_used обновляется пачкой в save(), а не на каждом кадре
+        self._touched = set()
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _init_db(self):
+        """Создание таблицы и включение WAL (режим сохраняется в файле)
+
+        Таблица старой версии схемы удаляется: это только кэш, тайлы
+        будут посчитаны заново
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < TILE_SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS tiles")
+            schema_path = os.path.join(os.path.dirname(__file__), 'tile_schema.sql')
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                conn.executescript(f.read())
+            conn.execute(f"PRAGMA user_version = {TILE_SCHEMA_VERSION}")
+            conn.commit()
+
+    @staticmethod
+    def _row_key(key):
+        fractal_type, c_real, c_imag, (step_x, step_y), tx, ty, max_iterations = key
+        return (fractal_type, c_real or 0.0, c_imag or 0.0, step_x, step_y,
+                str(tx), str(ty), max_iterations)
+
+    @staticmethod
+    def _select(conn, row_key, tile_size):
+        """Тайл из базы как массив (tile_size, tile_size) или None"""
+        row = conn.execute('''
+            SELECT data FROM tiles
+            WHERE fractal_type = ? AND c_real = ? AND c_imag = ? AND step_x = ?
+              AND step_y = ? AND tx = ? AND ty = ? AND max_iterations = ?
+        ''', row_key).fetchone()
+        if row is None:
+            return None
+        tile = np.frombuffer(zlib.decompress(row[0]), dtype=np.intc)
+        if tile.size != tile_size * tile_size:
+            return None  # Записан с другим размером тайла
+        return tile.reshape(tile_size, tile_size).copy()
+
+    def load(self, keys, tile_size):
+        """Тайлы по ключам TileCache: {ключ: массив}; отсутствующих в ответе нет"""
+        tiles = {}
+        try:
+            with closing(self._connect()) as conn:
+                for key in keys:
+                    tile = self._select(conn, self._row_key(key), tile_size)
+                    if tile is not None:
+                        tiles[key] = tile
+        except STORE_ERRORS as e:
+            print(f"❌ Кэш тайлов на диске недоступен, тайлы будут посчитаны: {e}")
+            return {}
+        with self._lock:
+            self._touched.update(tiles)
+        return tiles
+
+    def save(self, tiles):
+        """Записывает {ключ: массив} одной транзакцией и вытесняет лишнее
+
+        Тайл сливается с записанным: неизвестные (-1) пиксели нового берутся
+        из старого. Заодно обновляется last_used прочитанных с прошлого save()
+        """
+        with self._lock:
+            touched, self._touched = self._touched, set()
+        if not tiles and not touched:
+            return
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn:
+                # Чтение старых тайлов и запись - под одной блокировкой записи,
+                # чтобы другой процесс не вклинился между ними
+                conn.execute("BEGIN IMMEDIATE")
+                rows = []
+                for key, tile in tiles.items():
+                    row_key = self._row_key(key)
+                    tile = np.array(tile, dtype=np.intc)
+                    stored = self._select(conn, row_key, tile.shape[0])
+                    if stored is not None and stored.shape == tile.shape:
+                        np.copyto(tile, stored, where=tile < 0)
+                    data = zlib.compress(tile.tobytes(), 1)
+                    rows.append(row_key + (data, len(data), now))
+                conn.executemany('''
+                    INSERT OR REPLACE INTO tiles
+                    (fractal_type, c_real, c_imag, step_x, step_y, tx, ty, max_iterations,
+                     data, size, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.executemany('''
+                    UPDATE tiles SET last_used = ?
+                    WHERE fractal_type = ? AND c_real = ? AND c_imag = ? AND step_x = ?
+                      AND step_y = ? AND tx = ? AND ty = ? AND max_iterations = ?
+                ''', [(now,) + self._row_key(key) for key in touched - tiles.keys()])
+                self._evict(conn)
+                conn.commit()
+        except STORE_ERRORS as e:
+            print(f"❌ Не удалось записать кэш тайлов на диск: {e}")
+
+    def _evict(self, conn):
+        """Удаляет самые давно использованные тайлы, пока сумма больше max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM tiles ORDER BY last_used"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM tiles WHERE rowid = ?", victims)
+
+    def clear(self):
+        """Удаляет все тайлы"""
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM tiles")
+            conn.commit()
@@ -1,40 +1,84 @@
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtGui import QImage, QPainter, QImageWriter
-from PyQt6.QtCore import Qt, QTimer, QPointF
+from PyQt6.QtGui import QPainter, QImageWriter
+from PyQt6.QtCore import Qt, QTimer, QPointF, QRect, QRectF, pyqtSignal
 import os
+import time
+from decimal import Decimal, localcontext
+import numpy as np
 from src.core.color_schemes import ColorSchemes
+from src.core.coloring import (
+    INTERIOR_COLOR, IterationHistogram, colorize, image_from_pixels, image_pixels, palette_lut
+)
+from src.core.perturbation import decimal_precision
+from src.core.reprojection import pixel_steps, reproject_frame
+from src.core.tile_cache import snap_center
+from src.core.worker import RecolorWorker
 
 
 class Canvas(QWidget):
+    # Среднее время кадра цикла палитры, мс (примерно раз в секунду)
+    cycle_frame_time = pyqtSignal(float)
+
     def __init__(self, width=800, height=600):
         super().__init__()
         self.setMinimumSize(400, 300)
         self.image = None
-        self.colormap = self._create_colormap()
-        self.pending_update = False
-        self.draw_timer = QTimer()
-        self.draw_timer.timeout.connect(self._deferred_update)
-        self.draw_timer.setSingleShot(True)
 
         # Параметры навигации
-        self.center_x = 0.0
-        self.center_y = 0.0
+        # Центр хранится в Decimal: при глубоком зуме точности double не хватает
+        self.center_x = Decimal(0)
+        self.center_y = Decimal(0)
         self.zoom = 1.0
-        self.max_iterations = 256
+        self.max_iterations = 256  # Предел итераций показанного кадра (fractal_data)
+        self.frame_max_iterations = 256  # То же для кадра, который сейчас собирается из тайлов
 
         # Для панорамирования
         self.is_panning = False
         self.last_mouse_pos = QPointF()
+        # Дробные остатки сдвига: центр смещается только на целые пиксели,
+        # чтобы прошлый кадр можно было переиспользовать (см. reprojection.py)
+        self.pan_remainder = QPointF()
+
+        # Зум только в 2 раза: часть точек нового кадра берётся из прошлого
+        # (см. reprojection.py)
+        self.snap_zoom = False
+
+        # Изображение последнего полностью посчитанного кадра (fractal_data)
+        self.frame_image = None
+
+        # Раскраска с выравниванием гистограммы: shown - итерации того, что
+        # сейчас на экране (-1 - ещё не посчитано), histogram - их гистограмма
+        self.equalize = False
+        self.shown = None
+        self.histogram = IterationHistogram()
+
+        # Цикл палитры: палитра сдвигается на palette_offset, кадр не пересчитывается
+        self.palette_offset = 0
+        self.cycle_timer = QTimer()
+        self.cycle_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.cycle_timer.timeout.connect(self._cycle_step)
+        self._cycle_indices = None  # Индекс палитры каждого пикселя shown (внутренние - len(палитры))
+        self._cycle_key = None
+        self._cycle_stats = (0, 0.0, time.perf_counter())  # Кадров, секунд, начало окна
+        self.assembling = False  # Идёт сборка кадра из тайлов - цикл на паузе
+        self.frame_image_stale = False  # frame_image раскрашено старым сдвигом палитры
 
         # Для автоматического пересчёта
         self.recalculation_callback = None
 
+        # Перекраска в фоне: один поток, последний запрос ждёт своей очереди
+        self.recolor_worker = None
+        self._recolor_generation = 0
+        self._pending_recolor = None
+        self.recolor_deferred = False  # Палитра сменилась во время сборки кадра - перекрасить в finish_frame
+
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)  # Чтобы получать события клавиатуры
         self.setMouseTracking(True)  # Отслеживание движения мыши
 
         # настройка градиентов для фракталов
         self.current_color_scheme = "classic"
         self.colormap = ColorSchemes.get_scheme(self.current_color_scheme)
+        self.palette_lut = ColorSchemes.get_lut(self.current_color_scheme)  # Та же палитра как uint32 0xFFRRGGBB
 
     def set_recalculation_callback(self, callback):
         """Устанавливает функцию для пересчёта фрактала"""
@@ -48,6 +92,7 @@ class Canvas(QWidget):
             # Начало панорамирования
             self.is_panning = True
             self.last_mouse_pos = event.position()
+            self.pan_remainder = QPointF()
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
 
     def mouseReleaseEvent(self, event):
@@ -78,28 +123,35 @@ class Canvas(QWidget):
         world_width = scale
         world_height = scale / aspect_ratio
 
-        mouse_x = (point.x() - width / 2.0) * world_width / width + self.center_x
-        mouse_y = (point.y() - height / 2.0) * world_height / height + self.center_y
+        offset_x = (point.x() - width / 2.0) * world_width / width
+        offset_y = (point.y() - height / 2.0) * world_height / height
 
         # Увеличиваем зум
-        self.zoom *= 1.5
+        self.zoom *= 2.0 if self.snap_zoom else 1.5
 
         # Новый центр - точка клика
-        self.center_x = mouse_x
-        self.center_y = mouse_y
+        self._shift_center(offset_x, offset_y)
 
         self._recalculate_fractal()
 
     def _zoom_at_center(self, zoom_factor):
         """Зум относительно центра"""
+        if self.snap_zoom:
+            zoom_factor = 2.0 if zoom_factor > 1 else 0.5
         self.zoom *= zoom_factor
         self._recalculate_fractal()
 
     def _pan(self, dx, dy):
-        """Панорамирование"""
+        """Панорамирование (на целое число пикселей, остаток копится)"""
         width = self.width()
         height = self.height()
 
+        self.pan_remainder += QPointF(dx, dy)
+        dx, dy = round(self.pan_remainder.x()), round(self.pan_remainder.y())
+        if dx == 0 and dy == 0:
+            return
+        self.pan_remainder -= QPointF(dx, dy)
+
         scale = 2.0 / self.zoom
         aspect_ratio = width / height
         world_width = scale
@@ -109,28 +161,49 @@ class Canvas(QWidget):
         delta_x = -dx * world_width / width
         delta_y = -dy * world_height / height
 
-        self.center_x += delta_x
-        self.center_y += delta_y
+        self._shift_center(delta_x, delta_y)
 
         self._recalculate_fractal()
 
+    def _shift_center(self, delta_x, delta_y):
+        """Сдвигает центр на (delta_x, delta_y) без потери точности при глубоком зуме"""
+        with localcontext() as ctx:
+            ctx.prec = decimal_precision(self.zoom, max(self.width(), 1))
+            self.center_x += Decimal(delta_x)
+            self.center_y += Decimal(delta_y)
+
+    def _snap_to_tile_grid(self):
+        """Сдвигает центр меньше чем на полпикселя, чтобы кадр лёг на сетку тайлов
+
+        На сетке кадр собирается из кэша тайлов, а при зуме ровно в 2 раза
+        сетки старого и нового кадров совпадают (см. reprojection.py)
+        """
+        width, height = self.width(), self.height()
+        step_x, step_y = pixel_steps({'zoom': self.zoom, 'width': width, 'height': height})
+        self.center_x = snap_center(self.center_x, step_x, width, self.zoom)
+        self.center_y = snap_center(self.center_y, step_y, height, self.zoom)
+
     def _recalculate_fractal(self):
         """Запускает пересчёт фрактала"""
         if self.recalculation_callback:
-            params = {
-                'center_x': self.center_x,
-                'center_y': self.center_y,
-                'zoom': self.zoom,
-                'width': self.width(),
-                'height': self.height(),
-                'max_iterations': self.max_iterations
-            }
-            self.recalculation_callback(params)
+            self._snap_to_tile_grid()
+            self.recalculation_callback(self.view_params())
+
+    def view_params(self):
+        """Параметры расчёта для текущего вида canvas"""
+        return {
+            'center_x': self.center_x,
+            'center_y': self.center_y,
+            'zoom': self.zoom,
+            'width': self.width(),
+            'height': self.height(),
+            'max_iterations': self.max_iterations
+        }
 
     def reset_view(self):
         """Сброс к начальному виду"""
-        self.center_x = 0.0
-        self.center_y = 0.0
+        self.center_x = Decimal(0)
+        self.center_y = Decimal(0)
         self.zoom = 1.0
         self._recalculate_fractal()
 
@@ -144,63 +217,208 @@ class Canvas(QWidget):
 
     def set_params(self, center_x, center_y, zoom):
         """Устанавливает параметры вида"""
-        self.center_x = center_x
-        self.center_y = center_y
+        self.center_x = Decimal(center_x)
+        self.center_y = Decimal(center_y)
         self.zoom = zoom
 
-    def set_fractal_data(self, fractal_data):
-        """Устанавливает данные фрактала и планирует отрисовку"""
-        self.fractal_data = fractal_data
-        self._schedule_update()
+    def begin_frame(self, width, height, mapping=None, max_iterations=None):
+        """Готовит изображение к приходу тайлов нового кадра
+
+        Пока тайлы не пришли, на их месте остаётся последний готовый кадр того
+        же размера (тайлы и превью брошенного расчёта стираются: продолжение
+        орбит и кэш присылают только изменившиеся тайлы).
+        mapping=(ratio, bx, by) - как новый кадр ложится на последний готовый
+        (см. frame_mapping): его изображение сразу сдвигается и масштабируется,
+        а тайлы придут только там, где не хватает пикселей.
+        max_iterations - предел нового кадра: по нему красятся его тайлы, а
+        показанный кадр до finish_frame красится по своему
+        """
+        self.frame_max_iterations = max_iterations if max_iterations is not None else self.max_iterations
+        if self.image is None or self.image.width() != width or self.image.height() != height:
+            self.image = image_from_pixels(np.zeros((height, width), dtype=np.uint32))
+        self.assembling = True
+        if self.frame_image_stale and getattr(self, 'fractal_data', None) is not None:
+            # Цикл палитры писал только в image - прошлый кадр перекрашивается по текущему сдвигу
+            self.frame_image = image_from_pixels(self._colorize(self.fractal_data))
+            self.frame_image_stale = False
+        if self.shown is None or self.shown.shape != (height, width):
+            self.shown = np.full((height, width), -1, dtype=np.intc)
+            self.histogram.reset(self.shown)
+
+        if mapping is not None and self.frame_image is not None \
+                and self.frame_image.size() == self.image.size():
+            ratio, bx, by = mapping
+            self.image.fill(0)
+            painter = QPainter(self.image)
+            # Старый пиксель x оказывается в новом (x - bx) / ratio
+            painter.drawImage(QRectF(-bx / ratio, -by / ratio, width / ratio, height / ratio),
+                              self.frame_image, QRectF(self.frame_image.rect()))
+            painter.end()
+            fractal_data = getattr(self, 'fractal_data', None)
+            if fractal_data is not None and fractal_data.shape == self.shown.shape:
+                reproject_frame(fractal_data, mapping, self.shown)
+                self.histogram.reset(self.shown)
+            self.update()
+        elif self.frame_image is not None and self.frame_image.size() == self.image.size():
+            painter = QPainter(self.image)
+            painter.drawImage(0, 0, self.frame_image)
+            painter.end()
+            np.copyto(self.shown, self.fractal_data)
+            self.histogram.reset(self.shown)
+            self.update()
 
-    def _schedule_update(self):
-        """Планирует отрисовку (дебаунсинг)"""
-        if not self.draw_timer.isActive():
-            self.draw_timer.start(10)  # 10ms дебаунсинг
+    def abort_frame(self):
+        """Кадр не будет достроен (ошибка или отмена): снова показывается последний готовый
 
-    def _deferred_update(self):
-        """Отрисовка в основном цикле UI (не блокирует)"""
-        if hasattr(self, 'fractal_data'):
+        Сборка кадра закончена, поэтому цикл палитры снова работает
+        """
+        self.assembling = False
+        if getattr(self, 'fractal_data', None) is not None:
             self._create_image_from_data()
             self.update()
 
-    def _create_image_from_data(self):
-        """Создаёт QImage из данных фрактала (может быть медленным)"""
-        height, width = self.fractal_data.shape
-        self.image = QImage(width, height, QImage.Format.Format_RGB32)
-
-        # ОПТИМИЗАЦИЯ: используем bits() для прямого доступа к памяти
-        self.image.fill(0)  # Быстрая очистка
-
-        # Преобразуем данные в цвета
-        for y in range(height):
-            for x in range(width):
-                color = self._iterations_to_color(self.fractal_data[y, x])
-                self.image.setPixel(x, y, self._qRgb(*color))
-
-    @staticmethod
-    def _create_colormap():
-        """Создаёт цветовую палитру с плавным градиентом"""
-        colors = []
-        for i in range(256):
-            if i < 64:
-                r, g, b = 0, 0, i * 4
-            elif i < 128:
-                r, g, b = 0, (i - 64) * 4, 255
-            elif i < 192:
-                r, g, b = (i - 128) * 4, 255, 255
-            else:
-                r, g, b = 255, 255, 255
-            colors.append((r, g, b))
-        return colors
-
-    def _iterations_to_color(self, iterations):
-        """Преобразует количество итераций в RGB цвет по палитре"""
-        # print("iter")
-        if iterations < 0:
-            return 0, 0, 0  # Чёрный, если вне множества
-        return self.colormap[iterations % 256]
+    def show_preview(self, stride, data):
+        """Показывает грубое превью: каждый элемент data - квадрат stride x stride пикселей"""
+        if self.image is None:
+            return
+        preview = image_from_pixels(self._colorize(data, max_iterations=self.frame_max_iterations))
+
+        # Без сглаживания: крупные пиксели честнее показывают, что кадр ещё грубый
+        height, width = data.shape
+        preview = preview.scaled(width * stride, height * stride,
+                                 Qt.AspectRatioMode.IgnoreAspectRatio,
+                                 Qt.TransformationMode.FastTransformation)
+        painter = QPainter(self.image)
+        painter.drawImage(0, 0, preview)
+        painter.end()
+        self.update()
+
+    def update_tile(self, x, y, tile):
+        """Раскрашивает готовый тайл и перерисовывает только его область"""
+        if self.image is None:
+            return
+        height, width = tile.shape
+        shown = self.shown[y:y + height, x:x + width]
+        self.histogram.replace(shown, tile)
+        shown[...] = tile
+        self._paint_region(tile, x, y, self.frame_max_iterations)
+        self.update(self._image_to_widget_rect(QRect(x, y, width, height)))
+
+    def finish_frame(self, fractal_data, max_iterations=None):
+        """Кадр собран из тайлов: изображение уже готово, сохраняем данные
+
+        max_iterations - предел, с которым кадр посчитан (по умолчанию - из begin_frame)
+        """
+        self.fractal_data = fractal_data
+        self.max_iterations = max_iterations if max_iterations is not None else self.frame_max_iterations
+        self.frame_image = self.image.copy()
+        # Тайлы красились по неполной гистограмме или часть из них - старой палитрой:
+        # весь кадр перекрашивается по итоговой
+        recolor = self.equalize or self.recolor_deferred
+        self._track_frame(fractal_data)
+        if recolor:
+            self._recolor()
+
+    def _track_frame(self, fractal_data):
+        """Запоминает показанный кадр и пересчитывает его гистограмму"""
+        self.shown = np.array(fractal_data, dtype=np.intc)
+        self.histogram.reset(self.shown)
+        self.assembling = False
+        self.recolor_deferred = False
+        self.frame_image_stale = False
+        self._cycle_indices = None
+
+    def _image_to_widget_rect(self, rect):
+        """Область изображения -> область виджета (изображение растянуто на весь виджет)"""
+        scale_x = self.width() / self.image.width()
+        scale_y = self.height() / self.image.height()
+        return QRectF(rect.x() * scale_x, rect.y() * scale_y,
+                      rect.width() * scale_x, rect.height() * scale_y).toAlignedRect().adjusted(-1, -1, 1, 1)
 
+    def _create_image_from_data(self):
+        """Создаёт QImage из данных фрактала: одна векторная раскраска всего кадра"""
+        self._track_frame(self.fractal_data)
+        self.image = image_from_pixels(self._colorize(self.fractal_data))
+        self.frame_image = self.image.copy()
+
+    def _colorize(self, data, out=None, max_iterations=None):
+        """Итерации -> пиксели 0xFFRRGGBB по текущей палитре (внутренние точки - чёрные)
+
+        max_iterations - предел кадра data (по умолчанию - показанного)
+        """
+        if max_iterations is None:
+            max_iterations = self.max_iterations
+        return colorize(data, self._color_lut(max_iterations), max_iterations, out)
+
+    def _color_lut(self, max_iterations=None):
+        """LUT для colorize: палитра со сдвигом цикла, при выравнивании - по гистограмме кадра"""
+        lut = self.palette_lut
+        if self.palette_offset:
+            lut = np.roll(lut, -self.palette_offset)
+        if self.equalize:
+            return self.histogram.equalized_lut(
+                lut, self.max_iterations if max_iterations is None else max_iterations)
+        return lut
+
+    def set_palette_cycling(self, enabled):
+        """Запускает или останавливает цикл палитры с частотой обновления экрана"""
+        if not enabled:
+            self.cycle_timer.stop()
+            return
+        screen = self.screen()
+        rate = screen.refreshRate() if screen is not None else 0
+        self.cycle_timer.setInterval(max(1, round(1000 / rate)) if rate > 0 else 16)
+        self._cycle_stats = (0, 0.0, time.perf_counter())
+        self.cycle_timer.start()
+
+    def _cycle_step(self):
+        """Кадр цикла: сдвиг палитры на 1 и одна выборка по готовым индексам пикселей
+
+        Индексы (итерации по модулю палитры или по гистограмме) строятся один
+        раз на кадр фрактала, поэтому шаг - только np.take по LUT из
+        len(палитры) + 1 цветов прямо в память изображения
+        """
+        if self.image is None or self.shown is None or self.assembling:
+            return
+        start = time.perf_counter()
+        size = len(self.palette_lut)
+        self.palette_offset = (self.palette_offset + 1) % size
+
+        key = (size, self.max_iterations, self.equalize)
+        if self._cycle_indices is None or self._cycle_key != key:
+            self._cycle_indices = self._palette_indices()
+            self._cycle_key = key
+        lut = np.empty(size + 1, dtype=np.uint32)
+        lut[:size] = np.roll(self.palette_lut, -self.palette_offset)
+        lut[size] = INTERIOR_COLOR
+        # Индексы уже в границах: mode='clip' избавляет take от проверки и буфера
+        np.take(lut, self._cycle_indices, out=image_pixels(self.image), mode='clip')
+        self.frame_image_stale = True
+        self.update()
+
+        frames, elapsed, window = self._cycle_stats
+        frames, elapsed = frames + 1, elapsed + time.perf_counter() - start
+        if start - window >= 1.0:
+            self.cycle_frame_time.emit(elapsed / frames * 1000)
+            frames, elapsed, window = 0, 0.0, start
+        self._cycle_stats = (frames, elapsed, window)
+
+    def _palette_indices(self):
+        """Индекс палитры каждого пикселя shown; внутренние и непосчитанные - len(палитры)"""
+        size = len(self.palette_lut)
+        if self.equalize:
+            table = self.histogram.equalized_indices(size, self.max_iterations)
+            indices = table[np.clip(self.shown, 0, self.max_iterations - 1)]
+        else:
+            indices = self.shown % size
+        indices[(self.shown < 0) | (self.shown >= self.max_iterations)] = size
+        # intp, а не uint16: take не приходится преобразовывать индексы на каждом кадре
+        return indices.astype(np.intp, copy=False)
+
+    def _paint_region(self, data, x0, y0, max_iterations=None):
+        """Раскрашивает data прямо в память изображения, в прямоугольник с углом (x0, y0)"""
+        height, width = data.shape
+        self._colorize(data, image_pixels(self.image)[y0:y0 + height, x0:x0 + width], max_iterations)
 
     def paintEvent(self, event):
         """Только быстрая отрисовка готового изображения"""
@@ -208,10 +426,6 @@ class Canvas(QWidget):
             painter = QPainter(self)
             painter.drawImage(self.rect(), self.image)
 
-    def _qRgb(self, r, g, b):
-        """Вспомогательный метод для создания QRgb"""
-        return (r << 16) | (g << 8) | b
-
     def export_image(self, filename, quality=100):
         """Экспортирует текущее изображение в файл"""
         if self.image:
@@ -234,15 +448,74 @@ class Canvas(QWidget):
     def set_color_scheme(self, scheme_name):
         """Устанавливает цветовую схему"""
         self.current_color_scheme = scheme_name
-        self.colormap = ColorSchemes.get_scheme(scheme_name)
-        if hasattr(self, 'fractal_data'):
-            self._create_image_from_data()
-            self.update()
+        self.set_palette(ColorSchemes.get_scheme(scheme_name), ColorSchemes.get_lut(scheme_name))
 
     def set_custom_colors(self, colors_list):
         """Устанавливает кастомную цветовую схему"""
         self.current_color_scheme = "custom"
-        self.colormap = ColorSchemes.custom_scheme(colors_list)
-        if hasattr(self, 'fractal_data'):
-            self._create_image_from_data()
-            self.update()
\ No newline at end of file
+        colormap = ColorSchemes.custom_scheme(colors_list)
+        self.set_palette(colormap, palette_lut(colormap))
+
+    def preview_color_scheme(self, scheme_name):
+        """Показывает кадр в другой схеме, не меняя current_color_scheme (наведение в диалоге)"""
+        self.set_palette(ColorSchemes.get_scheme(scheme_name), ColorSchemes.get_lut(scheme_name))
+
+    def set_equalized(self, enabled):
+        """Включает раскраску с выравниванием гистограммы и перекрашивает кадр"""
+        self.equalize = enabled
+        self._cycle_indices = None
+        self._recolor()
+
+    def set_palette(self, colormap, lut):
+        """Меняет палитру и перекрашивает показанный кадр в фоне (без пересчёта)"""
+        self.colormap = colormap
+        self.palette_lut = lut
+        self.palette_offset %= len(lut)
+        self._cycle_indices = None
+        self._recolor()
+
+    def _recolor(self):
+        """Ставит перекраску fractal_data текущей палитрой в очередь фонового потока
+
+        Пока поток занят, ждёт только последний запрос: промежуточные
+        палитры (быстрое наведение по списку) пропускаются. Во время сборки
+        кадра перекраска откладывается до finish_frame: на экране уже тайлы
+        нового кадра, а fractal_data - ещё старый
+        """
+        fractal_data = getattr(self, 'fractal_data', None)
+        if fractal_data is None:
+            return
+        if self.assembling:
+            self.recolor_deferred = True
+            return
+        self._recolor_generation += 1
+        request = (self._recolor_generation, fractal_data, self._color_lut(), self.max_iterations)
+        if self.recolor_worker is not None and self.recolor_worker.isRunning():
+            self._pending_recolor = request
+            return
+        self._start_recolor(request)
+
+    def _start_recolor(self, request):
+        self.recolor_worker = RecolorWorker(*request)
+        self.recolor_worker.recolored.connect(self._on_recolored)
+        self.recolor_worker.finished.connect(self._on_recolor_finished)
+        self.recolor_worker.start()
+
+    def _on_recolored(self, generation, pixels, frame_pixels):
+        """Готова перекраска: изображение подменяется целиком, если запрос ещё актуален"""
+        if generation != self._recolor_generation or self.sender().data is not self.fractal_data:
+            return
+        if self.assembling:
+            # Перекраска старого кадра стёрла бы пришедшие тайлы нового
+            self.recolor_deferred = True
+            return
+        if self.cycle_timer.isActive():
+            return  # Цикл палитры сам перекрашивает кадр, и его сдвиг уже ушёл вперёд
+        self.image = image_from_pixels(pixels)
+        self.frame_image = image_from_pixels(frame_pixels)
+        self.update()
+
+    def _on_recolor_finished(self):
+        if self._pending_recolor is not None:
+            request, self._pending_recolor = self._pending_recolor, None
+            self._start_recolor(request)
\ No newline at end of file
@@ -3,12 +3,16 @@ from PyQt6.QtWidgets import (
     QLabel, QListWidget, QColorDialog, QFrame, QScrollArea, QWidget,
     QGridLayout
 )
-from PyQt6.QtGui import QPainter, QColor, QLinearGradient
-from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter, QLinearGradient
+from PyQt6.QtCore import Qt, QRectF, QEvent, pyqtSignal
 from src.core.color_schemes import ColorSchemes
+from src.core.coloring import image_from_pixels
 
 
 class ColorSchemeDialog(QDialog):
+    # Схема под курсором или выбранная в списке - для живого превью на canvas
+    scheme_previewed = pyqtSignal(str)
+
     def __init__(self, current_scheme, parent=None):
         super().__init__(parent)
         self.current_scheme = current_scheme
@@ -25,10 +29,7 @@ class ColorSchemeDialog(QDialog):
         layout.addWidget(QLabel("Предустановленные схемы:"))
 
         self.scheme_list = QListWidget()
-        schemes = [
-            "classic", "rainbow", "fire", "ocean",
-            "forest", "pink_dream", "neon", "sunset"
-        ]
+        schemes = ColorSchemes.SCHEME_NAMES
 
         scheme_names = {
             "classic": "Классическая",
@@ -48,6 +49,11 @@ class ColorSchemeDialog(QDialog):
         self.preview = ColorSchemePreview()
         self.scheme_list.currentRowChanged.connect(self._on_scheme_selected)
 
+        # Наведение на схему сразу показывает её на canvas, уход курсора возвращает выбранную
+        self.scheme_list.setMouseTracking(True)
+        self.scheme_list.itemEntered.connect(self._on_scheme_hovered)
+        self.scheme_list.viewport().installEventFilter(self)
+
         # Кнопка создания кастомной схемы
         self.btn_custom = QPushButton("Создать свою схему")
         self.btn_custom.clicked.connect(self._create_custom_scheme)
@@ -91,10 +97,22 @@ class ColorSchemeDialog(QDialog):
             self.scheme_list.setCurrentRow(index)
 
     def _on_scheme_selected(self, row):
-        schemes = ["classic", "rainbow", "fire", "ocean", "forest", "pink_dream", "neon", "sunset"]
+        schemes = ColorSchemes.SCHEME_NAMES
         if 0 <= row < len(schemes):
             self.selected_scheme = schemes[row]
             self.preview.set_scheme(self.selected_scheme)
+            self.scheme_previewed.emit(self.selected_scheme)
+
+    def _on_scheme_hovered(self, item):
+        row = self.scheme_list.row(item)
+        if 0 <= row < len(ColorSchemes.SCHEME_NAMES):
+            self.scheme_previewed.emit(ColorSchemes.SCHEME_NAMES[row])
+
+    def eventFilter(self, obj, event):
+        if obj is self.scheme_list.viewport() and event.type() == QEvent.Type.Leave \
+                and self.selected_scheme in ColorSchemes.SCHEME_NAMES:
+            self.scheme_previewed.emit(self.selected_scheme)
+        return super().eventFilter(obj, event)
 
     def _create_custom_scheme(self):
         self.custom_widget.show()
@@ -123,16 +141,7 @@ class ColorSchemePreview(QFrame):
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        colors = ColorSchemes.get_scheme(self.scheme_name)
-
-        width = self.width()
-        height = self.height()
-
-        for i, color in enumerate(colors):
-            x = (i / 256.0) * width
-            rect_width = width / 256.0
-
-            painter.fillRect(
-                int(x), 0, int(rect_width) + 1, height,
-                QColor(color[0], color[1], color[2])
-            )
\ No newline at end of file
+        # Палитра - изображение в одну строку, растянутое на всю рамку
+        lut = ColorSchemes.get_lut(self.scheme_name)
+        painter.drawImage(QRectF(self.rect()), image_from_pixels(lut.reshape(1, -1)))
+        painter.end()
\ No newline at end of file
@@ -4,14 +4,20 @@ from PyQt6.QtWidgets import (
     QPushButton, QProgressBar, QStatusBar, QApplication, QInputDialog,
     QDialog, QVBoxLayout, QFileDialog, QMessageBox
 )
+import os
 import sys
 
 sys.path.append(sys.path[0][:-6])
 from PyQt6.QtGui import QAction
-from PyQt6.QtCore import QThread, Qt
+from PyQt6.QtCore import QSignalBlocker, QThread, Qt
 from src.ui.canvas import Canvas
 from src.core.worker import FractalWorker
+from src.core.fractal_engine import get_engine
+from src.core.reprojection import frame_mapping
+from src.core.scheduler import RenderScheduler
+from src.core.tile_cache import TileCache
 from src.db.database import Database
+from src.db.tile_store import TILE_STORE_NAME, TileStore
 from src.ui.gallery_dialog import GalleryDialog
 from src.resources.themes import Themes
 from src.ui.color_dialog import ColorSchemeDialog
@@ -23,8 +29,16 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Fractal Explorer")
         self.setGeometry(100, 100, 1200, 800)
 
-        self.worker = None
+        self.engine = get_engine()  # Общий движок: пул буферов переживает расчёты
+        # Все расчёты идут через планировщик: пачка запросов навигации сливается
+        # в один, устаревшие результаты отбрасываются, потоки пула постоянные
+        self.scheduler = RenderScheduler(self._create_worker, engine=self.engine)
+        self.frame_view = None  # (тип фрактала, параметры) кадра, показанного на canvas
         self.db = Database()
+        # Уже посчитанные тайлы: возврат к недавнему виду не считается заново,
+        # а файл рядом с fractals.db переживает перезапуск
+        store_path = os.path.join(os.path.dirname(os.path.abspath(self.db.db_path)), TILE_STORE_NAME)
+        self.tile_cache = TileCache(store=TileStore(store_path))
         self.current_theme = "light"
 
         self._setup_ui()
@@ -53,6 +67,20 @@ class MainWindow(QMainWindow):
         gallery_menu.addSeparator()
         # gallery_menu.addAction(self.gallery_action)
 
+        # Меню вида
+        view_menu = QMenu("Вид", self)
+        menubar.addMenu(view_menu)
+
+        self.snap_zoom_action = QAction("Зум ×2 (переиспользовать пиксели)", self)
+        self.snap_zoom_action.setCheckable(True)
+        view_menu.addAction(self.snap_zoom_action)
+        self.equalize_action = QAction("Выравнивание гистограммы", self)
+        self.equalize_action.setCheckable(True)
+        view_menu.addAction(self.equalize_action)
+        self.cycle_action = QAction("Цикл палитры", self)
+        self.cycle_action.setCheckable(True)
+        view_menu.addAction(self.cycle_action)
+
         self.setMenuBar(menubar)
 
         # Статус-бар
@@ -151,12 +179,25 @@ class MainWindow(QMainWindow):
         self.export_action.triggered.connect(self._export)
         self.save_preset_action.triggered.connect(self._save_preset)
         self.load_preset_action.triggered.connect(self._load_preset)
+        self.snap_zoom_action.toggled.connect(self._toggle_snap_zoom)
+        self.equalize_action.toggled.connect(self._toggle_equalize)
+        self.cycle_action.toggled.connect(self.canvas.set_palette_cycling)
+        self.canvas.cycle_frame_time.connect(self._on_cycle_frame_time)
         # self.gallery_action.triggered.connect(self._show_gallery)
         self.btn_compute.clicked.connect(self._button_compute)
         self.btn_reset.clicked.connect(self.canvas.reset_view)
+        # Не valueChanged: каждая цифра и шаг стрелкой запускали бы расчёт
+        self.iterations.editingFinished.connect(self._on_iterations_changed)
 
         self.canvas.set_recalculation_callback(self._on_navigation_changed)
 
+        self.scheduler.progress_updated.connect(self._on_progress_updated)
+        self.scheduler.preview_ready.connect(self._on_preview_ready)
+        self.scheduler.tile_ready.connect(self._on_tile_ready)
+        self.scheduler.calculation_finished.connect(self._on_calculation_finished)
+        self.scheduler.error_occurred.connect(self._on_calculation_error)
+        self.scheduler.calculation_cancelled.connect(self._on_calculation_cancelled)
+
     def _setup_themes_menu(self):
         """Добавляем меню выбора темы"""
         theme_menu = QMenu("Темы", self)
@@ -252,7 +293,7 @@ class MainWindow(QMainWindow):
 
     def _button_compute(self):
         """Запуск вычислений в отдельном потоке"""
-        if self.worker and self.worker.isRunning():
+        if self.scheduler.is_busy():
             self.statusBar().showMessage("Вычисления уже запущены...")
             return
 
@@ -263,36 +304,82 @@ class MainWindow(QMainWindow):
         params = self._get_fractal_params()
         fractal_type = self.fractal_type.currentText()
 
-        self.worker = FractalWorker(fractal_type, params)
-        self.worker.progress_updated.connect(self._on_progress_updated)
-        self.worker.calculation_finished.connect(self._on_calculation_finished)
-        self.worker.error_occurred.connect(self._on_calculation_error)
-
-        self.worker.start()
+        # Навигация и смена итераций дальше идут от этого вида
+        self.canvas.set_params(params['center_x'], params['center_y'], params['zoom'])
+        self.scheduler.request(fractal_type, params)
         self.statusBar().showMessage("Вычисления запущены...")
 
+    def _create_worker(self, fractal_type, params, progressive=False, resume=None):
+        """Создаёт расчёт для планировщика; превью и тайлы сразу рисуются на canvas
+
+        Вызывается в момент запуска, а не запроса: кадр переиспользуется
+        по тому состоянию canvas, которое есть сейчас
+        """
+        mapping = self._frame_mapping(fractal_type, params) if progressive else None
+        self.canvas.begin_frame(params['width'], params['height'], mapping, params['max_iterations'])
+        if resume is not None:
+            # Тот же вид с большим max_iterations: продолжаются только незавершённые орбиты
+            return FractalWorker(fractal_type, params, resume=resume, cache=self.tile_cache)
+        if mapping is not None:
+            # Панорамирование или зум x2: прошлый кадр переносится на новую сетку,
+            # считаются только недостающие пиксели
+            reuse = (self.canvas.fractal_data, mapping)
+            return FractalWorker(fractal_type, params, reuse=reuse, cache=self.tile_cache)
+        return FractalWorker(fractal_type, params, progressive=progressive, cache=self.tile_cache)
+
+    def _frame_mapping(self, fractal_type, params):
+        """Как params ложится на сетку показанного кадра (frame_mapping) или None"""
+        if self.frame_view is None or getattr(self.canvas, 'fractal_data', None) is None:
+            return None
+        frame_type, frame_params = self.frame_view
+        if frame_type != fractal_type:
+            return None
+        return frame_mapping(frame_params, params)
+
     def _on_progress_updated(self, progress):
         """Обновление прогресс-бара"""
         self.progress.setValue(progress)
 
+    def _on_preview_ready(self, stride, preview):
+        """Готово грубое превью текущего расчёта"""
+        self.canvas.show_preview(stride, preview)
+
+    def _on_tile_ready(self, x, y, tile):
+        """Готов очередной тайл текущего расчёта (тайлы устаревших отброшены планировщиком)"""
+        self.canvas.update_tile(x, y, tile)
+
     def _on_calculation_finished(self, result):
         """Вычисления завершены успешно"""
-        self.canvas.set_fractal_data(result)
+        previous = getattr(self.canvas, 'fractal_data', None)
+        worker = self.scheduler.current
+        # Предел итераций canvas меняется только вместе с показанным кадром
+        self.canvas.finish_frame(result, worker.params['max_iterations'])
+        self.frame_view = (worker.fractal_type, dict(worker.params))
+        # Прошлый кадр больше не нужен - его буфер достанется следующему расчёту
+        if previous is not None and previous is not result:
+            self.engine.release(previous)
         self.progress.setValue(100)
         self.btn_compute.setEnabled(True)
         self.statusBar().showMessage("Готово!")
 
     def _on_calculation_error(self, error_msg):
         """Обработка ошибок"""
+        self.canvas.abort_frame()
         self.progress.setValue(0)
         self.btn_compute.setEnabled(True)
         self.statusBar().showMessage(error_msg)
 
+    def _on_calculation_cancelled(self):
+        """Расчёт отменён без нового запроса: на экране остаётся последний готовый кадр"""
+        self.canvas.abort_frame()
+        self.progress.setValue(0)
+        self.btn_compute.setEnabled(True)
+
     def closeEvent(self, event):
-        """При закрытии окна останавливаем worker если он запущен"""
-        if self.worker and self.worker.isRunning():
-            self.worker.cancel()
-            self.worker.wait(1000)
+        """При закрытии окна отменяем расчёт и останавливаем потоки планировщика"""
+        self.scheduler.shutdown()
+        if self.canvas.recolor_worker is not None:
+            self.canvas.recolor_worker.wait(1000)
         event.accept()
 
     def _on_canvas_resize(self):
@@ -343,7 +430,10 @@ class MainWindow(QMainWindow):
             self.xmax.setValue(preset['center_x'] + range_x / 2)
             self.ymin.setValue(preset['center_y'] - range_y / 2)
             self.ymax.setValue(preset['center_y'] + range_y / 2)
+            # Загрузка пресета только заполняет поля, расчёт запускает кнопка
+            blocker = QSignalBlocker(self.iterations)
             self.iterations.setValue(preset['max_iterations'])
+            blocker.unblock()
 
             if preset['fractal_type'] == 'Julia':
                 if preset['c_real'] is not None:
@@ -364,34 +454,64 @@ class MainWindow(QMainWindow):
         """Вызывается когда пользователь изменяет вид через canvas"""
         self.statusBar().showMessage("Пересчёт...")
         self._update_ui_from_canvas(params)
+        self._start_calculation(self._complete_params(params), params)
 
+    def _complete_params(self, params):
+        """Дополняет параметры вида canvas полями панели; возвращает тип фрактала"""
+        params['max_iterations'] = self.iterations.value()
         fractal_type = self.fractal_type.currentText()
         if fractal_type == "Julia":
             params['c_real'] = self.c_real.value()
             params['c_imag'] = self.c_imag.value()
-
-        self._start_calculation(fractal_type, params)
+        return fractal_type
 
     def _update_ui_from_canvas(self, params):
         """Обновляет UI параметры из параметров canvas"""
         range_x = 2.0 / params['zoom']
         range_y = range_x * (params['height'] / params['width'])
+        center_x = float(params['center_x'])
+        center_y = float(params['center_y'])
 
-        self.xmin.setValue(params['center_x'] - range_x / 2)
-        self.xmax.setValue(params['center_x'] + range_x / 2)
-        self.ymin.setValue(params['center_y'] - range_y / 2)
-        self.ymax.setValue(params['center_y'] + range_y / 2)
+        self.xmin.setValue(center_x - range_x / 2)
+        self.xmax.setValue(center_x + range_x / 2)
+        self.ymin.setValue(center_y - range_y / 2)
+        self.ymax.setValue(center_y + range_y / 2)
 
     def _start_calculation(self, fractal_type, params):
-        """Запускает вычисления с новыми параметрами"""
-        if self.worker and self.worker.isRunning():
-            self.worker.cancel()
+        """Запускает вычисления с новыми параметрами
+
+        Используется при навигации: незаконченное уточнение прошлого вида
+        отменяется, а новый показывается сначала грубыми превью. Пока поток
+        не освободился, запросы сливаются - считается только последний вид
+        """
+        self.scheduler.request(fractal_type, params, progressive=True)
+
+    def _on_iterations_changed(self):
+        """Новый предел итераций (ввод закончен) применяется к текущему виду canvas
+
+        Если на экране этот же вид и предел вырос, кадр дорисовывается
+        с сохранённых орбит (resume), иначе - пересчитывается как при навигации
+        """
+        fractal_data = getattr(self.canvas, 'fractal_data', None)
+        if self.frame_view is None or fractal_data is None:
+            return
 
-        self.worker = FractalWorker(fractal_type, params)
-        self.worker.progress_updated.connect(self._on_progress_updated)
-        self.worker.calculation_finished.connect(self._on_calculation_finished)
-        self.worker.error_occurred.connect(self._on_calculation_error)
-        self.worker.start()
+        params = self.canvas.view_params()
+        fractal_type = self._complete_params(params)
+        value = params['max_iterations']
+        if (fractal_type, params) == self.frame_view:
+            return  # Поле потеряло фокус без изменений
+
+        frame_type, frame_params = self.frame_view
+        same_view = frame_type == fractal_type and \
+            frame_mapping(dict(frame_params, max_iterations=value), params) == (1.0, 0.0, 0.0)
+        orbits = getattr(fractal_data, 'orbits', None)
+        if same_view and orbits is not None and value > orbits.max_iterations:
+            self.statusBar().showMessage(f"Продолжение орбит до {value} итераций...")
+            self.scheduler.request(fractal_type, params, resume=fractal_data)
+        else:
+            self.statusBar().showMessage("Пересчёт...")
+            self.scheduler.request(fractal_type, params, progressive=True)
 
     def keyPressEvent(self, event):
         """Обработка горячих клавиш"""
@@ -406,6 +526,18 @@ class MainWindow(QMainWindow):
         else:
             super().keyPressEvent(event)
 
+    def _toggle_snap_zoom(self, enabled):
+        """Включает зум ровно в 2 раза: при нём досчитывается только 3/4 кадра"""
+        self.canvas.snap_zoom = enabled
+
+    def _toggle_equalize(self, enabled):
+        """Цвета по гистограмме кадра: палитра делится между пикселями поровну"""
+        self.canvas.set_equalized(enabled)
+
+    def _on_cycle_frame_time(self, milliseconds):
+        """Показывает, сколько стоит кадр цикла палитры"""
+        self.statusBar().showMessage(f"Цикл палитры: {milliseconds:.2f} мс/кадр")
+
     def _change_theme(self, theme_name):
         """Меняет тему приложения"""
         self.current_theme = theme_name
@@ -421,12 +553,17 @@ class MainWindow(QMainWindow):
     def _show_color_dialog(self):
         """Показывает диалог выбора цветовой схемы"""
         dialog = ColorSchemeDialog(self.canvas.current_color_scheme, self)
+        # Палитра до диалога: превью при наведении меняет только картинку
+        palette = (self.canvas.colormap, self.canvas.palette_lut)
+        dialog.scheme_previewed.connect(self.canvas.preview_color_scheme)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             if dialog.selected_scheme == "custom" and dialog.custom_colors:
                 self.canvas.set_custom_colors(dialog.custom_colors)
                 self.statusBar().showMessage("Применена кастомная цветовая схема")
             else:
                 self._change_color_scheme(dialog.selected_scheme)
+        else:
+            self.canvas.set_palette(*palette)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+"""Общие фикстуры тестов: движок из lib/ и приложение Qt без экрана"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Общий движок процесса; без собранной библиотеки тесты расчёта пропускаются"""
+    from src.core.fractal_engine import get_engine
+    try:
+        return get_engine()
+    except (FileNotFoundError, OSError) as e:
+        pytest.skip(f"Библиотека фракталов не собрана: {e}")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """Цикл событий для сигналов между потоками и виджетов (планировщик, холст)"""
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,86 @@
+"""Холст: сборка кадра из тайлов и перекраска в фоне"""
+import time
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+
+from src.core.color_schemes import ColorSchemes
+from src.core.coloring import colorize, image_pixels
+from src.ui.canvas import Canvas
+
+WIDTH, HEIGHT = 64, 48
+MAX_ITERATIONS = 100
+
+
+def frame(offset):
+    return ((np.arange(WIDTH * HEIGHT).reshape(HEIGHT, WIDTH) + offset) % MAX_ITERATIONS).astype(np.intc)
+
+
+def wait_recolor(canvas, timeout=10.0):
+    """Обрабатывает события, пока фоновая перекраска не закончится"""
+    deadline = time.monotonic() + timeout
+    while canvas.recolor_worker is not None and not canvas.recolor_worker.isFinished() \
+            or canvas._pending_recolor is not None:
+        assert time.monotonic() < deadline, "Перекраска не закончилась вовремя"
+        QApplication.processEvents()
+        time.sleep(0.001)
+    QApplication.processEvents()
+
+
+def expected_pixels(data, scheme):
+    return colorize(data, ColorSchemes.get_lut(scheme), MAX_ITERATIONS)
+
+
+def test_recolor_during_assembly_keeps_tiles(qapp):
+    canvas = Canvas()
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    canvas.finish_frame(frame(0), MAX_ITERATIONS)
+
+    # Перекраска старого кадра заканчивается, когда новый уже собирается
+    canvas.set_color_scheme("fire")
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    new = frame(7)
+    canvas.update_tile(0, 0, new[:16, :16])
+    wait_recolor(canvas)
+
+    np.testing.assert_array_equal(image_pixels(canvas.image)[:16, :16], expected_pixels(new[:16, :16], "fire"))
+
+    # Готовый кадр перекрашивается целиком: тайлы до смены палитры тоже
+    canvas.update_tile(16, 0, new[:, 16:])
+    canvas.update_tile(0, 16, new[16:, :16])
+    canvas.finish_frame(new, MAX_ITERATIONS)
+    wait_recolor(canvas)
+    np.testing.assert_array_equal(image_pixels(canvas.image), expected_pixels(new, "fire"))
+    np.testing.assert_array_equal(image_pixels(canvas.frame_image), expected_pixels(new, "fire"))
+
+
+def test_palette_change_during_assembly_recolors_finished_frame(qapp):
+    canvas = Canvas()
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    canvas.finish_frame(frame(0), MAX_ITERATIONS)
+
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    new = frame(3)
+    canvas.update_tile(0, 0, new[:, :32])  # Ещё старой палитрой
+    canvas.set_color_scheme("fire")
+    canvas.update_tile(32, 0, new[:, 32:])
+    canvas.finish_frame(new, MAX_ITERATIONS)
+    wait_recolor(canvas)
+
+    np.testing.assert_array_equal(image_pixels(canvas.image), expected_pixels(new, "fire"))
+
+
+def test_abort_shows_last_frame_in_current_palette(qapp):
+    canvas = Canvas()
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    old = frame(0)
+    canvas.finish_frame(old, MAX_ITERATIONS)
+
+    canvas.begin_frame(WIDTH, HEIGHT, max_iterations=MAX_ITERATIONS)
+    canvas.update_tile(0, 0, frame(5)[:16, :16])
+    canvas.set_color_scheme("fire")
+    canvas.abort_frame()
+    wait_recolor(canvas)
+
+    assert not canvas.assembling
+    np.testing.assert_array_equal(image_pixels(canvas.image), expected_pixels(old, "fire"))
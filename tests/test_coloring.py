@@ -0,0 +1,59 @@
+"""Раскраска итераций и гистограмма для выравнивания палитры"""
+import numpy as np
+
+from src.core.coloring import INTERIOR_COLOR, IterationHistogram, colorize, palette_lut
+
+MAX_ITERATIONS = 50
+
+
+def frame(seed=0, shape=(20, 30)):
+    """Случайные итерации с внутренними (= MAX_ITERATIONS) и непосчитанными (-1) пикселями"""
+    return np.random.default_rng(seed).integers(-1, MAX_ITERATIONS + 1, shape).astype(np.intc)
+
+
+def test_colorize_uses_lut_and_paints_interior():
+    lut = palette_lut([(255, 0, 0), (0, 255, 0), (0, 0, 255)])
+    data = frame()
+    pixels = colorize(data, lut, MAX_ITERATIONS)
+
+    outside = (data >= 0) & (data < MAX_ITERATIONS)
+    np.testing.assert_array_equal(pixels[outside], lut[data[outside] % len(lut)])
+    assert (pixels[(data < 0) | (data >= MAX_ITERATIONS)] == INTERIOR_COLOR).all()
+
+
+def test_histogram_replace_matches_rebuild():
+    data = frame()
+    histogram = IterationHistogram(data)
+    tile = frame(seed=1, shape=(8, 8))
+    histogram.replace(data[4:12, 10:18], tile)
+    data[4:12, 10:18] = tile
+
+    expected = IterationHistogram(data).counts
+    counts = histogram.counts[:len(expected)]
+    np.testing.assert_array_equal(counts, expected)
+    assert not histogram.counts[len(expected):].any()
+
+
+def test_equalized_indices_follow_cdf():
+    # Все ушедшие пиксели лежат в узкой полосе итераций 10..14
+    data = np.repeat(np.arange(10, 15, dtype=np.intc), 100)
+    indices = IterationHistogram(data).equalized_indices(256, MAX_ITERATIONS)
+
+    assert len(indices) == MAX_ITERATIONS
+    assert (np.diff(indices) >= 0).all()
+    assert indices[9] == 0 and indices[14] == 255
+    # Полоса из пяти итераций делит палитру поровну
+    np.testing.assert_array_equal(indices[10:15], [51, 102, 153, 204, 255])
+
+
+def test_equalization_without_escaped_pixels_is_plain_palette():
+    histogram = IterationHistogram(np.full((4, 4), MAX_ITERATIONS, dtype=np.intc))
+    np.testing.assert_array_equal(histogram.equalized_indices(16, MAX_ITERATIONS),
+                                  np.arange(MAX_ITERATIONS) % 16)
+
+
+def test_equalized_lut_picks_palette_colors():
+    lut = palette_lut([(0, 0, 0), (255, 255, 255)])
+    histogram = IterationHistogram(frame())
+    equalized = histogram.equalized_lut(lut, MAX_ITERATIONS)
+    np.testing.assert_array_equal(equalized, lut[histogram.equalized_indices(len(lut), MAX_ITERATIONS)])
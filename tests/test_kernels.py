@@ -0,0 +1,137 @@
+"""Ядра расчёта дают те же итерации, что и полный скалярный кадр"""
+import numpy as np
+import pytest
+
+from src.core.precision import choose_precision
+
+KERNELS = ("avx512", "avx2", "sse2")
+
+# (center_x, center_y, zoom, max_iterations): обзор и граница со спиралями
+VIEWS = ((-0.5, 0.0, 1.0, 200), (-0.745, 0.1, 300.0, 500))
+
+# Нечётный размер: у SIMD-ядер остаются хвосты строк меньше ширины вектора
+WIDTH, HEIGHT = 97, 61
+
+JULIA_C = (-0.7, 0.27015)
+
+
+@pytest.fixture
+def kernel(engine):
+    """Возвращает выбор ядра после теста"""
+    original = engine.kernel_variant
+    yield engine
+    engine.select_kernel(original)
+
+
+def render(engine, fractal_type, view, **options):
+    center_x, center_y, zoom, max_iterations = view
+    if fractal_type == "Julia":
+        result = engine.calculate_julia(*JULIA_C, center_x, center_y, zoom, WIDTH, HEIGHT,
+                                        max_iterations, **options)
+    else:
+        result = engine.calculate_mandelbrot(center_x, center_y, zoom, WIDTH, HEIGHT,
+                                             max_iterations, **options)
+    iterations = np.array(result)
+    smooth = None if result.smooth is None else np.array(result.smooth)
+    engine.release(result)
+    return iterations, smooth
+
+
+@pytest.mark.parametrize("variant", KERNELS)
+@pytest.mark.parametrize("precision", ("double", "double-double"))
+@pytest.mark.parametrize("fractal_type", ("Mandelbrot", "Julia"))
+@pytest.mark.parametrize("view", VIEWS)
+def test_simd_matches_scalar(kernel, variant, precision, fractal_type, view):
+    assert kernel.select_kernel("scalar")
+    expected, expected_smooth = render(kernel, fractal_type, view, precision=precision, smooth=True)
+    if not kernel.select_kernel(variant):
+        pytest.skip(f"Процессор не поддерживает {variant}")
+    iterations, smooth = render(kernel, fractal_type, view, precision=precision, smooth=True)
+
+    np.testing.assert_array_equal(iterations, expected)
+    np.testing.assert_array_equal(smooth, expected_smooth)
+
+
+@pytest.mark.parametrize("view", VIEWS)
+def test_float32_kernels_agree(kernel, view):
+    # У скалярного ядра нет float-версии (оно считает в double),
+    # поэтому float32 сравнивается только между SIMD-ядрами
+    frames = []
+    for variant in KERNELS:
+        if kernel.select_kernel(variant):
+            frames.append(render(kernel, "Mandelbrot", view, precision="float32")[0])
+    if len(frames) < 2:
+        pytest.skip("Меньше двух SIMD-ядер на этом процессоре")
+    for frame in frames[1:]:
+        np.testing.assert_array_equal(frame, frames[0])
+
+
+def test_guess_matches_full_render_on_solid_areas(engine):
+    # Главная кардиоида и периферия: границы прямоугольников однородны
+    view = (-0.75, 0.0, 4.0, 1000)
+    full, _ = render(engine, "Mandelbrot", view)
+    guessed, _ = render(engine, "Mandelbrot", view, render_mode="guess")
+    np.testing.assert_array_equal(guessed, full)
+
+
+@pytest.mark.parametrize("fractal_type", ("Mandelbrot", "Julia"))
+def test_guess_misses_few_filament_pixels(engine, fractal_type):
+    # Угадывание может залить нить тоньше пикселя, но таких пикселей единицы
+    full, _ = render(engine, fractal_type, VIEWS[1])
+    guessed, _ = render(engine, fractal_type, VIEWS[1], render_mode="guess")
+    assert np.count_nonzero(guessed != full) <= full.size // 500
+
+
+def test_guess_cannot_keep_orbits(engine):
+    with pytest.raises(ValueError):
+        render(engine, "Mandelbrot", VIEWS[0], render_mode="guess", keep_orbits=True)
+
+
+@pytest.mark.parametrize("fractal_type", ("Mandelbrot", "Julia"))
+@pytest.mark.parametrize("region, stride", (
+    ((0, 0, WIDTH, HEIGHT), 1),
+    ((13, 7, 40, 30), 1),
+    ((WIDTH - 1, HEIGHT - 1, 1, 1), 1),
+    ((0, 0, (WIDTH + 1) // 2, (HEIGHT + 1) // 2), 2),
+    ((3, 5, 11, 7), 8),
+))
+def test_region_matches_full_frame(engine, fractal_type, region, stride):
+    view = VIEWS[1]
+    full, full_smooth = render(engine, fractal_type, view, smooth=True)
+    part, part_smooth = render(engine, fractal_type, view, smooth=True, region=region, stride=stride)
+
+    x, y, width, height = region
+    window = (slice(y, y + (height - 1) * stride + 1, stride), slice(x, x + (width - 1) * stride + 1, stride))
+    np.testing.assert_array_equal(part, full[window])
+    np.testing.assert_array_equal(part_smooth, full_smooth[window])
+
+
+def test_missing_mode_fills_only_unknown_pixels(engine):
+    view = VIEWS[1]
+    full, _ = render(engine, "Mandelbrot", view)
+
+    # Известные пиксели нарочно неверны: режим missing не должен их трогать
+    frame = np.where(np.arange(full.size).reshape(full.shape) % 3 == 0, -1, full + 1).astype(np.intc)
+    known = frame >= 0
+    before = frame.copy()
+    center_x, center_y, zoom, max_iterations = view
+    result = engine.calculate_mandelbrot(center_x, center_y, zoom, WIDTH, HEIGHT, max_iterations,
+                                         render_mode="missing", out=frame)
+
+    np.testing.assert_array_equal(result[known], before[known])
+    np.testing.assert_array_equal(result[~known], full[~known])
+
+
+@pytest.mark.parametrize("width", (32, 160, 800))
+def test_float32_only_on_request(engine, width):
+    # Автовыбор никогда не берёт float32 - даже на крупном шаге превью
+    for zoom in (1e-3, 1.0, 1e3, 1e10, 1e20, 1e40):
+        assert choose_precision(zoom, width) != "float32"
+    view = VIEWS[0]
+    result = engine.calculate_mandelbrot(*view[:3], width, width * 3 // 4, view[3])
+    assert result.info["precision"] == "double"
+    engine.release(result)
+    result = engine.calculate_mandelbrot(*view[:3], width, width * 3 // 4, view[3],
+                                         precision="float32")
+    assert result.info["precision"] == "float32"
+    engine.release(result)
@@ -0,0 +1,102 @@
+"""Метод возмущений против прямого расчёта в double-double и кэш опорных орбит"""
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.core import perturbation
+from src.core.fractal_engine import RenderControl
+
+# Граница множества в долине морских коньков: у кадров 64x48 с этим центром
+# есть и ушедшие, и внутренние точки вплоть до зума 1e18
+CENTER_X = Decimal("-0.74364389703647120484594171535421023774671577282216")
+CENTER_Y = Decimal("0.13182590262968697002438202325080604817674363985400")
+WIDTH, HEIGHT = 64, 48
+MAX_ITERATIONS = 2000
+
+
+@pytest.fixture
+def reference_cache():
+    """Пустой кэш опорных орбит на время теста"""
+    perturbation._reference_cache.clear()
+    yield perturbation._reference_cache
+    perturbation._reference_cache.clear()
+
+
+def render(engine, zoom, precision, **options):
+    result = engine.calculate_mandelbrot(CENTER_X, CENTER_Y, zoom, WIDTH, HEIGHT, MAX_ITERATIONS,
+                                         precision=precision, **options)
+    iterations = np.array(result)
+    smooth = None if result.smooth is None else np.array(result.smooth)
+    info = result.info
+    engine.release(result)
+    return iterations, smooth, info
+
+
+@pytest.mark.parametrize("zoom", (1e14, 1e16, 1e18))
+def test_perturbation_matches_double_double(engine, reference_cache, zoom):
+    orbit_real, _, series_iterations, _ = perturbation.prepare_reference(
+        False, CENTER_X, CENTER_Y, zoom, WIDTH, HEIGHT, MAX_ITERATIONS)
+    # Ряд пропускает первые итерации, а опорная орбита уходит раньше
+    # внутренних точек - им приходится переходить на новую опору
+    assert series_iterations > 0
+    assert len(orbit_real) <= MAX_ITERATIONS
+
+    iterations, smooth, info = render(engine, zoom, "perturbation", smooth=True)
+    expected, expected_smooth, _ = render(engine, zoom, "double-double", smooth=True)
+    assert info['kernel'] == "perturbation"
+    assert 0 < np.count_nonzero(expected < MAX_ITERATIONS) < expected.size
+    np.testing.assert_array_equal(iterations, expected)
+    # Дробная часть зависит от |z| на уходе - совпадает до округления
+    np.testing.assert_allclose(smooth, expected_smooth, atol=1e-2)
+
+
+def test_perturbation_region_and_missing_match_full_frame(engine, reference_cache):
+    full, _, _ = render(engine, 1e16, "perturbation")
+    region, _, _ = render(engine, 1e16, "perturbation", region=(5, 7, 20, 18), stride=2)
+    np.testing.assert_array_equal(region, full[7:43:2, 5:45:2])
+
+    frame = full.copy()
+    frame[::3] = -1
+    result = engine.calculate_mandelbrot(CENTER_X, CENTER_Y, 1e16, WIDTH, HEIGHT, MAX_ITERATIONS,
+                                         precision="perturbation", render_mode="missing", out=frame)
+    np.testing.assert_array_equal(result, full)
+
+
+def test_one_point_orbit_falls_back_to_double_double(engine, reference_cache):
+    # Центр Жюлиа вне круга |z| <= 2: опорная орбита обрывается на первой точке
+    result = engine.calculate_julia(-0.7, 0.27015, 2.5, 0.0, 1e15, WIDTH, HEIGHT, 100,
+                                    precision="perturbation")
+    assert result.info['precision'] == "double-double"
+    assert (np.asarray(result) == 0).all()
+    engine.release(result)
+
+
+def reference(zoom, control=None):
+    return perturbation.prepare_reference(False, CENTER_X, CENTER_Y, zoom, WIDTH, HEIGHT, 100,
+                                          control=control)
+
+
+def test_reference_cache_reuses_recent_orbits(reference_cache):
+    first = reference(1e14)
+    assert reference(1e14) is first
+
+    for step in range(perturbation.REFERENCE_CACHE_SIZE - 1):
+        reference(1e15 * 2 ** step)
+    reference(1e14)  # Обращение делает орбиту самой свежей
+    reference(1e20)
+    assert reference(1e14) is first
+    assert len(reference_cache) == perturbation.REFERENCE_CACHE_SIZE
+
+    for step in range(perturbation.REFERENCE_CACHE_SIZE):
+        reference(1e21 * 2 ** step)
+    assert reference(1e14) is not first
+
+
+def test_cancelled_reference_is_not_cached(reference_cache):
+    control = RenderControl()
+    control.cancel()
+    orbit_real, _, _, _ = reference(1e14, control)
+    assert len(orbit_real) == 1
+    assert not reference_cache
+    assert len(reference(1e14)[0]) == 101
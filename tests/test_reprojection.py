@@ -0,0 +1,80 @@
+"""Сопоставление сеток соседних видов и перенос пикселей прошлого кадра"""
+import numpy as np
+import pytest
+
+from src.core.reprojection import frame_mapping, missing_fraction, pixel_steps, reproject_frame
+from src.core.tile_cache import snap_center
+
+WIDTH, HEIGHT = 96, 64
+
+
+def view(center_x, center_y, zoom, max_iterations=300):
+    """Параметры вида с центром на сетке пикселей (как после Canvas.view_params)"""
+    params = dict(center_x=center_x, center_y=center_y, zoom=zoom, width=WIDTH, height=HEIGHT,
+                  max_iterations=max_iterations)
+    step_x, step_y = pixel_steps(params)
+    params['center_x'] = float(snap_center(center_x, step_x, WIDTH, zoom))
+    params['center_y'] = float(snap_center(center_y, step_y, HEIGHT, zoom))
+    return params
+
+
+def moved(params, dx, dy, zoom_factor=1.0):
+    """Вид, сдвинутый на (dx, dy) пикселей и приближенный в zoom_factor раз"""
+    step_x, step_y = pixel_steps(params)
+    return dict(params, center_x=params['center_x'] + dx * step_x,
+                center_y=params['center_y'] + dy * step_y, zoom=params['zoom'] * zoom_factor)
+
+
+def render(engine, params):
+    result = engine.calculate_mandelbrot(**params, precision="double")
+    frame = np.array(result)
+    engine.release(result)
+    return frame
+
+
+def test_same_view_maps_to_itself():
+    params = view(-0.745, 0.1, 300.0)
+    assert frame_mapping(params, dict(params)) == (1.0, 0.0, 0.0)
+
+
+@pytest.mark.parametrize("dx, dy", ((5, 0), (0, -7), (-20, 13)))
+def test_pan_maps_to_pixel_offset(dx, dy):
+    params = view(-0.745, 0.1, 300.0)
+    assert frame_mapping(params, moved(params, dx, dy)) == (1.0, float(dx), float(dy))
+
+
+def test_zoom_maps_to_half_and_double_ratio():
+    params = view(-0.745, 0.1, 300.0)
+    zoomed_in = moved(params, 0, 0, 2.0)
+    assert frame_mapping(params, zoomed_in) == (0.5, WIDTH / 4, HEIGHT / 4)
+    assert frame_mapping(zoomed_in, params) == (2.0, -WIDTH / 2, -HEIGHT / 2)
+
+
+@pytest.mark.parametrize("change", (
+    dict(max_iterations=500),
+    dict(width=WIDTH + 1),
+    dict(zoom=300.0 * 3),
+))
+def test_incompatible_views_have_no_mapping(change):
+    params = view(-0.745, 0.1, 300.0)
+    assert frame_mapping(params, dict(params, **change)) is None
+
+
+def test_off_grid_and_disjoint_views_have_no_mapping():
+    params = view(-0.745, 0.1, 300.0)
+    assert frame_mapping(params, moved(params, 0.5, 0)) is None
+    assert frame_mapping(params, moved(params, WIDTH, 0)) is None
+
+
+@pytest.mark.parametrize("dx, dy, zoom_factor", ((9, -4, 1.0), (6, 3, 2.0), (-5, 8, 0.5)))
+def test_reprojected_pixels_match_fresh_render(engine, dx, dy, zoom_factor):
+    old = view(-0.745, 0.1, 300.0)
+    new = moved(old, dx, dy, zoom_factor)
+    mapping = frame_mapping(old, new)
+    assert mapping is not None
+
+    frame = np.empty((HEIGHT, WIDTH), dtype=np.intc)
+    reproject_frame(render(engine, old), mapping, frame)
+    known = frame >= 0
+    assert 0 < missing_fraction(frame) < 1
+    np.testing.assert_array_equal(frame[known], render(engine, new)[known])
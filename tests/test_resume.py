@@ -0,0 +1,119 @@
+"""Продолжение кадра до большего max_iterations совпадает с расчётом с нуля"""
+import numpy as np
+import pytest
+
+from src.core import fractal_engine
+from src.core.fractal_engine import FractalEngine
+from src.core.worker import FractalWorker
+
+WIDTH, HEIGHT = 96, 64
+VIEW = dict(center_x=-0.745, center_y=0.1, zoom=300.0, width=WIDTH, height=HEIGHT)
+JULIA_C = dict(c_real=-0.7, c_imag=0.27015)
+
+
+def calculate(engine, fractal_type, max_iterations, **options):
+    if fractal_type == "Julia":
+        return engine.calculate_julia(*JULIA_C.values(), **VIEW, max_iterations=max_iterations,
+                                      precision="double", **options)
+    return engine.calculate_mandelbrot(**VIEW, max_iterations=max_iterations, precision="double", **options)
+
+
+@pytest.mark.parametrize("fractal_type", ("Mandelbrot", "Julia"))
+@pytest.mark.parametrize("smooth", (False, True))
+def test_resume_matches_fresh_render(engine, fractal_type, smooth):
+    first = calculate(engine, fractal_type, 100, smooth=smooth, keep_orbits=True)
+    out = np.array(first)
+    smooth_out = np.array(first.smooth) if smooth else None
+    if fractal_type == "Julia":
+        resumed = engine.resume_julia(*JULIA_C.values(), **VIEW, max_iterations=400, orbits=first.orbits,
+                                      out=out, smooth_out=smooth_out)
+    else:
+        resumed = engine.resume_mandelbrot(**VIEW, max_iterations=400, orbits=first.orbits,
+                                           out=out, smooth_out=smooth_out)
+    fresh = calculate(engine, fractal_type, 400, smooth=smooth)
+
+    np.testing.assert_array_equal(resumed, fresh)
+    if smooth:
+        np.testing.assert_array_equal(resumed.smooth, fresh.smooth)
+    engine.release(first)
+    engine.release(fresh)
+
+
+def test_resume_below_computed_iterations_is_rejected(engine):
+    first = calculate(engine, "Mandelbrot", 100, keep_orbits=True)
+    with pytest.raises(ValueError):
+        engine.resume_mandelbrot(**VIEW, max_iterations=50, orbits=first.orbits, out=np.array(first))
+    engine.release(first)
+
+
+@pytest.mark.parametrize("fractal_type", ("Mandelbrot", "Julia"))
+def test_worker_resume_matches_fresh_render(engine, fractal_type):
+    extra = JULIA_C if fractal_type == "Julia" else {}
+    first = FractalWorker(fractal_type, dict(VIEW, max_iterations=100, **extra), engine=engine)
+    finished = []
+    first.calculation_finished.connect(finished.append)
+    first.run()
+
+    resumed = FractalWorker(fractal_type, dict(VIEW, max_iterations=400, **extra), engine=engine,
+                            resume=finished[0])
+    resumed.calculation_finished.connect(finished.append)
+    resumed.run()
+    fresh = calculate(engine, fractal_type, 400)
+
+    np.testing.assert_array_equal(finished[1], fresh)
+    engine.release(finished[0])
+    engine.release(finished[1])
+    engine.release(fresh)
+
+
+def pooled_orbit_buffers(engine, shape):
+    return list(engine.buffers._free.get((shape + (2,), np.dtype(np.float64)), []))
+
+
+def test_orbit_buffer_is_reused_from_pool(engine):
+    own_engine = FractalEngine()
+    first = calculate(own_engine, "Mandelbrot", 100, keep_orbits=True)
+    buffers = pooled_orbit_buffers(own_engine, (HEIGHT, WIDTH))
+    assert len(buffers) == 1
+    second = calculate(own_engine, "Mandelbrot", 100, keep_orbits=True)
+    assert pooled_orbit_buffers(own_engine, (HEIGHT, WIDTH)) == buffers
+
+    # Буфер из пула не должен протекать в состояние орбит
+    np.testing.assert_array_equal(second.orbits.pixels, first.orbits.pixels)
+    np.testing.assert_array_equal(second.orbits.z, first.orbits.z)
+    assert not np.shares_memory(second.orbits.z, buffers[0])
+
+
+def test_orbit_buffer_over_limit_is_not_allocated(engine, monkeypatch):
+    own_engine = FractalEngine()
+    monkeypatch.setattr(fractal_engine, "MAX_ORBIT_BYTES", WIDTH * HEIGHT * 16 - 1)
+    result = calculate(own_engine, "Mandelbrot", 100, keep_orbits=True)
+    assert result.orbits is None
+    assert not pooled_orbit_buffers(own_engine, (HEIGHT, WIDTH))
+
+
+def test_repeated_frames_do_not_allocate(engine):
+    own_engine = FractalEngine()
+    acquire = own_engine.buffers.acquire
+    allocated = []
+
+    def counting_acquire(shape, dtype):
+        free = sum(map(len, own_engine.buffers._free.values()))
+        array = acquire(shape, dtype)
+        if sum(map(len, own_engine.buffers._free.values())) == free:
+            allocated.append((shape, dtype))
+        return array
+
+    own_engine.buffers.acquire = counting_acquire
+    previous = None
+    for step in range(3):
+        allocated.clear()
+        worker = FractalWorker("Mandelbrot", dict(VIEW, center_x=-0.745 + step * 1e-4, max_iterations=200),
+                               engine=own_engine, progressive=True)
+        finished = []
+        worker.calculation_finished.connect(finished.append)
+        worker.run()
+        own_engine.release(previous)  # Как главное окно: прошлый кадр освобождается, когда готов новый
+        previous = finished[0]
+    # Прогрессивный кадр берёт кадр, тайлы, превью и орбиты только из пула
+    assert allocated == []
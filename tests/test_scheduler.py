@@ -0,0 +1,100 @@
+"""Планировщик расчётов: до UI доходит только последнее поколение"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from PyQt6.QtCore import QCoreApplication, Qt
+
+from src.core.fractal_engine import FractalEngine
+from src.core.scheduler import RenderScheduler
+from src.core.worker import FractalWorker
+
+WIDTH, HEIGHT = 64, 48
+
+
+def params(center_x):
+    return dict(center_x=center_x, center_y=0.0, zoom=1.0, width=WIDTH, height=HEIGHT, max_iterations=200)
+
+
+@pytest.fixture
+def scheduler(qapp, engine):
+    """Планировщик со своим движком: его пул буферов не делится с другими тестами"""
+    own_engine = FractalEngine()
+    jobs = []
+
+    def create_job(fractal_type, params, **options):
+        job = FractalWorker(fractal_type, params, engine=own_engine, **options)
+        # Буфер кадра запоминается, чтобы проверить его возврат в пул
+        job.frames = []
+        fill_frame = job._fill_frame
+        job._fill_frame = lambda frame, *args: job.frames.append(frame) or fill_frame(frame, *args)
+        jobs.append(job)
+        return job
+
+    scheduler = RenderScheduler(create_job, engine=own_engine)
+    scheduler.jobs = jobs
+    finished, cancelled = [], []
+    scheduler.calculation_finished.connect(lambda result: finished.append(result))
+    scheduler.calculation_cancelled.connect(lambda: cancelled.append(True))
+    scheduler.finished, scheduler.cancelled = finished, cancelled
+    yield scheduler
+    scheduler.shutdown()
+
+
+def wait(condition, timeout=10.0):
+    """Обрабатывает события, пока condition() не станет истинным"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Расчёт не закончился вовремя"
+        QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+def pooled(engine, array):
+    """Лежит ли буфер массива среди свободных в пуле"""
+    while array.base is not None and isinstance(array.base, np.ndarray):
+        array = array.base
+    return any(free is array for arrays in engine.buffers._free.values() for free in arrays)
+
+
+def test_burst_of_requests_delivers_last_view(scheduler):
+    for step in range(5):
+        scheduler.request("Mandelbrot", params(-0.5 + step * 0.1))
+    wait(lambda: not scheduler.is_busy() and not scheduler._busy)
+
+    assert len(scheduler.jobs) == 1  # Пачка запросов превратилась в один расчёт
+    assert len(scheduler.finished) == 1
+    expected = scheduler.engine.calculate_mandelbrot(**params(-0.1))
+    np.testing.assert_array_equal(scheduler.finished[0], expected)
+    assert not scheduler.cancelled
+
+
+def test_stale_frame_returns_to_pool(scheduler):
+    # Первый расчёт заканчивается раньше нового запроса: его сигнал
+    # calculation_finished обрабатывается уже устаревшим
+    thread_done = threading.Event()
+    for thread in scheduler._threads:
+        thread.job_done.connect(lambda job: thread_done.set(), Qt.ConnectionType.DirectConnection)
+    scheduler.request("Mandelbrot", params(-0.5))
+    wait(lambda: scheduler.jobs)
+    assert thread_done.wait(10.0)
+    # Другой размер: новый расчёт не возьмёт из пула буфер устаревшего кадра
+    scheduler.request("Mandelbrot", dict(params(-0.4), width=WIDTH // 2))
+    wait(lambda: len(scheduler.jobs) == 2 and not scheduler.is_busy() and not scheduler._busy)
+
+    stale, current = scheduler.jobs
+    assert len(scheduler.finished) == 1
+    assert scheduler.finished[0].base is current.frames[0]
+    assert pooled(scheduler.engine, stale.frames[0])
+    assert not pooled(scheduler.engine, current.frames[0])
+
+
+def test_cancel_without_replacement_is_reported(scheduler):
+    scheduler.request("Mandelbrot", dict(params(-0.5), width=1024, height=768, max_iterations=100000))
+    wait(lambda: scheduler.jobs)
+    scheduler.jobs[0].cancel()
+    wait(lambda: not scheduler._busy)
+
+    assert scheduler.cancelled == [True]
+    assert not scheduler.finished
@@ -0,0 +1,183 @@
+"""Кэш тайлов в памяти и на диске: сохранение, сборка кадра, слияние и вытеснение"""
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from src.core.reprojection import pixel_steps
+from src.core.tile_cache import TileCache, grid_origin, grid_tiles, snap_center, view_key
+from src.core.worker import FractalWorker
+from src.db.tile_store import TileStore
+
+TILE = 16
+PARAMS = dict(center_x=0.0, center_y=0.0, zoom=1.0, width=40, height=24, max_iterations=100)
+
+
+def frame_values(shape, offset=0):
+    """Кадр с разными значениями во всех пикселях"""
+    return (np.arange(shape[0] * shape[1], dtype=np.intc).reshape(shape) + offset) % 100
+
+
+def tile_key(tx, ty, max_iterations=100):
+    return TileCache.key(("Mandelbrot", None, None, (0.01, 0.01), max_iterations), tx, ty)
+
+
+def test_grid_tiles_cover_frame_once():
+    origin = grid_origin(PARAMS)
+    assert origin is not None
+    covered = np.zeros((PARAMS['height'], PARAMS['width']), dtype=int)
+    for _, _, x, y, width, height, _, _ in grid_tiles(origin, covered.shape, TILE):
+        covered[y:y + height, x:x + width] += 1
+    assert (covered == 1).all()
+
+
+def test_stored_frame_fills_new_frame():
+    cache = TileCache(tile_size=TILE)
+    view, origin = view_key("Mandelbrot", PARAMS), grid_origin(PARAMS)
+    shape = (PARAMS['height'], PARAMS['width'])
+    frame = frame_values(shape)
+    cache.store_frame(view, origin, frame, (0, 0, shape[1], shape[0]))
+
+    target = np.full(shape, -1, dtype=np.intc)
+    target[0, 0] = 77  # Известные пиксели кэш не перезаписывает
+    assert cache.fill_frame(view, origin, target) == cache.stats()['tiles']
+    assert target[0, 0] == 77
+    np.testing.assert_array_equal(target.ravel()[1:], frame.ravel()[1:])
+
+
+def test_other_view_misses():
+    cache = TileCache(tile_size=TILE)
+    origin = grid_origin(PARAMS)
+    shape = (PARAMS['height'], PARAMS['width'])
+    cache.store_frame(view_key("Mandelbrot", PARAMS), origin, frame_values(shape), (0, 0, shape[1], shape[0]))
+
+    target = np.full(shape, -1, dtype=np.intc)
+    other = view_key("Mandelbrot", dict(PARAMS, max_iterations=200))
+    assert cache.fill_frame(other, origin, target) == 0
+    assert (target == -1).all()
+    assert cache.stats()['hits'] == 0
+
+
+def test_memory_budget_evicts_least_recently_used():
+    tile_bytes = TILE * TILE * np.dtype(np.intc).itemsize
+    cache = TileCache(max_bytes=2 * tile_bytes, tile_size=TILE)
+    view = view_key("Mandelbrot", PARAMS)
+    tile = frame_values((TILE, TILE))
+    for gx in (0, TILE, 2 * TILE):
+        cache.store_frame(view, (gx, 0), tile, (0, 0, TILE, TILE))
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['tiles'] == 2 and stats['bytes'] <= cache.max_bytes
+    target = np.full((TILE, TILE), -1, dtype=np.intc)
+    assert cache.fill_frame(view, (0, 0), target) == 0  # Первый тайл вытеснен
+    assert cache.fill_frame(view, (2 * TILE, 0), target) == 1
+
+
+def test_store_round_trip(tmp_path):
+    store = TileStore(str(tmp_path / "tiles.db"))
+    tile = frame_values((TILE, TILE))
+    store.save({tile_key(0, 0): tile})
+
+    loaded = store.load([tile_key(0, 0), tile_key(1, 0)], TILE)
+    assert list(loaded) == [tile_key(0, 0)]
+    np.testing.assert_array_equal(loaded[tile_key(0, 0)], tile)
+    assert store.load([tile_key(0, 0)], TILE * 2) == {}  # Другой размер тайла
+
+
+def test_store_merges_partial_tiles(tmp_path):
+    store = TileStore(str(tmp_path / "tiles.db"))
+    full = frame_values((TILE, TILE))
+    store.save({tile_key(0, 0): full})
+
+    partial = np.full((TILE, TILE), -1, dtype=np.intc)
+    partial[0] = 99
+    store.save({tile_key(0, 0): partial})
+
+    expected = full.copy()
+    expected[0] = 99
+    np.testing.assert_array_equal(store.load([tile_key(0, 0)], TILE)[tile_key(0, 0)], expected)
+
+
+def test_store_budget_evicts_least_recently_used(tmp_path):
+    tiles = [frame_values((TILE, TILE), offset) for offset in range(3)]
+    tile_bytes = max(len(zlib.compress(tile.tobytes(), 1)) for tile in tiles)
+    store = TileStore(str(tmp_path / "tiles.db"), max_bytes=2 * tile_bytes)
+    store.save({tile_key(0, 0): tiles[0]})
+    time.sleep(0.01)
+    store.save({tile_key(1, 0): tiles[1]})
+    time.sleep(0.01)
+    store.load([tile_key(0, 0)], TILE)  # last_used обновится при следующем save
+    store.save({tile_key(2, 0): tiles[2]})
+
+    keys = [tile_key(tx, 0) for tx in range(3)]
+    assert set(store.load(keys, TILE)) == {tile_key(0, 0), tile_key(2, 0)}
+
+
+def test_cache_reads_store_of_another_process(tmp_path):
+    path = str(tmp_path / "tiles.db")
+    view, origin = view_key("Mandelbrot", PARAMS), grid_origin(PARAMS)
+    shape = (PARAMS['height'], PARAMS['width'])
+    frame = frame_values(shape)
+    writer = TileCache(tile_size=TILE, store=TileStore(path))
+    writer.store_frame(view, origin, frame, (0, 0, shape[1], shape[0]))
+    writer.flush()
+
+    reader = TileCache(tile_size=TILE, store=TileStore(path))
+    target = np.full(shape, -1, dtype=np.intc)
+    reader.fill_frame(view, origin, target)
+    np.testing.assert_array_equal(target, frame)
+    assert reader.stats()['disk_hits'] == reader.stats()['hits'] > 0
+
+
+def test_store_keeps_tile_indices_beyond_int64(tmp_path):
+    store = TileStore(str(tmp_path / "tiles.db"))
+    key = tile_key(-2 ** 80 - 1, 2 ** 70)
+    tile = frame_values((TILE, TILE))
+    store.save({key: tile})
+    np.testing.assert_array_equal(store.load([key], TILE)[key], tile)
+    assert store.load([tile_key(-2 ** 80, 2 ** 70)], TILE) == {}
+
+
+def test_store_errors_skip_the_disk(tmp_path, capsys):
+    store = TileStore(str(tmp_path / "tiles.db"))
+    key = tile_key(0, 0, max_iterations=2 ** 70)  # Не помещается в SQLite INTEGER
+    store.save({key: frame_values((TILE, TILE))})
+    assert store.load([key], TILE) == {}
+    assert capsys.readouterr().out.count("❌") == 2
+
+
+def test_store_drops_tables_of_old_schema(tmp_path):
+    path = str(tmp_path / "tiles.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tiles (tx INTEGER, ty INTEGER)")
+        conn.execute("INSERT INTO tiles VALUES (1, 2)")
+    conn.close()
+
+    store = TileStore(path)
+    tile = frame_values((TILE, TILE))
+    store.save({tile_key(1, 2): tile})
+    np.testing.assert_array_equal(store.load([tile_key(1, 2)], TILE)[tile_key(1, 2)], tile)
+
+
+def test_deep_zoom_render_uses_the_store(engine, tmp_path):
+    # На таком зуме глобальные индексы тайлов давно больше int64
+    params = dict(center_x=-0.743643887037151, center_y=0.131825904205330, zoom=1e20,
+                  width=128, height=96, max_iterations=300)
+    step_x, step_y = pixel_steps(params)
+    params['center_x'] = snap_center(params['center_x'], step_x, params['width'], params['zoom'])
+    params['center_y'] = snap_center(params['center_y'], step_y, params['height'], params['zoom'])
+    assert abs(grid_origin(params)[0]) > 2 ** 63
+
+    frames, errors = [], []
+    for _ in range(2):
+        cache = TileCache(store=TileStore(str(tmp_path / "tiles.db")))
+        worker = FractalWorker("Mandelbrot", params, engine=engine, cache=cache)
+        worker.calculation_finished.connect(lambda result: frames.append(np.array(result)))
+        worker.error_occurred.connect(errors.append)
+        worker.run()
+    assert not errors
+    # Второй расчёт собран целиком из тайлов с диска
+    assert cache.stats()['disk_hits'] == cache.stats()['hits'] > 0
+    np.testing.assert_array_equal(frames[1], frames[0])